@@ -1,7 +1,8 @@
 """ADB client and UI Automator wrappers"""
 from .adb_client import ADBClient
+from .async_adb_client import AsyncADBClient
 from .adb_installer import ADBInstaller
 from .uiautomator import UIAutomator
 
-__all__ = ['ADBClient', 'ADBInstaller', 'UIAutomator']
+__all__ = ['ADBClient', 'AsyncADBClient', 'ADBInstaller', 'UIAutomator']
 
@@ -3,18 +3,91 @@ import subprocess
 import shutil
 import platform
 import os
+import re
+import threading
 from typing import List, Dict, Optional, Tuple
 import logging
 
 from .adb_installer import ADBInstaller
+from .adb_protocol import ADBSocketTransport, ADBProtocolError, DEFAULT_SERVER_HOST, DEFAULT_SERVER_PORT
+from .shell_session import ShellSession, ShellSessionError
+from .device_cache import DeviceCache
+from .frame import Frame, parse_raw_screencap
 
 logger = logging.getLogger(__name__)
 
+# Comprehensive key code mapping
+KEY_CODE_MAP = {
+    # Navigation keys
+    "BACK": "4",
+    "HOME": "3",
+    "MENU": "82",
+    "RECENT": "187",
+    # D-Pad keys
+    "DPAD_CENTER": "23",
+    "DPAD_UP": "19",
+    "DPAD_DOWN": "20",
+    "DPAD_LEFT": "21",
+    "DPAD_RIGHT": "22",
+    # System keys
+    "ENTER": "66",
+    "DEL": "67",
+    "DELETE": "67",
+    "BACKSPACE": "67",
+    "POWER": "26",
+    "WAKEUP": "224",
+    "SLEEP": "223",
+    # Volume keys
+    "VOLUME_UP": "24",
+    "VOLUME_DOWN": "25",
+    "VOLUME_MUTE": "164",
+    # Media keys
+    "MEDIA_PLAY_PAUSE": "85",
+    "MEDIA_STOP": "86",
+    "MEDIA_NEXT": "87",
+    "MEDIA_PREVIOUS": "88",
+    "MEDIA_REWIND": "89",
+    "MEDIA_FAST_FORWARD": "90",
+    # Number keys
+    "KEYCODE_0": "7",
+    "KEYCODE_1": "8",
+    "KEYCODE_2": "9",
+    "KEYCODE_3": "10",
+    "KEYCODE_4": "11",
+    "KEYCODE_5": "12",
+    "KEYCODE_6": "13",
+    "KEYCODE_7": "14",
+    "KEYCODE_8": "15",
+    "KEYCODE_9": "16",
+}
+
+# Device info keys and the system properties they come from
+DEVICE_INFO_PROPS = [
+    ("model", "ro.product.model"),
+    ("manufacturer", "ro.product.manufacturer"),
+    ("android_version", "ro.build.version.release"),
+    ("sdk_version", "ro.build.version.sdk"),
+    ("device", "ro.product.device"),
+    ("brand", "ro.product.brand"),
+]
+
+# One line of `getprop` output: [name]: [value]
+GETPROP_LINE_RE = re.compile(r"^\[([^\]]+)\]: \[(.*)\]\r?$", re.MULTILINE)
+
 
 class ADBClient:
     """Wrapper for ADB commands"""
 
-    def __init__(self, adb_path: Optional[str] = None, auto_install: bool = True, install_dir: Optional[str] = None):
+    def __init__(
+        self,
+        adb_path: Optional[str] = None,
+        auto_install: bool = True,
+        install_dir: Optional[str] = None,
+        transport: str = "subprocess",
+        server_host: str = DEFAULT_SERVER_HOST,
+        server_port: int = DEFAULT_SERVER_PORT,
+        persistent_shell: bool = True,
+    ):
         """
         Initialize ADB client
 
@@ -22,6 +95,11 @@ class ADBClient:
             adb_path: Path to ADB executable. If None, auto-detect.
             auto_install: Automatically install ADB if not found
             install_dir: Directory to install ADB if auto-installing
+            transport: "subprocess" (spawn adb binary per command) or "socket"
+                       (talk to the adb server directly, subprocess as fallback)
+            server_host: adb server host for socket transport
+            server_port: adb server port for socket transport
+            persistent_shell: Run shell() commands on a long-lived per-device shell
         """
         if adb_path:
             self.adb_path = adb_path
@@ -54,6 +132,26 @@ class ADBClient:
 
         logger.info(f"Using ADB at: {self.adb_path}")
 
+        # Socket transport talks to the adb server on port 5037 directly
+        if transport not in ("subprocess", "socket"):
+            raise ValueError(f"Unknown ADB transport: {transport}")
+        self.transport = transport
+        self._socket: Optional[ADBSocketTransport] = None
+        self._server_start_attempted = False
+        if transport == "socket":
+            self._socket = ADBSocketTransport(host=server_host, port=server_port)
+            logger.info(f"Using ADB socket transport: {server_host}:{server_port}")
+
+        # Persistent shell sessions: device_id -> ShellSession
+        self.persistent_shell = persistent_shell
+        self._shell_sessions: Dict[str, ShellSession] = {}
+        self._shell_sessions_lock = threading.Lock()
+
+        # Cached properties and screen geometry, shared with AsyncADBClient
+        self.device_cache = DeviceCache()
+        # Devices whose screencap does not produce a parseable raw frame
+        self._raw_screencap_unsupported = set()
+
         # Accessibility service settings - use ADB shell commands directly
         self.use_accessibility = True  # Use accessibility service by default (via ADB shell)
 
@@ -129,20 +227,40 @@ class ADBClient:
             logger.error(f"Error running ADB command: {e}")
             return "", str(e), -1
 
-    def devices(self) -> List[Dict[str, str]]:
+    def _socket_call(self, func, *args, **kwargs):
         """
-        List connected devices
+        Call a socket transport method, starting the adb server once if it is not running
 
-        Returns:
-            List of device info dicts with keys: id, state, model, etc.
+        Raises:
+            ADBProtocolError: Server answered FAIL
+            OSError: Server unreachable (caller falls back to subprocess)
         """
-        stdout, stderr, returncode = self._run_command(["devices", "-l"])
-        if returncode != 0:
-            logger.error(f"Failed to list devices: {stderr}")
-            return []
+        try:
+            return func(*args, **kwargs)
+        except ConnectionRefusedError:
+            if self._server_start_attempted:
+                raise
+            self._server_start_attempted = True
+            logger.info("ADB server not running, starting it...")
+            self._run_command(["start-server"])
+            return func(*args, **kwargs)
+
+    @staticmethod
+    def _parse_devices(output: str, has_header: bool = True) -> List[Dict[str, str]]:
+        """
+        Parse `adb devices -l` output
+
+        Args:
+            output: Raw output
+            has_header: Skip the "List of devices attached" line
 
+        Returns:
+            List of device info dicts
+        """
         devices = []
-        lines = stdout.strip().split("\n")[1:]  # Skip header
+        lines = output.strip().split("\n")
+        if has_header:
+            lines = lines[1:]  # Skip header
 
         for line in lines:
             if not line.strip():
@@ -166,6 +284,29 @@ class ADBClient:
 
         return devices
 
+    def devices(self) -> List[Dict[str, str]]:
+        """
+        List connected devices
+
+        Returns:
+            List of device info dicts with keys: id, state, model, etc.
+        """
+        if self._socket:
+            try:
+                return self._parse_devices(self._socket_call(self._socket.devices), has_header=False)
+            except ADBProtocolError as e:
+                logger.error(f"Failed to list devices: {e}")
+                return []
+            except OSError as e:
+                logger.warning(f"ADB socket transport unavailable, falling back to subprocess: {e}")
+
+        stdout, stderr, returncode = self._run_command(["devices", "-l"])
+        if returncode != 0:
+            logger.error(f"Failed to list devices: {stderr}")
+            return []
+
+        return self._parse_devices(stdout)
+
     def shell(self, command: str, device_id: Optional[str] = None) -> Tuple[str, str, int]:
         """
         Execute shell command on device
@@ -177,8 +318,107 @@ class ADBClient:
         Returns:
             Tuple of (stdout, stderr, return_code)
         """
+        if self.persistent_shell and device_id:
+            result = self._session_shell(command, device_id)
+            if result is not None:
+                return result
+
+        if self._socket:
+            logger.debug(f"Running ADB shell via socket: {command}")
+            try:
+                stdout, stderr, returncode = self._socket_call(self._socket.shell, device_id, command, 30)
+                return (
+                    stdout.decode("utf-8", errors="replace"),
+                    stderr.decode("utf-8", errors="replace"),
+                    returncode,
+                )
+            except ADBProtocolError as e:
+                return "", str(e), -1
+            except TimeoutError:
+                logger.error(f"ADB shell timed out: {command}")
+                return "", "Command timed out", -1
+            except OSError as e:
+                logger.warning(f"ADB socket transport unavailable, falling back to subprocess: {e}")
+
         return self._run_command(["shell", command], device_id)
 
+    def _get_shell_session(self, device_id: str) -> ShellSession:
+        """Get or create the persistent shell session for a device"""
+        with self._shell_sessions_lock:
+            session = self._shell_sessions.get(device_id)
+            if session is None:
+                session = ShellSession(self.adb_path, device_id, socket_transport=self._socket)
+                self._shell_sessions[device_id] = session
+            return session
+
+    def _session_shell(self, command: str, device_id: str) -> Optional[Tuple[str, str, int]]:
+        """
+        Run command on the device's persistent shell session
+
+        Returns:
+            Tuple of (stdout, stderr, return_code), or None if the caller should
+            run a one-shot shell instead (session busy or unavailable)
+        """
+        session = self._get_shell_session(device_id)
+        logger.debug(f"Running ADB shell via session: {command}")
+        try:
+            return session.try_run(command, timeout=30)
+        except TimeoutError:
+            logger.error(f"ADB shell timed out: {command}")
+            return "", "Command timed out", -1
+        except ShellSessionError as e:
+            logger.debug(f"Shell session unavailable for {device_id}, using one-shot shell: {e}")
+            return None
+
+    def close(self):
+        """Close persistent shell sessions"""
+        with self._shell_sessions_lock:
+            sessions = list(self._shell_sessions.values())
+            self._shell_sessions.clear()
+        for session in sessions:
+            session.close()
+
+    def exec_out(self, device_id: str, command: str, timeout: int = 10) -> Optional[bytes]:
+        """
+        Execute command and return raw binary stdout (adb exec-out, no PTY mangling)
+
+        Args:
+            device_id: Device ID
+            command: Command to execute
+            timeout: Timeout in seconds
+
+        Returns:
+            Stdout bytes or None on failure
+        """
+        if self._socket:
+            try:
+                return self._socket_call(self._socket.exec_out, device_id, command, timeout)
+            except ADBProtocolError as e:
+                logger.error(f"exec-out failed: {e}")
+                return None
+            except TimeoutError:
+                logger.error(f"exec-out timed out for device {device_id}: {command}")
+                return None
+            except OSError as e:
+                logger.warning(f"ADB socket transport unavailable, falling back to subprocess: {e}")
+
+        try:
+            result = subprocess.run(
+                [self.adb_path, "-s", device_id, "exec-out", command],
+                capture_output=True,
+                timeout=timeout,
+            )
+            if result.returncode == 0:
+                return result.stdout
+            logger.error(f"exec-out failed: {result.stderr.decode('utf-8', errors='ignore')}")
+            return None
+        except subprocess.TimeoutExpired:
+            logger.error(f"exec-out timed out for device {device_id}: {command}")
+            return None
+        except Exception as e:
+            logger.error(f"Error running exec-out: {e}")
+            return None
+
     def screencap(self, device_id: str, output_path: Optional[str] = None) -> Optional[bytes]:
         """
         Capture screenshot
@@ -198,25 +438,38 @@ class ADBClient:
             )
             return None if returncode == 0 else None
         else:
-            # Get screenshot as bytes - MUST use binary mode (no text=True)
+            # Get screenshot as bytes - MUST use binary mode (exec-out, no PTY)
             # screencap outputs PNG binary data, not text
-            try:
-                result = subprocess.run(
-                    [self.adb_path, "-s", device_id, "shell", "screencap", "-p"],
-                    capture_output=True,
-                    timeout=10,
-                )
-                if result.returncode == 0:
-                    return result.stdout
-                else:
-                    logger.error(f"Screencap failed: {result.stderr.decode('utf-8', errors='ignore')}")
-                    return None
-            except subprocess.TimeoutExpired:
-                logger.error(f"Screencap timed out for device {device_id}")
-                return None
-            except Exception as e:
-                logger.error(f"Error capturing screenshot: {e}")
+            png_bytes = self.exec_out(device_id, "screencap -p", timeout=10)
+            self.device_cache.observe_png(device_id, png_bytes)
+            return png_bytes
+
+    def screencap_frame(self, device_id: str) -> Optional[Frame]:
+        """
+        Capture a raw frame (screencap without -p, no PNG encoding on the device)
+
+        Falls back to a decoded PNG screenshot on devices whose raw output
+        cannot be parsed.
+
+        Args:
+            device_id: Device ID
+
+        Returns:
+            Frame or None
+        """
+        if device_id not in self._raw_screencap_unsupported:
+            raw = self.exec_out(device_id, "screencap", timeout=10)
+            if raw is None:
                 return None
+            frame = parse_raw_screencap(raw)
+            if frame:
+                self.device_cache.observe_frame(device_id, frame.width, frame.height)
+                return frame
+            logger.warning(f"Raw screencap not supported on {device_id}, using PNG capture")
+            self._raw_screencap_unsupported.add(device_id)
+
+        png_bytes = self.screencap(device_id)
+        return Frame.from_png(png_bytes) if png_bytes else None
 
     def get_screen_size(self, device_id: str) -> Optional[Tuple[int, int]]:
         """
@@ -228,6 +481,10 @@ class ADBClient:
         Returns:
             Tuple of (width, height) or None
         """
+        size = self.device_cache.get_geometry(device_id, "screen_size")
+        if size:
+            return size
+
         stdout, stderr, returncode = self.shell(
             "wm size",
             device_id
@@ -235,7 +492,13 @@ class ADBClient:
         if returncode != 0:
             return None
 
-        # Parse output like "Physical size: 1080x2340"
+        size = self._parse_screen_size(stdout)
+        self.device_cache.set_geometry(device_id, "screen_size", size)
+        return size
+
+    @staticmethod
+    def _parse_screen_size(stdout: str) -> Optional[Tuple[int, int]]:
+        """Parse `wm size` output like "Physical size: 1080x2340" """
         try:
             for line in stdout.split("\n"):
                 if "Physical size:" in line:
@@ -257,6 +520,10 @@ class ADBClient:
         Returns:
             "portrait" or "landscape" or None
         """
+        orientation = self.device_cache.get_geometry(device_id, "orientation")
+        if orientation:
+            return orientation
+
         stdout, stderr, returncode = self.shell(
             "dumpsys input | grep 'SurfaceOrientation' | head -1",
             device_id
@@ -269,18 +536,25 @@ class ADBClient:
             )
 
         if returncode == 0 and stdout:
-            # Parse orientation (0=portrait, 1=landscape, etc.)
-            try:
-                orientation = int(stdout.strip().split("=")[-1].strip())
-                if orientation in [0, 2]:
-                    return "portrait"
-                elif orientation in [1, 3]:
-                    return "landscape"
-            except:
-                pass
+            orientation = self._parse_orientation(stdout)
+            self.device_cache.set_geometry(device_id, "orientation", orientation)
+            return orientation
 
         return None
 
+    @staticmethod
+    def _parse_orientation(stdout: str) -> Optional[str]:
+        """Parse orientation value (0=portrait, 1=landscape, etc.)"""
+        try:
+            orientation = int(stdout.strip().split("=")[-1].strip())
+            if orientation in [0, 2]:
+                return "portrait"
+            elif orientation in [1, 3]:
+                return "landscape"
+        except:
+            pass
+        return None
+
     def set_orientation(self, device_id: str, orientation: str) -> bool:
         """
         Set device orientation
@@ -292,16 +566,23 @@ class ADBClient:
         Returns:
             True if successful
         """
-        if orientation == "portrait":
-            cmd = "settings put system user_rotation 0"
-        elif orientation == "landscape":
-            cmd = "settings put system user_rotation 1"
-        else:
+        cmd = self._orientation_command(orientation)
+        if not cmd:
             return False
 
         stdout, stderr, returncode = self.shell(cmd, device_id)
+        self.device_cache.invalidate_geometry(device_id)
         return returncode == 0
 
+    @staticmethod
+    def _orientation_command(orientation: str) -> Optional[str]:
+        """Build command to set orientation, or None if orientation is invalid"""
+        if orientation == "portrait":
+            return "settings put system user_rotation 0"
+        elif orientation == "landscape":
+            return "settings put system user_rotation 1"
+        return None
+
     def input_tap(self, device_id: str, x: int, y: int) -> bool:
         """Tap at coordinates - uses ADB input tap (standard method)"""
         # Use standard ADB input tap (không cần accessibility service cho coordinates)
@@ -334,14 +615,9 @@ class ADBClient:
         # Use standard ADB input text (không cần accessibility service cho text input)
         # ADB input text command requires proper handling of special characters
         # Method 1: Try using base64 encoding (more reliable for special chars)
-        import base64
+        base64_cmd, direct_cmd = self._input_text_commands(text)
         try:
-            text_bytes = text.encode('utf-8')
-            text_b64 = base64.b64encode(text_bytes).decode('ascii')
-
-            # Use shell to decode and pipe to input text
-            cmd = f"echo '{text_b64}' | base64 -d | input text"
-            stdout, stderr, returncode = self.shell(cmd, device_id)
+            stdout, stderr, returncode = self.shell(base64_cmd, device_id)
 
             if returncode == 0:
                 return True
@@ -349,16 +625,33 @@ class ADBClient:
             logger.debug(f"Base64 method failed, trying direct method: {e}")
 
         # Method 2: Direct input with proper escaping
+        stdout, stderr, returncode = self.shell(direct_cmd, device_id)
+
+        return returncode == 0
+
+    @staticmethod
+    def _input_text_commands(text: str) -> Tuple[str, str]:
+        """
+        Build input text commands
+
+        Returns:
+            Tuple of (base64 piped command, directly escaped command)
+        """
+        import base64
+        text_bytes = text.encode('utf-8')
+        text_b64 = base64.b64encode(text_bytes).decode('ascii')
+
+        # Use shell to decode and pipe to input text
+        base64_cmd = f"echo '{text_b64}' | base64 -d | input text"
+
         # ADB input text handles most characters, but we need to escape shell special chars
         # The text itself is passed to input text, so we mainly need to escape for shell
         escaped = text.replace('\\', '\\\\').replace('$', '\\$').replace('`', '\\`')
         escaped = escaped.replace('"', '\\"').replace("'", "\\'").replace('\n', '\\n')
 
         # Use single quotes in shell command to minimize escaping issues
-        cmd = f"input text '{escaped}'"
-        stdout, stderr, returncode = self.shell(cmd, device_id)
-
-        return returncode == 0
+        direct_cmd = f"input text '{escaped}'"
+        return base64_cmd, direct_cmd
 
     def input_key(self, device_id: str, key_code: str) -> bool:
         """
@@ -371,58 +664,25 @@ class ADBClient:
         Returns:
             True if successful
         """
-        # Comprehensive key code mapping
-        key_map = {
-            # Navigation keys
-            "BACK": "4",
-            "HOME": "3",
-            "MENU": "82",
-            "RECENT": "187",
-            # D-Pad keys
-            "DPAD_CENTER": "23",
-            "DPAD_UP": "19",
-            "DPAD_DOWN": "20",
-            "DPAD_LEFT": "21",
-            "DPAD_RIGHT": "22",
-            # System keys
-            "ENTER": "66",
-            "DEL": "67",
-            "DELETE": "67",
-            "BACKSPACE": "67",
-            "POWER": "26",
-            "WAKEUP": "224",
-            "SLEEP": "223",
-            # Volume keys
-            "VOLUME_UP": "24",
-            "VOLUME_DOWN": "25",
-            "VOLUME_MUTE": "164",
-            # Media keys
-            "MEDIA_PLAY_PAUSE": "85",
-            "MEDIA_STOP": "86",
-            "MEDIA_NEXT": "87",
-            "MEDIA_PREVIOUS": "88",
-            "MEDIA_REWIND": "89",
-            "MEDIA_FAST_FORWARD": "90",
-            # Number keys
-            "KEYCODE_0": "7",
-            "KEYCODE_1": "8",
-            "KEYCODE_2": "9",
-            "KEYCODE_3": "10",
-            "KEYCODE_4": "11",
-            "KEYCODE_5": "12",
-            "KEYCODE_6": "13",
-            "KEYCODE_7": "14",
-            "KEYCODE_8": "15",
-            "KEYCODE_9": "16",
-        }
+        key = self._resolve_key_code(key_code)
 
+        # Use standard ADB input keyevent (không cần accessibility service cho key press)
+        stdout, stderr, returncode = self.shell(
+            f"input keyevent {key}",
+            device_id
+        )
+        return returncode == 0
+
+    @staticmethod
+    def _resolve_key_code(key_code: str) -> str:
+        """Resolve key name (e.g., "BACK", "KEYCODE_HOME") to an `input keyevent` argument"""
         # Convert key name to code if needed
-        key = key_map.get(key_code.upper(), key_code)
+        key = KEY_CODE_MAP.get(key_code.upper(), key_code)
 
         # Remove KEYCODE_ prefix if present (e.g., KEYCODE_BACK -> BACK)
         if key.startswith("KEYCODE_"):
             key = key[8:]
-            key = key_map.get(key, key_code)
+            key = KEY_CODE_MAP.get(key, key_code)
 
         # If still not numeric, try to use as-is (might be numeric string)
         try:
@@ -432,12 +692,7 @@ class ADBClient:
             # If not numeric and not in map, try with KEYCODE_ prefix
             key = f"KEYCODE_{key}"
 
-        # Use standard ADB input keyevent (không cần accessibility service cho key press)
-        stdout, stderr, returncode = self.shell(
-            f"input keyevent {key}",
-            device_id
-        )
-        return returncode == 0
+        return key
 
     def install_app(self, device_id: str, apk_path: str) -> bool:
         """Install APK"""
@@ -464,6 +719,11 @@ class ADBClient:
         if returncode != 0:
             return []
 
+        return self._parse_packages(stdout)
+
+    @staticmethod
+    def _parse_packages(stdout: str) -> List[str]:
+        """Parse `pm list packages` output"""
         packages = []
         for line in stdout.split("\n"):
             if line.startswith("package:"):
@@ -484,15 +744,7 @@ class ADBClient:
         """
         if activity:
             # Use provided activity
-            if "/" in activity:
-                cmd = f"am start -n {activity}"
-            else:
-                # If activity doesn't start with package, construct full path
-                if activity.startswith("."):
-                    activity = f"{package_name}{activity}"
-                elif not activity.startswith(package_name):
-                    activity = f"{package_name}/{activity}"
-                cmd = f"am start -n {activity}"
+            cmd = f"am start -n {self._activity_component(package_name, activity)}"
         else:
             # Try to get main launcher activity using pm dump
             activity = None
@@ -502,27 +754,7 @@ class ADBClient:
             )
 
             if returncode == 0 and stdout:
-                # Look for MAIN activity with LAUNCHER category
-                lines = stdout.split("\n")
-                in_main_section = False
-                for i, line in enumerate(lines):
-                    if "android.intent.action.MAIN" in line:
-                        in_main_section = True
-                        # Look ahead for activity name
-                        for j in range(i, min(i + 10, len(lines))):
-                            if package_name in lines[j] and "/" in lines[j]:
-                                # Extract activity from line like "com.package/.Activity"
-                                parts = lines[j].strip().split()
-                                for part in parts:
-                                    if package_name in part and "/" in part:
-                                        activity = part.strip()
-                                        # Clean up any trailing characters
-                                        activity = activity.split()[0].split("}")[0].split(")")[0]
-                                        break
-                                if activity:
-                                    break
-                        if activity:
-                            break
+                activity = self._find_launcher_activity(stdout, package_name)
 
             if activity:
                 cmd = f"am start -n {activity}"
@@ -539,6 +771,42 @@ class ADBClient:
         stdout, stderr, returncode = self.shell(cmd, device_id)
         return returncode == 0
 
+    @staticmethod
+    def _activity_component(package_name: str, activity: str) -> str:
+        """Build `am start -n` component from package and (possibly relative) activity"""
+        if "/" in activity:
+            return activity
+        # If activity doesn't start with package, construct full path
+        if activity.startswith("."):
+            return f"{package_name}{activity}"
+        elif not activity.startswith(package_name):
+            return f"{package_name}/{activity}"
+        return activity
+
+    @staticmethod
+    def _find_launcher_activity(stdout: str, package_name: str) -> Optional[str]:
+        """Find MAIN/LAUNCHER activity in `pm dump` output"""
+        activity = None
+        lines = stdout.split("\n")
+        for i, line in enumerate(lines):
+            if "android.intent.action.MAIN" in line:
+                # Look ahead for activity name
+                for j in range(i, min(i + 10, len(lines))):
+                    if package_name in lines[j] and "/" in lines[j]:
+                        # Extract activity from line like "com.package/.Activity"
+                        parts = lines[j].strip().split()
+                        for part in parts:
+                            if package_name in part and "/" in part:
+                                activity = part.strip()
+                                # Clean up any trailing characters
+                                activity = activity.split()[0].split("}")[0].split(")")[0]
+                                break
+                        if activity:
+                            break
+                if activity:
+                    break
+        return activity
+
     def open_url(self, device_id: str, url: str) -> bool:
         """Open URL in browser"""
         stdout, stderr, returncode = self.shell(
@@ -584,38 +852,42 @@ class ADBClient:
         Returns:
             Dict with device info (model, manufacturer, android_version, etc.) or None
         """
-        info = {}
+        return self._device_info_from_properties(self.get_properties(device_id))
 
-        # Get model
-        stdout, stderr, returncode = self.shell("getprop ro.product.model", device_id)
-        if returncode == 0:
-            info["model"] = stdout.strip()
+    def get_properties(self, device_id: str, refresh: bool = False) -> Dict[str, str]:
+        """
+        Get all system properties with one `getprop` call (cached until reconnect)
 
-        # Get manufacturer
-        stdout, stderr, returncode = self.shell("getprop ro.product.manufacturer", device_id)
-        if returncode == 0:
-            info["manufacturer"] = stdout.strip()
+        Args:
+            device_id: Device ID
+            refresh: Ignore the cache and query the device
 
-        # Get Android version
-        stdout, stderr, returncode = self.shell("getprop ro.build.version.release", device_id)
-        if returncode == 0:
-            info["android_version"] = stdout.strip()
+        Returns:
+            Dict of property name -> value (empty on failure)
+        """
+        if not refresh:
+            properties = self.device_cache.get_properties(device_id)
+            if properties is not None:
+                return properties
 
-        # Get SDK version
-        stdout, stderr, returncode = self.shell("getprop ro.build.version.sdk", device_id)
-        if returncode == 0:
-            info["sdk_version"] = stdout.strip()
+        stdout, stderr, returncode = self.shell("getprop", device_id)
+        if returncode != 0:
+            return {}
 
-        # Get device name
-        stdout, stderr, returncode = self.shell("getprop ro.product.device", device_id)
-        if returncode == 0:
-            info["device"] = stdout.strip()
+        properties = self._parse_getprop(stdout)
+        if properties:
+            self.device_cache.set_properties(device_id, properties)
+        return properties
 
-        # Get brand
-        stdout, stderr, returncode = self.shell("getprop ro.product.brand", device_id)
-        if returncode == 0:
-            info["brand"] = stdout.strip()
+    @staticmethod
+    def _parse_getprop(stdout: str) -> Dict[str, str]:
+        """Parse `getprop` output lines like "[ro.product.model]: [Pixel 7]" """
+        return dict(GETPROP_LINE_RE.findall(stdout))
 
+    @staticmethod
+    def _device_info_from_properties(properties: Dict[str, str]) -> Optional[Dict[str, str]]:
+        """Pick device info keys out of a property dump"""
+        info = {key: properties[prop] for key, prop in DEVICE_INFO_PROPS if prop in properties}
         return info if info else None
 
     def get_battery_level(self, device_id: str) -> Optional[int]:
@@ -633,13 +905,19 @@ class ADBClient:
             device_id
         )
         if returncode == 0:
-            try:
-                for line in stdout.split("\n"):
-                    if "level:" in line:
-                        level = int(line.split(":")[1].strip())
-                        return level
-            except:
-                pass
+            return self._parse_battery_level(stdout)
+        return None
+
+    @staticmethod
+    def _parse_battery_level(stdout: str) -> Optional[int]:
+        """Parse `dumpsys battery` level line"""
+        try:
+            for line in stdout.split("\n"):
+                if "level:" in line:
+                    level = int(line.split(":")[1].strip())
+                    return level
+        except:
+            pass
         return None
 
     def get_current_activity(self, device_id: str) -> Optional[str]:
@@ -657,15 +935,21 @@ class ADBClient:
             device_id
         )
         if returncode == 0:
-            for line in stdout.split("\n"):
-                if "mCurrentFocus" in line or "mFocusedApp" in line:
-                    # Extract activity from line like "mCurrentFocus=Window{... com.package/.Activity}"
-                    if "/" in line:
-                        parts = line.split("/")
-                        if len(parts) >= 2:
-                            activity_part = parts[-1].split()[0].split("}")[0]
-                            package_part = parts[-2].split()[-1]
-                            return f"{package_part}/{activity_part}"
+            return self._parse_current_activity(stdout)
+        return None
+
+    @staticmethod
+    def _parse_current_activity(stdout: str) -> Optional[str]:
+        """Parse focused activity from `dumpsys window` output"""
+        for line in stdout.split("\n"):
+            if "mCurrentFocus" in line or "mFocusedApp" in line:
+                # Extract activity from line like "mCurrentFocus=Window{... com.package/.Activity}"
+                if "/" in line:
+                    parts = line.split("/")
+                    if len(parts) >= 2:
+                        activity_part = parts[-1].split()[0].split("}")[0]
+                        package_part = parts[-2].split()[-1]
+                        return f"{package_part}/{activity_part}"
         return None
 
     def get_current_package(self, device_id: str) -> Optional[str]:
@@ -713,41 +997,54 @@ class ADBClient:
         """
         info = {}
 
-        # Get app label
-        stdout, stderr, returncode = self.shell(
-            f"pm dump {package_name} | grep -A 1 'Application Label'",
-            device_id
-        )
-        if returncode == 0 and stdout:
+        for command, parser in self._app_info_queries(package_name):
+            stdout, stderr, returncode = self.shell(command, device_id)
+            if returncode == 0 and stdout:
+                info.update(parser(stdout))
+
+        return info if info else None
+
+    @staticmethod
+    def _app_info_queries(package_name: str) -> list:
+        """
+        Commands and parsers used by get_app_info
+
+        Returns:
+            List of (command, parser) where parser(stdout) returns a partial info dict
+        """
+        def parse_label(stdout: str) -> Dict[str, str]:
+            info = {}
             for line in stdout.split("\n"):
                 if "Application Label" in line:
                     label = line.split("'")[1] if "'" in line else ""
                     info["label"] = label
+            return info
 
-        # Get version name
-        stdout, stderr, returncode = self.shell(
-            f"dumpsys package {package_name} | grep versionName",
-            device_id
-        )
-        if returncode == 0 and stdout:
+        def parse_version(stdout: str) -> Dict[str, str]:
+            info = {}
             for line in stdout.split("\n"):
                 if "versionName" in line:
                     version = line.split("=")[-1].strip()
                     info["version"] = version
+            return info
 
-        # Get main activity
-        stdout, stderr, returncode = self.shell(
-            f"pm dump {package_name} | grep -A 5 MAIN",
-            device_id
-        )
-        if returncode == 0 and stdout:
+        def parse_main_activity(stdout: str) -> Dict[str, str]:
+            info = {}
             for line in stdout.split("\n"):
                 if package_name in line and "/" in line:
                     activity = line.strip().split()[0] if line.strip() else ""
                     if activity:
                         info["main_activity"] = activity
+            return info
 
-        return info if info else None
+        return [
+            # Get app label
+            (f"pm dump {package_name} | grep -A 1 'Application Label'", parse_label),
+            # Get version name
+            (f"dumpsys package {package_name} | grep versionName", parse_version),
+            # Get main activity
+            (f"pm dump {package_name} | grep -A 5 MAIN", parse_main_activity),
+        ]
 
     def push(self, device_id: str, local_path: str, remote_path: str) -> bool:
         """
@@ -761,6 +1058,16 @@ class ADBClient:
         Returns:
             True if successful
         """
+        if self._socket:
+            try:
+                self._socket_call(self._socket.push, device_id, local_path, remote_path)
+                return True
+            except (ADBProtocolError, TimeoutError) as e:
+                logger.error(f"Push failed: {e}")
+                return False
+            except OSError as e:
+                logger.warning(f"ADB socket transport unavailable, falling back to subprocess: {e}")
+
         stdout, stderr, returncode = self._run_command(
             ["push", local_path, remote_path],
             device_id
@@ -779,6 +1086,16 @@ class ADBClient:
         Returns:
             True if successful
         """
+        if self._socket:
+            try:
+                self._socket_call(self._socket.pull, device_id, remote_path, local_path)
+                return True
+            except (ADBProtocolError, TimeoutError) as e:
+                logger.error(f"Pull failed: {e}")
+                return False
+            except OSError as e:
+                logger.warning(f"ADB socket transport unavailable, falling back to subprocess: {e}")
+
         stdout, stderr, returncode = self._run_command(
             ["pull", remote_path, local_path],
             device_id
@@ -836,6 +1153,13 @@ class ADBClient:
         Returns:
             True if successful
         """
+        cmd = f"am start -n {self._qualify_activity(package_name, activity)}"
+        stdout, stderr, returncode = self.shell(cmd, device_id)
+        return returncode == 0
+
+    @staticmethod
+    def _qualify_activity(package_name: str, activity: str) -> str:
+        """Qualify activity name with package for launch_app_with_activity"""
         # If activity doesn't start with package, prepend it
         if not activity.startswith(package_name):
             if activity.startswith("."):
@@ -845,10 +1169,7 @@ class ADBClient:
         else:
             if "/" not in activity:
                 activity = activity.replace(".", "/", 1)
-
-        cmd = f"am start -n {activity}"
-        stdout, stderr, returncode = self.shell(cmd, device_id)
-        return returncode == 0
+        return activity
 
     # ========== Accessibility Service Methods (via ADB shell) ==========
 
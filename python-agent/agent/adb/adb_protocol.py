@@ -0,0 +1,494 @@
+"""Native ADB server wire-protocol client (smart socket on TCP port 5037)
+
+Talks directly to the local adb server instead of spawning the adb binary
+for every command. Supported services:
+
+- host:* requests (host:version, host:devices-l, ...)
+- host:transport:<serial> followed by shell:, shell,v2: and exec: services
+- sync: file transfer (push/pull)
+"""
+import os
+import asyncio
+import socket
+import struct
+import time
+import logging
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SERVER_HOST = "127.0.0.1"
+DEFAULT_SERVER_PORT = 5037
+
+# Shell protocol v2 packet ids
+SHELL_ID_STDIN = 0
+SHELL_ID_STDOUT = 1
+SHELL_ID_STDERR = 2
+SHELL_ID_EXIT = 3
+SHELL_ID_CLOSE_STDIN = 4
+
+# Max payload of a single sync DATA packet
+SYNC_DATA_MAX = 64 * 1024
+
+
+class ADBProtocolError(RuntimeError):
+    """Raised when the adb server answers FAIL or sends malformed data"""
+
+
+class ADBSocketTransport:
+    """Client for the adb server smart-socket protocol"""
+
+    def __init__(
+        self,
+        host: str = DEFAULT_SERVER_HOST,
+        port: int = DEFAULT_SERVER_PORT,
+        timeout: float = 30.0,
+    ):
+        """
+        Initialize socket transport
+
+        Args:
+            host: adb server host
+            port: adb server port (default 5037)
+            timeout: Default socket timeout in seconds
+        """
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        # Serials whose adbd does not support shell protocol v2
+        self._no_shell_v2 = set()
+
+    # ========== Low-level framing ==========
+
+    def connect(self, timeout: Optional[float] = None) -> socket.socket:
+        """Open a new connection to the adb server"""
+        sock = socket.create_connection((self.host, self.port), timeout=timeout or self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    @staticmethod
+    def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+        """Read exactly `size` bytes or raise ADBProtocolError on EOF"""
+        buf = bytearray()
+        while len(buf) < size:
+            chunk = sock.recv(size - len(buf))
+            if not chunk:
+                raise ADBProtocolError(f"Connection closed after {len(buf)}/{size} bytes")
+            buf.extend(chunk)
+        return bytes(buf)
+
+    @staticmethod
+    def _recv_all(sock: socket.socket) -> bytes:
+        """Read until the server closes the connection"""
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    @classmethod
+    def _read_length_prefixed(cls, sock: socket.socket) -> bytes:
+        """Read a 4-hex-digit length prefixed payload"""
+        length = int(cls._recv_exactly(sock, 4), 16)
+        return cls._recv_exactly(sock, length) if length else b""
+
+    @classmethod
+    def _send_request(cls, sock: socket.socket, request: str):
+        """Send a request and wait for OKAY, raising ADBProtocolError on FAIL"""
+        payload = request.encode("utf-8")
+        sock.sendall(b"%04x" % len(payload) + payload)
+        status = cls._recv_exactly(sock, 4)
+        if status == b"OKAY":
+            return
+        if status == b"FAIL":
+            message = cls._read_length_prefixed(sock).decode("utf-8", errors="replace")
+            raise ADBProtocolError(message or f"Request failed: {request}")
+        raise ADBProtocolError(f"Unexpected status {status!r} for request: {request}")
+
+    # ========== Host services ==========
+
+    def host_request(self, service: str) -> str:
+        """
+        Run a host service that answers with a length-prefixed payload
+
+        Args:
+            service: Service name, e.g. "host:version" or "host:devices-l"
+
+        Returns:
+            Decoded payload
+        """
+        with self.connect() as sock:
+            self._send_request(sock, service)
+            return self._read_length_prefixed(sock).decode("utf-8", errors="replace")
+
+    def server_version(self) -> int:
+        """Get adb server protocol version"""
+        return int(self.host_request("host:version"), 16)
+
+    def devices(self) -> str:
+        """Get raw `host:devices-l` listing (same line format as `adb devices -l`, no header)"""
+        return self.host_request("host:devices-l")
+
+    def open_device_service(self, serial: Optional[str], service: str,
+                            timeout: Optional[float] = None) -> socket.socket:
+        """
+        Switch a new connection to a device transport and open a service on it
+
+        Args:
+            serial: Device serial. If None, uses the only connected device.
+            service: Device service, e.g. "shell:ls" or "exec:screencap"
+            timeout: Socket timeout in seconds
+
+        Returns:
+            Connected socket streaming the service; caller must close it
+        """
+        sock = self.connect(timeout)
+        try:
+            self._send_request(sock, f"host:transport:{serial}" if serial else "host:transport-any")
+            self._send_request(sock, service)
+            return sock
+        except Exception:
+            sock.close()
+            raise
+
+    # ========== Device services ==========
+
+    def shell(self, serial: Optional[str], command: str,
+              timeout: Optional[float] = None) -> Tuple[bytes, bytes, int]:
+        """
+        Run a shell command and collect its output
+
+        Uses shell protocol v2 (separate stdout/stderr and a real exit code) and
+        falls back to the legacy shell: service for devices without it.
+
+        Args:
+            serial: Device serial
+            command: Shell command line
+            timeout: Timeout in seconds
+
+        Returns:
+            Tuple of (stdout, stderr, return_code)
+        """
+        if serial not in self._no_shell_v2:
+            with self.connect(timeout) as sock:
+                # Transport errors (device not found, offline) propagate to the caller
+                self._send_request(sock, f"host:transport:{serial}" if serial else "host:transport-any")
+                try:
+                    self._send_request(sock, f"shell,v2,raw:{command}")
+                except ADBProtocolError as e:
+                    logger.debug(f"shell,v2 not supported on {serial}, using legacy shell: {e}")
+                    self._no_shell_v2.add(serial)
+                else:
+                    return self._read_shell_v2(sock)
+
+        return self._legacy_shell(serial, command, timeout)
+
+    def _read_shell_v2(self, sock: socket.socket) -> Tuple[bytes, bytes, int]:
+        """Demultiplex shell v2 packets until the exit packet arrives"""
+        stdout = bytearray()
+        stderr = bytearray()
+        while True:
+            header = sock.recv(5)
+            if not header:
+                # Connection closed without exit packet
+                return bytes(stdout), bytes(stderr), -1
+            if len(header) < 5:
+                header += self._recv_exactly(sock, 5 - len(header))
+            packet_id, length = struct.unpack("<BI", header)
+            data = self._recv_exactly(sock, length) if length else b""
+            if packet_id == SHELL_ID_STDOUT:
+                stdout.extend(data)
+            elif packet_id == SHELL_ID_STDERR:
+                stderr.extend(data)
+            elif packet_id == SHELL_ID_EXIT:
+                return bytes(stdout), bytes(stderr), data[0] if data else 0
+
+    def _legacy_shell(self, serial: Optional[str], command: str,
+                      timeout: Optional[float] = None) -> Tuple[bytes, bytes, int]:
+        """Run command through legacy shell: and recover exit code from a trailing marker"""
+        marker = b"__ADB_RC__"
+        sock = self.open_device_service(
+            serial, f"shell:({command}); echo \"{marker.decode()}$?\"", timeout
+        )
+        with sock:
+            output = self._recv_all(sock)
+
+        index = output.rfind(marker)
+        if index < 0:
+            return output, b"", -1
+        try:
+            returncode = int(output[index + len(marker):].strip() or b"-1")
+        except ValueError:
+            returncode = -1
+        stdout = output[:index]
+        return stdout, b"", returncode
+
+    def exec_out(self, serial: Optional[str], command: str, timeout: Optional[float] = None) -> bytes:
+        """
+        Run a command through exec: and return its raw binary stdout
+
+        Args:
+            serial: Device serial
+            command: Command line
+            timeout: Timeout in seconds
+
+        Returns:
+            Raw stdout bytes (no PTY mangling)
+        """
+        with self.open_device_service(serial, f"exec:{command}", timeout) as sock:
+            return self._recv_all(sock)
+
+    # ========== Sync (file transfer) ==========
+
+    @classmethod
+    def _sync_send(cls, sock: socket.socket, command: bytes, payload: bytes = b"", length: Optional[int] = None):
+        """Send a sync packet: 4-byte id + little-endian length + payload"""
+        sock.sendall(command + struct.pack("<I", len(payload) if length is None else length) + payload)
+
+    @classmethod
+    def _sync_read_header(cls, sock: socket.socket) -> Tuple[bytes, int]:
+        """Read a sync packet header"""
+        header = cls._recv_exactly(sock, 8)
+        return header[:4], struct.unpack("<I", header[4:])[0]
+
+    def pull(self, serial: Optional[str], remote_path: str, local_path: str,
+             timeout: Optional[float] = None):
+        """
+        Pull a file from device over sync:
+
+        Args:
+            serial: Device serial
+            remote_path: Remote file path
+            local_path: Local destination path
+            timeout: Timeout in seconds
+        """
+        with self.open_device_service(serial, "sync:", timeout) as sock:
+            self._sync_send(sock, b"RECV", remote_path.encode("utf-8"))
+            with open(local_path, "wb") as f:
+                while True:
+                    packet_id, length = self._sync_read_header(sock)
+                    if packet_id == b"DATA":
+                        f.write(self._recv_exactly(sock, length))
+                    elif packet_id == b"DONE":
+                        break
+                    elif packet_id == b"FAIL":
+                        message = self._recv_exactly(sock, length).decode("utf-8", errors="replace")
+                        raise ADBProtocolError(f"Pull failed: {message}")
+                    else:
+                        raise ADBProtocolError(f"Unexpected sync packet {packet_id!r}")
+            self._sync_send(sock, b"QUIT")
+
+    def push(self, serial: Optional[str], local_path: str, remote_path: str,
+             mode: int = 0o644, timeout: Optional[float] = None):
+        """
+        Push a file to device over sync:
+
+        Args:
+            serial: Device serial
+            local_path: Local file path
+            remote_path: Remote destination path
+            mode: File permission bits
+            timeout: Timeout in seconds
+        """
+        with self.open_device_service(serial, "sync:", timeout) as sock:
+            self._sync_send(sock, b"SEND", f"{remote_path},{mode | 0o100000}".encode("utf-8"))
+            with open(local_path, "rb") as f:
+                while True:
+                    chunk = f.read(SYNC_DATA_MAX)
+                    if not chunk:
+                        break
+                    self._sync_send(sock, b"DATA", chunk)
+            mtime = int(os.path.getmtime(local_path)) if os.path.exists(local_path) else int(time.time())
+            self._sync_send(sock, b"DONE", length=mtime)
+
+            packet_id, length = self._sync_read_header(sock)
+            if packet_id == b"FAIL":
+                message = self._recv_exactly(sock, length).decode("utf-8", errors="replace")
+                raise ADBProtocolError(f"Push failed: {message}")
+            if packet_id != b"OKAY":
+                raise ADBProtocolError(f"Unexpected sync packet {packet_id!r}")
+            self._sync_send(sock, b"QUIT")
+
+
+class AsyncADBSocketTransport:
+    """asyncio client for the adb server smart-socket protocol"""
+
+    def __init__(self, host: str = DEFAULT_SERVER_HOST, port: int = DEFAULT_SERVER_PORT):
+        """
+        Initialize async socket transport
+
+        Args:
+            host: adb server host
+            port: adb server port (default 5037)
+        """
+        self.host = host
+        self.port = port
+        # Serials whose adbd does not support shell protocol v2
+        self._no_shell_v2 = set()
+
+    async def connect(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        """Open a new connection to the adb server"""
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return reader, writer
+
+    @staticmethod
+    async def _recv_exactly(reader: asyncio.StreamReader, size: int) -> bytes:
+        """Read exactly `size` bytes or raise ADBProtocolError on EOF"""
+        try:
+            return await reader.readexactly(size)
+        except asyncio.IncompleteReadError as e:
+            raise ADBProtocolError(f"Connection closed after {len(e.partial)}/{size} bytes")
+
+    @classmethod
+    async def _read_length_prefixed(cls, reader: asyncio.StreamReader) -> bytes:
+        """Read a 4-hex-digit length prefixed payload"""
+        length = int(await cls._recv_exactly(reader, 4), 16)
+        return await cls._recv_exactly(reader, length) if length else b""
+
+    @classmethod
+    async def _send_request(cls, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, request: str):
+        """Send a request and wait for OKAY, raising ADBProtocolError on FAIL"""
+        payload = request.encode("utf-8")
+        writer.write(b"%04x" % len(payload) + payload)
+        await writer.drain()
+        status = await cls._recv_exactly(reader, 4)
+        if status == b"OKAY":
+            return
+        if status == b"FAIL":
+            message = (await cls._read_length_prefixed(reader)).decode("utf-8", errors="replace")
+            raise ADBProtocolError(message or f"Request failed: {request}")
+        raise ADBProtocolError(f"Unexpected status {status!r} for request: {request}")
+
+    @staticmethod
+    def _close(writer: asyncio.StreamWriter):
+        try:
+            writer.close()
+        except Exception:
+            pass
+
+    async def host_request(self, service: str) -> str:
+        """Run a host service that answers with a length-prefixed payload"""
+        reader, writer = await self.connect()
+        try:
+            await self._send_request(reader, writer, service)
+            return (await self._read_length_prefixed(reader)).decode("utf-8", errors="replace")
+        finally:
+            self._close(writer)
+
+    async def devices(self) -> str:
+        """Get raw `host:devices-l` listing (no header)"""
+        return await self.host_request("host:devices-l")
+
+    async def track_devices(self, long: bool = True):
+        """
+        Stream device list snapshots from `host:track-devices[-l]`
+
+        The server sends the full device list (same format as `devices`) once
+        on connect and again on every change. Falls back to the short listing
+        if the server does not know `track-devices-l`.
+
+        Yields:
+            Raw device listing for every change
+        """
+        reader, writer = await self.connect()
+        try:
+            try:
+                await self._send_request(reader, writer, "host:track-devices-l" if long else "host:track-devices")
+            except ADBProtocolError:
+                if not long:
+                    raise
+                self._close(writer)
+                reader, writer = await self.connect()
+                await self._send_request(reader, writer, "host:track-devices")
+            while True:
+                yield (await self._read_length_prefixed(reader)).decode("utf-8", errors="replace")
+        finally:
+            self._close(writer)
+
+    async def open_device_service(
+        self, serial: Optional[str], service: str
+    ) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        """
+        Switch a new connection to a device transport and open a service on it
+
+        Returns:
+            (reader, writer) streaming the service; caller must close the writer
+        """
+        reader, writer = await self.connect()
+        try:
+            await self._send_request(reader, writer, f"host:transport:{serial}" if serial else "host:transport-any")
+            await self._send_request(reader, writer, service)
+            return reader, writer
+        except BaseException:
+            self._close(writer)
+            raise
+
+    async def shell(self, serial: Optional[str], command: str) -> Tuple[bytes, bytes, int]:
+        """
+        Run a shell command and collect its output (shell v2 with legacy fallback)
+
+        Returns:
+            Tuple of (stdout, stderr, return_code)
+        """
+        if serial not in self._no_shell_v2:
+            reader, writer = await self.connect()
+            try:
+                await self._send_request(reader, writer, f"host:transport:{serial}" if serial else "host:transport-any")
+                try:
+                    await self._send_request(reader, writer, f"shell,v2,raw:{command}")
+                except ADBProtocolError as e:
+                    logger.debug(f"shell,v2 not supported on {serial}, using legacy shell: {e}")
+                    self._no_shell_v2.add(serial)
+                else:
+                    return await self._read_shell_v2(reader)
+            finally:
+                self._close(writer)
+
+        marker = b"__ADB_RC__"
+        reader, writer = await self.open_device_service(
+            serial, f"shell:({command}); echo \"{marker.decode()}$?\""
+        )
+        try:
+            output = await reader.read()
+        finally:
+            self._close(writer)
+
+        index = output.rfind(marker)
+        if index < 0:
+            return output, b"", -1
+        try:
+            returncode = int(output[index + len(marker):].strip() or b"-1")
+        except ValueError:
+            returncode = -1
+        return output[:index], b"", returncode
+
+    async def _read_shell_v2(self, reader: asyncio.StreamReader) -> Tuple[bytes, bytes, int]:
+        """Demultiplex shell v2 packets until the exit packet arrives"""
+        stdout = bytearray()
+        stderr = bytearray()
+        while True:
+            try:
+                header = await reader.readexactly(5)
+            except asyncio.IncompleteReadError:
+                return bytes(stdout), bytes(stderr), -1
+            packet_id, length = struct.unpack("<BI", header)
+            data = await self._recv_exactly(reader, length) if length else b""
+            if packet_id == SHELL_ID_STDOUT:
+                stdout.extend(data)
+            elif packet_id == SHELL_ID_STDERR:
+                stderr.extend(data)
+            elif packet_id == SHELL_ID_EXIT:
+                return bytes(stdout), bytes(stderr), data[0] if data else 0
+
+    async def exec_out(self, serial: Optional[str], command: str) -> bytes:
+        """Run a command through exec: and return its raw binary stdout"""
+        reader, writer = await self.open_device_service(serial, f"exec:{command}")
+        try:
+            return await reader.read()
+        finally:
+            self._close(writer)
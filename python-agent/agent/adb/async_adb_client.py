@@ -0,0 +1,701 @@
+"""asyncio-native ADB client with the same surface as ADBClient"""
+import asyncio
+import time
+import logging
+from typing import List, Dict, Optional, Tuple
+
+from .adb_client import ADBClient
+from .adb_protocol import AsyncADBSocketTransport, ADBProtocolError
+from .shell_session import AsyncShellSession, ShellSessionError
+from .device_registry import DeviceRegistry
+from .frame import Frame, parse_raw_screencap
+from .frame_producer import FrameProducer
+from .automation_server import AutomationServerBackend
+from .hierarchy_parser import parse_hierarchy_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncADBClient:
+    """
+    Awaitable ADB client for use inside the event loop
+
+    Mirrors ADBClient (same methods, same return values) but never blocks the
+    loop: commands run through asyncio subprocesses or asyncio streams to the
+    adb server, and persistent shell sessions are asyncio-based. Output parsing
+    is shared with ADBClient.
+    """
+
+    def __init__(self, adb_client: ADBClient):
+        """
+        Initialize async ADB client
+
+        Args:
+            adb_client: Configured ADBClient (provides adb path and transport settings)
+        """
+        self.sync = adb_client
+        self.adb_path = adb_client.adb_path
+        self.transport = adb_client.transport
+        self.persistent_shell = adb_client.persistent_shell
+        self.use_accessibility = adb_client.use_accessibility
+        self.device_cache = adb_client.device_cache
+        self._raw_screencap_unsupported = adb_client._raw_screencap_unsupported
+
+        self._socket: Optional[AsyncADBSocketTransport] = None
+        if adb_client._socket:
+            self._socket = AsyncADBSocketTransport(host=adb_client._socket.host, port=adb_client._socket.port)
+        self._server_start_attempted = False
+
+        # Persistent shell sessions: device_id -> AsyncShellSession
+        self._shell_sessions: Dict[str, AsyncShellSession] = {}
+
+        # Device list pushed by the adb server (started with start_device_tracking)
+        self.device_registry = DeviceRegistry(self.adb_path, socket_transport=self._socket)
+        self.device_registry.add_listener(self._on_devices_changed)
+
+        # Shared screen capture (single-flight, reuse of fresh frames)
+        self.frames = FrameProducer(self.screencap_frame)
+
+        # device_id -> screen generation, bumped by every input action
+        self._screen_generations: Dict[str, int] = {}
+        # device_id -> content generation, bumped by screen changes and by
+        # content updates reported by the automation server
+        self._content_generations: Dict[str, int] = {}
+
+        # Optional on-device automation server (see set_automation_server)
+        self.automation_server: Optional[AutomationServerBackend] = None
+
+    def set_automation_server(self, backend: Optional[AutomationServerBackend]):
+        """
+        Use an on-device automation server for selector clicks and hierarchy dumps
+
+        Its "window_changed" events count as screen changes; other events
+        (the frequent "content_changed") only make cached frames and
+        hierarchies stale, see content_changed().
+        """
+        self.automation_server = backend
+        if backend:
+            backend.add_listener(self._on_server_event)
+
+    def _on_server_event(self, device_id: str, event: str, params: Dict):
+        if event == "window_changed":
+            self.screen_changed(device_id)
+        else:
+            self.content_changed(device_id)
+
+    def screen_generation(self, device_id: str) -> int:
+        """Screen generation of a device (changes whenever the screen may have changed)"""
+        return self._screen_generations.get(device_id, 0)
+
+    def content_generation(self, device_id: str) -> int:
+        """Content generation of a device (changes with the screen generation and on content updates)"""
+        return self._content_generations.get(device_id, 0)
+
+    def screen_changed(self, device_id: str):
+        """Record that the screen of a device may have changed (called after input actions)"""
+        self._screen_generations[device_id] = self.screen_generation(device_id) + 1
+        self.content_changed(device_id)
+
+    def content_changed(self, device_id: str):
+        """
+        Record that content of the current screen changed (a spinner, a clock,
+        a live list) without a new window
+
+        Cached frames and hierarchies are dropped; the screen generation, and
+        so the screen marks taken on it, stay.
+        """
+        self._content_generations[device_id] = self.content_generation(device_id) + 1
+        self.frames.invalidate(device_id)
+
+    # ========== Command execution ==========
+
+    async def _run_command(self, command: List[str], device_id: Optional[str] = None,
+                           timeout: float = 30) -> Tuple[str, str, int]:
+        """
+        Run ADB command in an asyncio subprocess
+
+        Args:
+            command: Command arguments (without 'adb')
+            device_id: Optional device ID to target specific device
+            timeout: Timeout in seconds
+
+        Returns:
+            Tuple of (stdout, stderr, return_code)
+        """
+        stdout, stderr, returncode = await self._run_command_bytes(command, device_id, timeout)
+        return (
+            stdout.decode("utf-8", errors="replace"),
+            stderr.decode("utf-8", errors="replace"),
+            returncode,
+        )
+
+    async def _run_command_bytes(self, command: List[str], device_id: Optional[str] = None,
+                                 timeout: float = 30) -> Tuple[bytes, bytes, int]:
+        """Run ADB command and return raw (stdout, stderr, return_code)"""
+        full_command = [self.adb_path]
+        if device_id:
+            full_command.extend(["-s", device_id])
+        full_command.extend(command)
+
+        logger.debug(f"Running ADB command (async): {' '.join(full_command)}")
+
+        process = None
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *full_command,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+            return stdout, stderr, process.returncode
+        except asyncio.TimeoutError:
+            logger.error(f"ADB command timed out: {' '.join(full_command)}")
+            if process and process.returncode is None:
+                process.kill()
+                await process.wait()
+            return b"", b"Command timed out", -1
+        except Exception as e:
+            logger.error(f"Error running ADB command: {e}")
+            return b"", str(e).encode("utf-8"), -1
+
+    async def _socket_call(self, func, *args, timeout: float = 30):
+        """
+        Await a socket transport call, starting the adb server once if it is not running
+
+        Raises:
+            ADBProtocolError: Server answered FAIL
+            asyncio.TimeoutError: Call did not finish in time
+            OSError: Server unreachable (caller falls back to subprocess)
+        """
+        try:
+            return await asyncio.wait_for(func(*args), timeout=timeout)
+        except ConnectionRefusedError:
+            if self._server_start_attempted:
+                raise
+            self._server_start_attempted = True
+            logger.info("ADB server not running, starting it...")
+            await self._run_command(["start-server"])
+            return await asyncio.wait_for(func(*args), timeout=timeout)
+
+    def start_device_tracking(self):
+        """Start the background device registry (must be called from the event loop)"""
+        self.device_registry.start()
+
+    async def _on_devices_changed(self, current: Dict[str, Dict[str, str]], previous: Dict[str, Dict[str, str]]):
+        """Drop cached device state when a device disconnects or comes back online"""
+        for device_id in set(current) | set(previous):
+            online = current.get(device_id, {}).get("state") == "device"
+            was_online = previous.get(device_id, {}).get("state") == "device"
+            if online != was_online:
+                self.device_cache.invalidate(device_id)
+                self.frames.forget(device_id)
+                self._screen_generations[device_id] = self.screen_generation(device_id) + 1
+                if self.automation_server:
+                    await self.automation_server.forget(device_id)
+
+    async def devices(self) -> List[Dict[str, str]]:
+        """
+        List connected devices
+
+        Served from the device registry while it is tracking; queries the adb
+        server otherwise.
+
+        Returns:
+            List of device info dicts with keys: id, state, model, etc.
+        """
+        if self.device_registry.ready:
+            return self.device_registry.devices()
+
+        if self._socket:
+            try:
+                return ADBClient._parse_devices(await self._socket_call(self._socket.devices), has_header=False)
+            except ADBProtocolError as e:
+                logger.error(f"Failed to list devices: {e}")
+                return []
+            except (OSError, asyncio.TimeoutError) as e:
+                logger.warning(f"ADB socket transport unavailable, falling back to subprocess: {e}")
+
+        stdout, stderr, returncode = await self._run_command(["devices", "-l"])
+        if returncode != 0:
+            logger.error(f"Failed to list devices: {stderr}")
+            return []
+
+        return ADBClient._parse_devices(stdout)
+
+    async def shell(self, command: str, device_id: Optional[str] = None) -> Tuple[str, str, int]:
+        """
+        Execute shell command on device
+
+        Args:
+            command: Shell command to execute
+            device_id: Optional device ID
+
+        Returns:
+            Tuple of (stdout, stderr, return_code)
+        """
+        if self.persistent_shell and device_id:
+            result = await self._session_shell(command, device_id)
+            if result is not None:
+                return result
+
+        if self._socket:
+            logger.debug(f"Running ADB shell via socket (async): {command}")
+            try:
+                stdout, stderr, returncode = await self._socket_call(self._socket.shell, device_id, command)
+                return (
+                    stdout.decode("utf-8", errors="replace"),
+                    stderr.decode("utf-8", errors="replace"),
+                    returncode,
+                )
+            except ADBProtocolError as e:
+                return "", str(e), -1
+            except asyncio.TimeoutError:
+                logger.error(f"ADB shell timed out: {command}")
+                return "", "Command timed out", -1
+            except OSError as e:
+                logger.warning(f"ADB socket transport unavailable, falling back to subprocess: {e}")
+
+        return await self._run_command(["shell", command], device_id)
+
+    def _get_shell_session(self, device_id: str) -> AsyncShellSession:
+        """Get or create the persistent shell session for a device"""
+        session = self._shell_sessions.get(device_id)
+        if session is None:
+            session = AsyncShellSession(self.adb_path, device_id, socket_transport=self._socket)
+            self._shell_sessions[device_id] = session
+        return session
+
+    async def _session_shell(self, command: str, device_id: str) -> Optional[Tuple[str, str, int]]:
+        """
+        Run command on the device's persistent shell session
+
+        Returns:
+            Tuple of (stdout, stderr, return_code), or None if the caller should
+            run a one-shot shell instead (session busy or unavailable)
+        """
+        session = self._get_shell_session(device_id)
+        logger.debug(f"Running ADB shell via session (async): {command}")
+        try:
+            return await session.try_run(command, timeout=30)
+        except TimeoutError:
+            logger.error(f"ADB shell timed out: {command}")
+            return "", "Command timed out", -1
+        except ShellSessionError as e:
+            logger.debug(f"Shell session unavailable for {device_id}, using one-shot shell: {e}")
+            return None
+
+    async def close(self):
+        """Stop device tracking and close persistent shell sessions"""
+        await self.device_registry.stop()
+        if self.automation_server:
+            await self.automation_server.close()
+        sessions = list(self._shell_sessions.values())
+        self._shell_sessions.clear()
+        for session in sessions:
+            await session.close()
+
+    async def exec_out(self, device_id: str, command: str, timeout: float = 10) -> Optional[bytes]:
+        """
+        Execute command and return raw binary stdout (adb exec-out, no PTY mangling)
+
+        Args:
+            device_id: Device ID
+            command: Command to execute
+            timeout: Timeout in seconds
+
+        Returns:
+            Stdout bytes or None on failure
+        """
+        if self._socket:
+            try:
+                return await self._socket_call(self._socket.exec_out, device_id, command, timeout=timeout)
+            except ADBProtocolError as e:
+                logger.error(f"exec-out failed: {e}")
+                return None
+            except asyncio.TimeoutError:
+                logger.error(f"exec-out timed out for device {device_id}: {command}")
+                return None
+            except OSError as e:
+                logger.warning(f"ADB socket transport unavailable, falling back to subprocess: {e}")
+
+        stdout, stderr, returncode = await self._run_command_bytes(["exec-out", command], device_id, timeout)
+        if returncode == 0:
+            return stdout
+        logger.error(f"exec-out failed: {stderr.decode('utf-8', errors='ignore')}")
+        return None
+
+    async def exec_out_stream(self, device_id: str, command: str, chunk_size: int = 65536):
+        """
+        Stream raw stdout of a long-running command (e.g. screenrecord) as it is produced
+
+        The command is stopped when the generator is closed.
+
+        Args:
+            device_id: Device ID
+            command: Command to execute
+            chunk_size: Maximum bytes per chunk
+
+        Yields:
+            Stdout chunks
+        """
+        if self._socket:
+            writer = None
+            try:
+                reader, writer = await self._socket_call(self._socket.open_device_service, device_id, f"exec:{command}")
+            except ADBProtocolError as e:
+                logger.error(f"exec-out failed: {e}")
+                return
+            except (OSError, asyncio.TimeoutError) as e:
+                logger.warning(f"ADB socket transport unavailable, falling back to subprocess: {e}")
+
+            if writer is not None:
+                try:
+                    while True:
+                        chunk = await reader.read(chunk_size)
+                        if not chunk:
+                            return
+                        yield chunk
+                finally:
+                    AsyncADBSocketTransport._close(writer)
+
+        process = await asyncio.create_subprocess_exec(
+            self.adb_path, "-s", device_id, "exec-out", command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        try:
+            while True:
+                chunk = await process.stdout.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+        finally:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+
+    # ========== Device methods (same surface as ADBClient) ==========
+
+    async def screencap(self, device_id: str, output_path: Optional[str] = None) -> Optional[bytes]:
+        """
+        Capture screenshot
+
+        Args:
+            device_id: Device ID
+            output_path: Optional path on device to save screenshot. If None, returns bytes.
+
+        Returns:
+            Screenshot PNG bytes if output_path is None, else None
+        """
+        if output_path:
+            await self.shell(f"screencap -p > {output_path}", device_id)
+            return None
+        png_bytes = await self.exec_out(device_id, "screencap -p", timeout=10)
+        self.device_cache.observe_png(device_id, png_bytes)
+        return png_bytes
+
+    async def get_frame(self, device_id: str, max_age_ms: int = 0) -> Optional[Frame]:
+        """
+        Get a screen frame through the shared per-device producer
+
+        Joins a capture already in flight for the device, or returns the last
+        frame if it was captured less than max_age_ms ago and no input action
+        happened since (see FrameProducer).
+
+        Args:
+            device_id: Device ID
+            max_age_ms: Maximum acceptable frame age in milliseconds (0 = new capture)
+
+        Returns:
+            Frame or None
+        """
+        return await self.frames.get_frame(device_id, max_age_ms)
+
+    async def screencap_frame(self, device_id: str) -> Optional[Frame]:
+        """Capture a raw frame (see ADBClient.screencap_frame)"""
+        if device_id not in self._raw_screencap_unsupported:
+            raw = await self.exec_out(device_id, "screencap", timeout=10)
+            if raw is None:
+                return None
+            frame = parse_raw_screencap(raw)
+            if frame:
+                self.device_cache.observe_frame(device_id, frame.width, frame.height)
+                return frame
+            logger.warning(f"Raw screencap not supported on {device_id}, using PNG capture")
+            self._raw_screencap_unsupported.add(device_id)
+
+        png_bytes = await self.screencap(device_id)
+        if not png_bytes:
+            return None
+        # PNG decode is CPU-bound, keep it off the event loop
+        return await asyncio.to_thread(Frame.from_png, png_bytes)
+
+    async def get_screen_size(self, device_id: str) -> Optional[Tuple[int, int]]:
+        """Get device screen size as (width, height) or None (cached, see DeviceCache)"""
+        size = self.device_cache.get_geometry(device_id, "screen_size")
+        if size:
+            return size
+
+        stdout, stderr, returncode = await self.shell("wm size", device_id)
+        if returncode != 0:
+            return None
+        size = ADBClient._parse_screen_size(stdout)
+        self.device_cache.set_geometry(device_id, "screen_size", size)
+        return size
+
+    async def get_orientation(self, device_id: str) -> Optional[str]:
+        """Get device orientation ("portrait" or "landscape") or None (cached, see DeviceCache)"""
+        orientation = self.device_cache.get_geometry(device_id, "orientation")
+        if orientation:
+            return orientation
+
+        stdout, stderr, returncode = await self.shell(
+            "dumpsys input | grep 'SurfaceOrientation' | head -1",
+            device_id
+        )
+        if returncode != 0:
+            # Try alternative method
+            stdout, stderr, returncode = await self.shell(
+                "dumpsys display | grep 'mCurrentOrientation'",
+                device_id
+            )
+
+        if returncode == 0 and stdout:
+            orientation = ADBClient._parse_orientation(stdout)
+            self.device_cache.set_geometry(device_id, "orientation", orientation)
+            return orientation
+        return None
+
+    async def set_orientation(self, device_id: str, orientation: str) -> bool:
+        """Set device orientation ("portrait" or "landscape")"""
+        cmd = ADBClient._orientation_command(orientation)
+        if not cmd:
+            return False
+        stdout, stderr, returncode = await self.shell(cmd, device_id)
+        self.device_cache.invalidate_geometry(device_id)
+        self.screen_changed(device_id)
+        return returncode == 0
+
+    async def input_tap(self, device_id: str, x: int, y: int) -> bool:
+        """Tap at coordinates"""
+        stdout, stderr, returncode = await self.shell(f"input tap {x} {y}", device_id)
+        self.screen_changed(device_id)
+        return returncode == 0
+
+    async def input_swipe(self, device_id: str, x1: int, y1: int, x2: int, y2: int, duration: int = 300) -> bool:
+        """Swipe from (x1, y1) to (x2, y2)"""
+        stdout, stderr, returncode = await self.shell(
+            f"input swipe {x1} {y1} {x2} {y2} {duration}",
+            device_id
+        )
+        self.screen_changed(device_id)
+        return returncode == 0
+
+    async def input_text(self, device_id: str, text: str) -> bool:
+        """Input text (base64 pipe first, escaped direct input as fallback)"""
+        base64_cmd, direct_cmd = ADBClient._input_text_commands(text)
+        stdout, stderr, returncode = await self.shell(base64_cmd, device_id)
+        self.screen_changed(device_id)
+        if returncode == 0:
+            return True
+
+        stdout, stderr, returncode = await self.shell(direct_cmd, device_id)
+        self.screen_changed(device_id)
+        return returncode == 0
+
+    async def input_key(self, device_id: str, key_code: str) -> bool:
+        """Press key using key code or key name (e.g., "BACK", "HOME")"""
+        key = ADBClient._resolve_key_code(key_code)
+        stdout, stderr, returncode = await self.shell(f"input keyevent {key}", device_id)
+        self.screen_changed(device_id)
+        return returncode == 0
+
+    async def install_app(self, device_id: str, apk_path: str) -> bool:
+        """Install APK"""
+        stdout, stderr, returncode = await self._run_command(["install", apk_path], device_id, timeout=300)
+        return returncode == 0
+
+    async def uninstall_app(self, device_id: str, package_name: str) -> bool:
+        """Uninstall app"""
+        stdout, stderr, returncode = await self._run_command(["uninstall", package_name], device_id)
+        return returncode == 0
+
+    async def list_packages(self, device_id: str) -> List[str]:
+        """List installed packages"""
+        stdout, stderr, returncode = await self.shell("pm list packages", device_id)
+        if returncode != 0:
+            return []
+        return ADBClient._parse_packages(stdout)
+
+    async def launch_app(self, device_id: str, package_name: str, activity: Optional[str] = None) -> bool:
+        """Launch app. If activity is not provided, finds and launches the main activity."""
+        if activity:
+            cmd = f"am start -n {ADBClient._activity_component(package_name, activity)}"
+        else:
+            activity = None
+            stdout, stderr, returncode = await self.shell(f"pm dump {package_name}", device_id)
+            if returncode == 0 and stdout:
+                activity = ADBClient._find_launcher_activity(stdout, package_name)
+
+            if activity:
+                cmd = f"am start -n {activity}"
+            else:
+                # Fallback: Try intent-based launch first
+                cmd = f"am start -a android.intent.action.MAIN -c android.intent.category.LAUNCHER -n {package_name}/.MainActivity"
+                stdout, stderr, returncode = await self.shell(cmd, device_id)
+                if returncode != 0:
+                    # Last resort: Use monkey command
+                    cmd = f"monkey -p {package_name} -c android.intent.category.LAUNCHER 1"
+                    stdout, stderr, returncode = await self.shell(cmd, device_id)
+                    self.screen_changed(device_id)
+                    return returncode == 0
+
+        stdout, stderr, returncode = await self.shell(cmd, device_id)
+        self.screen_changed(device_id)
+        return returncode == 0
+
+    async def open_url(self, device_id: str, url: str) -> bool:
+        """Open URL in browser"""
+        stdout, stderr, returncode = await self.shell(
+            f"am start -a android.intent.action.VIEW -d {url}",
+            device_id
+        )
+        self.screen_changed(device_id)
+        return returncode == 0
+
+    async def wait_for_device(self, device_id: Optional[str] = None, timeout: int = 30) -> bool:
+        """Wait for device to be in 'device' state"""
+        if self.device_registry.running:
+            # Woken by track-devices events instead of polling
+            return await self.device_registry.wait_for_device(device_id, timeout)
+
+        start_time = time.monotonic()
+
+        while time.monotonic() - start_time < timeout:
+            devices = await self.devices()
+            if device_id:
+                for device in devices:
+                    if device["id"] == device_id and device["state"] == "device":
+                        return True
+            else:
+                if any(d["state"] == "device" for d in devices):
+                    return True
+            await asyncio.sleep(1)
+
+        return False
+
+    async def get_device_info(self, device_id: str) -> Optional[Dict[str, str]]:
+        """Get detailed device information (model, manufacturer, android_version, etc.)"""
+        return ADBClient._device_info_from_properties(await self.get_properties(device_id))
+
+    async def get_properties(self, device_id: str, refresh: bool = False) -> Dict[str, str]:
+        """Get all system properties with one `getprop` call (cached until reconnect)"""
+        if not refresh:
+            properties = self.device_cache.get_properties(device_id)
+            if properties is not None:
+                return properties
+
+        stdout, stderr, returncode = await self.shell("getprop", device_id)
+        if returncode != 0:
+            return {}
+
+        properties = ADBClient._parse_getprop(stdout)
+        if properties:
+            self.device_cache.set_properties(device_id, properties)
+        return properties
+
+    async def get_battery_level(self, device_id: str) -> Optional[int]:
+        """Get battery level (0-100) or None"""
+        stdout, stderr, returncode = await self.shell("dumpsys battery | grep level", device_id)
+        if returncode == 0:
+            return ADBClient._parse_battery_level(stdout)
+        return None
+
+    async def get_current_activity(self, device_id: str) -> Optional[str]:
+        """Get current foreground activity (package/activity) or None"""
+        stdout, stderr, returncode = await self.shell(
+            "dumpsys window windows | grep -E 'mCurrentFocus|mFocusedApp'",
+            device_id
+        )
+        if returncode == 0:
+            return ADBClient._parse_current_activity(stdout)
+        return None
+
+    async def get_current_package(self, device_id: str) -> Optional[str]:
+        """Get current foreground package name or None"""
+        activity = await self.get_current_activity(device_id)
+        if activity and "/" in activity:
+            return activity.split("/")[0]
+        return None
+
+    async def terminate_app(self, device_id: str, package_name: str) -> bool:
+        """Force stop an app"""
+        stdout, stderr, returncode = await self.shell(f"am force-stop {package_name}", device_id)
+        self.screen_changed(device_id)
+        return returncode == 0
+
+    async def get_app_info(self, device_id: str, package_name: str) -> Optional[Dict[str, str]]:
+        """Get app information (label, version, main_activity)"""
+        info = {}
+        for command, parser in ADBClient._app_info_queries(package_name):
+            stdout, stderr, returncode = await self.shell(command, device_id)
+            if returncode == 0 and stdout:
+                info.update(parser(stdout))
+        return info if info else None
+
+    async def push(self, device_id: str, local_path: str, remote_path: str) -> bool:
+        """Push file to device (sync transfer runs in a worker thread)"""
+        return await asyncio.to_thread(self.sync.push, device_id, local_path, remote_path)
+
+    async def pull(self, device_id: str, remote_path: str, local_path: str) -> bool:
+        """Pull file from device (sync transfer runs in a worker thread)"""
+        return await asyncio.to_thread(self.sync.pull, device_id, remote_path, local_path)
+
+    async def input_roll(self, device_id: str, x: int, y: int, delta: int) -> bool:
+        """Scroll/roll at coordinates (positive delta = down, negative = up)"""
+        y2 = y + abs(delta) if delta > 0 else y - abs(delta)
+        return await self.input_swipe(device_id, x, y, x, y2, duration=300)
+
+    async def input_long_press(self, device_id: str, x: int, y: int, duration: int = 1000) -> bool:
+        """Long press at coordinates"""
+        return await self.input_swipe(device_id, x, y, x, y, duration=duration)
+
+    async def launch_app_with_activity(self, device_id: str, package_name: str, activity: str) -> bool:
+        """Launch app with specific activity"""
+        cmd = f"am start -n {ADBClient._qualify_activity(package_name, activity)}"
+        stdout, stderr, returncode = await self.shell(cmd, device_id)
+        self.screen_changed(device_id)
+        return returncode == 0
+
+    # ========== Accessibility Service Methods (via ADB shell) ==========
+
+    async def accessibility_click_element(self, device_id: str, resource_id: Optional[str] = None,
+                                          text: Optional[str] = None, description: Optional[str] = None) -> bool:
+        """
+        Click element by properties through the automation server
+
+        Returns False when no server is available (caller falls back to a
+        coordinate click, see ADBClient).
+        """
+        if self.automation_server and await self.automation_server.available(device_id):
+            clicked = await self.automation_server.click(device_id, resource_id, text, description)
+        else:
+            clicked = self.sync.accessibility_click_element(device_id, resource_id, text, description)
+        if clicked:
+            self.screen_changed(device_id)
+        return clicked
+
+    async def accessibility_get_elements(self, device_id: str) -> Optional[List[Dict]]:
+        """
+        Get UI elements from the automation server
+
+        Returns None when no server is available (UIAutomator dump is used instead).
+        """
+        if not self.automation_server:
+            return self.sync.accessibility_get_elements(device_id)
+
+        xml_string = await self.automation_server.dump_hierarchy(device_id)
+        if not xml_string:
+            return None
+        snapshot = parse_hierarchy_snapshot(xml_string.encode("utf-8"))
+        return snapshot.filter().to_dicts() if snapshot is not None else None
@@ -0,0 +1,349 @@
+"""
+Client for a long-lived UI automation server running on the device
+
+`uiautomator dump` starts a new instrumentation (about a second) on every
+call. An automation server started once on the device (app_process or
+instrumentation, e.g. from a pushed jar) keeps the UiAutomation connection
+open and answers in milliseconds. It is reached through `adb forward`.
+
+Protocol: newline-delimited JSON (UTF-8) over one TCP connection per device.
+
+    request   {"id": 1, "method": "hierarchy", "params": {}}
+    response  {"id": 1, "result": {...}}  or  {"id": 1, "error": "message"}
+    event     {"event": "window_changed", "params": {...}}  (no id, pushed by the server)
+
+Methods:
+    ping       -> {"version": str}
+    hierarchy  -> {"xml": str}  (same XML format as `uiautomator dump`)
+    click      {"resource_id"?, "text"?, "description"?} -> {"clicked": bool}
+               (first element whose attributes equal all the given values)
+
+Events (debounced by the server): "window_changed", "content_changed".
+"""
+import asyncio
+import json
+import time
+import logging
+from typing import Any, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DEVICE_PORT = 9008
+# Longest message line: hierarchies of long lists run to megabytes
+# (asyncio's default of 64 KiB would drop the connection on them)
+STREAM_LIMIT = 16 * 1024 * 1024
+
+
+class AutomationServerError(RuntimeError):
+    """Automation server answered with an error or the connection failed"""
+
+
+class _ServerConnection:
+    """One socket to the server of a device: request/response matching and event dispatch"""
+
+    def __init__(self, device_id: str, port: int, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                 on_event: Callable[[str, str, Dict], None]):
+        self.device_id = device_id
+        self.port = port
+        self.reader = reader
+        self.writer = writer
+        self._on_event = on_event
+        self._next_id = 0
+        # request id -> future resolved by the read loop
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._read_task = asyncio.create_task(self._read_loop())
+
+    @property
+    def closed(self) -> bool:
+        return self._read_task.done()
+
+    async def request(self, method: str, params: Optional[Dict] = None, timeout: float = 5.0) -> Any:
+        """Send a request and wait for its result"""
+        if self.closed:
+            raise AutomationServerError("Connection closed")
+
+        self._next_id += 1
+        request_id = self._next_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            message = json.dumps({"id": request_id, "method": method, "params": params or {}})
+            self.writer.write(message.encode("utf-8") + b"\n")
+            await self.writer.drain()
+            return await asyncio.wait_for(future, timeout=timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            raise AutomationServerError(f"{method} failed: {e or 'timed out'}") from e
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def _read_loop(self):
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    message = None
+                if not isinstance(message, dict):
+                    logger.debug(f"Ignoring malformed automation server message: {line[:100]!r}")
+                    continue
+
+                if "event" in message:
+                    self._on_event(self.device_id, message["event"], message.get("params") or {})
+                    continue
+
+                future = self._pending.get(message.get("id"))
+                if future is None or future.done():
+                    continue
+                if message.get("error") is not None:
+                    future.set_exception(AutomationServerError(str(message["error"])))
+                else:
+                    future.set_result(message.get("result"))
+        except (OSError, asyncio.IncompleteReadError) as e:
+            logger.debug(f"Automation server connection to {self.device_id} lost: {e}")
+        except (ValueError, asyncio.LimitOverrunError) as e:
+            # Line longer than STREAM_LIMIT: the rest of the stream cannot be framed
+            logger.warning(f"Automation server on {self.device_id} sent an oversized message, closing: {e}")
+            self.writer.close()
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(AutomationServerError("Connection closed"))
+
+    async def close(self):
+        self._read_task.cancel()
+        try:
+            self.writer.close()
+            await self.writer.wait_closed()
+        except Exception:
+            pass
+
+
+class AutomationServerBackend:
+    """
+    Optional fast path for hierarchy dumps and selector clicks
+
+    available() connects on first use (starting the server with
+    `start_command` if configured) and remembers failures for
+    `retry_interval` seconds, so devices without a server cost one failed
+    attempt per interval and callers fall back to `uiautomator dump`.
+    """
+
+    def __init__(
+        self,
+        adb_client,
+        device_port: int = DEFAULT_DEVICE_PORT,
+        start_command: Optional[str] = None,
+        forward: bool = True,
+        host: str = "127.0.0.1",
+        connect_timeout: float = 2.0,
+        request_timeout: float = 5.0,
+        retry_interval: float = 30.0,
+    ):
+        """
+        Initialize backend
+
+        Args:
+            adb_client: AsyncADBClient (adb forward and server start)
+            device_port: TCP port the server listens on, on the device
+            start_command: Shell command starting the server in the background
+                (e.g. "CLASSPATH=/data/local/tmp/server.jar app_process / com.example.Server"),
+                None = the server is started by other means
+            forward: Reach the server through `adb forward`; False connects to
+                host:device_port directly (emulator port mapping, local stand-in server)
+            host: Host to connect to
+            connect_timeout: Seconds to wait for a connection
+            request_timeout: Seconds to wait for a response
+            retry_interval: Seconds before retrying a device the server was unavailable on
+        """
+        self.adb = adb_client
+        self.device_port = device_port
+        self.start_command = start_command
+        self.forward = forward
+        self.host = host
+        self.connect_timeout = connect_timeout
+        self.request_timeout = request_timeout
+        self.retry_interval = retry_interval
+
+        # device_id -> open connection
+        self._connections: Dict[str, _ServerConnection] = {}
+        # device_id -> when connecting last failed (monotonic)
+        self._failed_at: Dict[str, float] = {}
+        # device_id -> running connect attempt (single-flight)
+        self._connecting: Dict[str, asyncio.Task] = {}
+        self._listeners: List[Callable[[str, str, Dict], Any]] = []
+        # Running async listener calls (kept referenced until done)
+        self._listener_tasks: Set[asyncio.Task] = set()
+
+    @classmethod
+    def from_config(cls, adb_client, config: Optional[Dict]) -> Optional["AutomationServerBackend"]:
+        """Create backend from the `automation_server` config section (None if disabled)"""
+        config = config or {}
+        if not config.get("enabled"):
+            return None
+        keys = ("device_port", "start_command", "forward", "host", "connect_timeout", "request_timeout", "retry_interval")
+        return cls(adb_client, **{key: config[key] for key in keys if config.get(key) is not None})
+
+    def add_listener(self, callback: Callable[[str, str, Dict], Any]):
+        """Register callback(device_id, event, params) for server events (may be async)"""
+        self._listeners.append(callback)
+
+    async def available(self, device_id: str) -> bool:
+        """
+        Whether the server of a device is reachable (connects if needed)
+
+        Args:
+            device_id: Device ID
+
+        Returns:
+            True if requests can be sent
+        """
+        connection = self._connections.get(device_id)
+        if connection and not connection.closed:
+            return True
+
+        failed_at = self._failed_at.get(device_id)
+        if failed_at is not None and time.monotonic() - failed_at < self.retry_interval:
+            return False
+
+        task = self._connecting.get(device_id)
+        if task is None:
+            task = asyncio.create_task(self._connect(device_id))
+            self._connecting[device_id] = task
+            task.add_done_callback(lambda _: self._connecting.pop(device_id, None))
+        return await asyncio.shield(task)
+
+    async def dump_hierarchy(self, device_id: str) -> Optional[str]:
+        """
+        UI hierarchy XML (uiautomator dump format) or None if unavailable/failed
+        """
+        result = await self._request(device_id, "hierarchy")
+        xml = result.get("xml") if isinstance(result, dict) else None
+        return xml or None
+
+    async def click(self, device_id: str, resource_id: Optional[str] = None,
+                    text: Optional[str] = None, description: Optional[str] = None) -> bool:
+        """
+        Click the first element whose attributes equal the given values
+
+        Pass exact attributes of an element known to be the only one with
+        them (see mobile_click_element): the server does no fuzzy matching.
+
+        Returns:
+            True if the server clicked an element
+        """
+        params = {key: value for key, value in
+                  (("resource_id", resource_id), ("text", text), ("description", description)) if value}
+        if not params:
+            return False
+        result = await self._request(device_id, "click", params)
+        return bool(isinstance(result, dict) and result.get("clicked"))
+
+    async def forget(self, device_id: str):
+        """Drop the connection and failure record of a device (e.g. disconnected)"""
+        self._failed_at.pop(device_id, None)
+        connection = self._connections.pop(device_id, None)
+        if connection:
+            await connection.close()
+            await self._remove_forward(device_id, connection.port)
+
+    async def close(self):
+        """Close all connections"""
+        for device_id in list(self._connections):
+            await self.forget(device_id)
+
+    async def _request(self, device_id: str, method: str, params: Optional[Dict] = None) -> Any:
+        if not await self.available(device_id):
+            return None
+        try:
+            return await self._connections[device_id].request(method, params, timeout=self.request_timeout)
+        except (AutomationServerError, KeyError) as e:
+            logger.warning(f"Automation server {method} on {device_id} failed: {e}")
+            connection = self._connections.get(device_id)
+            if connection and connection.closed:
+                await self.forget(device_id)
+                self._failed_at[device_id] = time.monotonic()
+            return None
+
+    async def _connect(self, device_id: str) -> bool:
+        connection = await self._open(device_id)
+        if connection is None and self.start_command:
+            logger.info(f"Starting automation server on {device_id}")
+            await self.adb.shell(f"nohup {self.start_command} >/dev/null 2>&1 &", device_id)
+            # Give the server time to come up
+            for _ in range(10):
+                await asyncio.sleep(0.3)
+                connection = await self._open(device_id)
+                if connection is not None:
+                    break
+
+        if connection is None:
+            self._failed_at[device_id] = time.monotonic()
+            logger.debug(f"Automation server not available on {device_id}, using uiautomator dump")
+            return False
+
+        self._failed_at.pop(device_id, None)
+        self._connections[device_id] = connection
+        logger.info(f"Connected to automation server on {device_id}")
+        return True
+
+    async def _open(self, device_id: str) -> Optional[_ServerConnection]:
+        """Connect and ping; None if the server does not answer"""
+        port = await self._local_port(device_id)
+        if port is None:
+            return None
+
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, port, limit=STREAM_LIMIT),
+                timeout=self.connect_timeout,
+            )
+        except (OSError, asyncio.TimeoutError):
+            await self._remove_forward(device_id, port)
+            return None
+
+        connection = _ServerConnection(device_id, port, reader, writer, self._dispatch_event)
+        try:
+            # adb forward accepts the connection even when nothing listens on the device
+            await connection.request("ping", timeout=self.connect_timeout)
+        except AutomationServerError:
+            await connection.close()
+            await self._remove_forward(device_id, port)
+            return None
+        return connection
+
+    async def _local_port(self, device_id: str) -> Optional[int]:
+        """Local port reaching the server of a device"""
+        if not self.forward:
+            return self.device_port
+
+        stdout, stderr, returncode = await self.adb._run_command(
+            ["forward", "tcp:0", f"tcp:{self.device_port}"],
+            device_id,
+        )
+        if returncode != 0 or not stdout.strip().isdigit():
+            logger.debug(f"adb forward failed for {device_id}: {stderr.strip()}")
+            return None
+        return int(stdout.strip())
+
+    async def _remove_forward(self, device_id: str, port: int):
+        if self.forward:
+            await self.adb._run_command(["forward", "--remove", f"tcp:{port}"], device_id)
+
+    def _dispatch_event(self, device_id: str, event: str, params: Dict):
+        for callback in self._listeners:
+            try:
+                result = callback(device_id, event, params)
+                if asyncio.iscoroutine(result):
+                    task = asyncio.ensure_future(result)
+                    self._listener_tasks.add(task)
+                    task.add_done_callback(self._listener_done)
+            except Exception as e:
+                logger.error(f"Error in automation server event listener: {e}")
+
+    def _listener_done(self, task: asyncio.Task):
+        self._listener_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Error in automation server event listener: {task.exception()}")
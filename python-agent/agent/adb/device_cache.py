@@ -0,0 +1,100 @@
+"""Per-device cache of system properties and screen geometry"""
+import struct
+import threading
+import time
+import logging
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+class DeviceCache:
+    """
+    Cache of slow-changing device state shared by ADBClient and AsyncADBClient
+
+    - properties: full `getprop` dump, kept until the device reconnects
+    - geometry: screen size and orientation, dropped on rotation (detected
+      from captured frames), set_orientation, reconnect, or after a TTL
+    """
+
+    # Upper bound on geometry staleness when no frames are being captured
+    GEOMETRY_TTL = 30.0
+
+    def __init__(self, geometry_ttl: float = GEOMETRY_TTL):
+        """
+        Initialize device cache
+
+        Args:
+            geometry_ttl: Seconds before cached screen size/orientation expire
+        """
+        self.geometry_ttl = geometry_ttl
+        self._lock = threading.Lock()
+        self._properties: Dict[str, Dict[str, str]] = {}
+        # device_id -> key -> (value, stored_at)
+        self._geometry: Dict[str, Dict[str, tuple]] = {}
+        # device_id -> True if the last captured frame was landscape
+        self._frame_landscape: Dict[str, bool] = {}
+
+    def get_properties(self, device_id: str) -> Optional[Dict[str, str]]:
+        """Get cached properties or None"""
+        with self._lock:
+            return self._properties.get(device_id)
+
+    def set_properties(self, device_id: str, properties: Dict[str, str]):
+        """Store properties from a bulk getprop"""
+        with self._lock:
+            self._properties[device_id] = properties
+
+    def get_geometry(self, device_id: str, key: str) -> Optional[Any]:
+        """Get cached geometry value ("screen_size" or "orientation") or None if missing/expired"""
+        with self._lock:
+            entry = self._geometry.get(device_id, {}).get(key)
+            if entry is None:
+                return None
+            value, stored_at = entry
+            if time.monotonic() - stored_at > self.geometry_ttl:
+                del self._geometry[device_id][key]
+                return None
+            return value
+
+    def set_geometry(self, device_id: str, key: str, value: Any):
+        """Store a geometry value (None values are not cached)"""
+        if value is None:
+            return
+        with self._lock:
+            self._geometry.setdefault(device_id, {})[key] = (value, time.monotonic())
+
+    def invalidate_geometry(self, device_id: str):
+        """Drop cached screen size and orientation"""
+        with self._lock:
+            self._geometry.pop(device_id, None)
+
+    def invalidate(self, device_id: str):
+        """Drop everything cached for a device (e.g. after reconnect)"""
+        with self._lock:
+            self._properties.pop(device_id, None)
+            self._geometry.pop(device_id, None)
+            self._frame_landscape.pop(device_id, None)
+
+    def observe_frame(self, device_id: str, width: int, height: int):
+        """
+        Record the size of a captured frame; a portrait/landscape flip means the
+        device rotated, so cached geometry is dropped
+        """
+        landscape = width > height
+        with self._lock:
+            previous = self._frame_landscape.get(device_id)
+            self._frame_landscape[device_id] = landscape
+            if previous is None or previous == landscape:
+                return
+            self._geometry.pop(device_id, None)
+        logger.debug(f"Rotation detected on {device_id}, screen geometry cache invalidated")
+
+    def observe_png(self, device_id: str, png_bytes: Optional[bytes]):
+        """observe_frame() using the dimensions from a PNG header"""
+        if not png_bytes or len(png_bytes) < 24 or not png_bytes.startswith(PNG_SIGNATURE):
+            return
+        width, height = struct.unpack(">II", png_bytes[16:24])
+        self.observe_frame(device_id, width, height)
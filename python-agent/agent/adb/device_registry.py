@@ -0,0 +1,185 @@
+"""In-memory device registry fed by the adb track-devices stream"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from .adb_client import ADBClient
+from .adb_protocol import AsyncADBSocketTransport, ADBProtocolError
+
+logger = logging.getLogger(__name__)
+
+# Listener signature: listener(current, previous), both device_id -> device info
+DeviceListener = Callable[[Dict[str, Dict[str, str]], Dict[str, Dict[str, str]]], Awaitable[None]]
+
+
+class DeviceRegistry:
+    """
+    Background tracker of connected devices
+
+    Keeps the latest `adb devices -l` view in memory, updated by the adb server
+    as soon as a device connects, disconnects or changes state. Listeners are
+    awaited on every change and waiters in wait_for_device are woken up.
+    """
+
+    # Delay before reconnecting to the track-devices stream (doubles up to max)
+    RETRY_INTERVAL = 0.5
+    MAX_RETRY_INTERVAL = 5.0
+
+    def __init__(self, adb_path: str, socket_transport: Optional[AsyncADBSocketTransport] = None):
+        """
+        Initialize device registry
+
+        Args:
+            adb_path: Path to adb executable (used when the adb server socket is unavailable)
+            socket_transport: Optional async adb server transport
+        """
+        self.adb_path = adb_path
+        self._socket = socket_transport
+        self._devices: Dict[str, Dict[str, str]] = {}
+        self._ready = False
+        self._changed = asyncio.Condition()
+        self._listeners: List[DeviceListener] = []
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        """True while the registry is connected and holds a current snapshot"""
+        return self._ready
+
+    @property
+    def running(self) -> bool:
+        """True if the background tracking task is running"""
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start tracking devices (must be called from the event loop)"""
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run())
+        logger.info("Device registry started")
+
+    async def stop(self):
+        """Stop tracking devices"""
+        task, self._task = self._task, None
+        if task:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._ready = False
+
+    def add_listener(self, listener: DeviceListener):
+        """Register a coroutine called with (current, previous) on every change"""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: DeviceListener):
+        """Unregister a change listener"""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def devices(self) -> List[Dict[str, str]]:
+        """
+        Get the current device list
+
+        Returns:
+            List of device info dicts with keys: id, state, model, etc.
+        """
+        return [dict(device) for device in self._devices.values()]
+
+    def get(self, device_id: str) -> Optional[Dict[str, str]]:
+        """Get info of one device or None if it is not connected"""
+        device = self._devices.get(device_id)
+        return dict(device) if device else None
+
+    async def wait_for_device(self, device_id: Optional[str] = None, timeout: float = 30) -> bool:
+        """
+        Wait until a device is in 'device' state
+
+        Args:
+            device_id: Device ID, or None for any device
+            timeout: Timeout in seconds
+
+        Returns:
+            True if the device became available, False on timeout
+        """
+        def available() -> bool:
+            if device_id:
+                device = self._devices.get(device_id)
+                return device is not None and device["state"] == "device"
+            return any(d["state"] == "device" for d in self._devices.values())
+
+        async with self._changed:
+            try:
+                await asyncio.wait_for(self._changed.wait_for(available), timeout=timeout)
+                return True
+            except asyncio.TimeoutError:
+                return False
+
+    async def _run(self):
+        """Follow the track-devices stream, reconnecting when it drops"""
+        retry_interval = self.RETRY_INTERVAL
+        while True:
+            try:
+                async for listing in self._stream():
+                    self._ready = True
+                    retry_interval = self.RETRY_INTERVAL
+                    await self._update(ADBClient._parse_devices(listing, has_header=False))
+                logger.warning("Device tracking stream closed, reconnecting...")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Device tracking failed: {e}")
+            self._ready = False
+            await asyncio.sleep(retry_interval)
+            retry_interval = min(retry_interval * 2, self.MAX_RETRY_INTERVAL)
+
+    async def _stream(self):
+        """Yield raw device listings from the adb server (socket first, then `adb track-devices`)"""
+        if self._socket:
+            try:
+                async for listing in self._socket.track_devices():
+                    yield listing
+                return
+            except ADBProtocolError:
+                raise
+            except OSError as e:
+                logger.debug(f"adb server socket unavailable for device tracking: {e}")
+
+        process = await asyncio.create_subprocess_exec(
+            self.adb_path, "track-devices", "-l",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        try:
+            while True:
+                header = await process.stdout.readexactly(4)
+                length = int(header, 16)
+                payload = await process.stdout.readexactly(length) if length else b""
+                yield payload.decode("utf-8", errors="replace")
+        except asyncio.IncompleteReadError:
+            return
+        finally:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+
+    async def _update(self, devices: List[Dict[str, str]]):
+        """Store a new snapshot, wake waiters and notify listeners if anything changed"""
+        current = {device["id"]: device for device in devices}
+        if current == self._devices:
+            return
+
+        previous = self._devices
+        async with self._changed:
+            self._devices = current
+            self._changed.notify_all()
+
+        summary = ", ".join(f"{device_id} ({info['state']})" for device_id, info in current.items())
+        logger.info(f"Devices changed: {summary or 'none'}")
+        for listener in list(self._listeners):
+            try:
+                await listener(current, previous)
+            except Exception as e:
+                logger.error(f"Error in device listener: {e}")
@@ -0,0 +1,142 @@
+"""Raw screen frames captured with `screencap` (no PNG encoding on the device)"""
+import io
+import struct
+import time
+import logging
+from typing import Optional, Tuple
+
+from PIL import Image
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, Frame.array is unavailable without it
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Android PixelFormat values written by screencap -> (bytes per pixel, PIL mode, PIL raw mode)
+PIXEL_FORMATS = {
+    1: (4, "RGBA", "RGBA"),    # RGBA_8888
+    2: (4, "RGBA", "RGBA"),    # RGBX_8888 (alpha byte is padding)
+    3: (3, "RGB", "RGB"),      # RGB_888
+    4: (2, "RGB", "BGR;16"),   # RGB_565
+    5: (4, "RGBA", "BGRA"),    # BGRA_8888
+}
+
+# screencap header: width, height, format (+ dataspace since Android 8)
+RAW_HEADER_V1 = struct.Struct("<III")
+RAW_HEADER_V2 = struct.Struct("<IIII")
+
+
+class Frame:
+    """
+    One captured screen frame
+
+    Pixels stay in the buffer they were received in: `data` is a memoryview
+    into it, `array` is a NumPy view and `to_image()` wraps it for PIL without
+    decoding. Encode it once, at the final output format (see
+    utils.screenshot.encode_frame).
+    """
+
+    def __init__(self, width: int, height: int, pixel_format: int, data: memoryview,
+                 timestamp: Optional[float] = None):
+        """
+        Initialize frame
+
+        Args:
+            width: Width in pixels
+            height: Height in pixels
+            pixel_format: Android PixelFormat (see PIXEL_FORMATS)
+            data: Tightly packed pixel rows
+            timestamp: Capture time (time.time()), defaults to now
+        """
+        self.width = width
+        self.height = height
+        self.pixel_format = pixel_format
+        self.data = data
+        self.timestamp = timestamp if timestamp is not None else time.time()
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """(width, height)"""
+        return (self.width, self.height)
+
+    @property
+    def bytes_per_pixel(self) -> int:
+        return PIXEL_FORMATS[self.pixel_format][0]
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.data)
+
+    @property
+    def array(self):
+        """
+        Zero-copy NumPy view: (height, width, channels) uint8, or (height, width)
+        uint16 for RGB_565
+
+        Raises:
+            RuntimeError: numpy is not installed
+        """
+        if np is None:
+            raise RuntimeError("numpy is required for Frame.array")
+        if self.bytes_per_pixel == 2:
+            return np.frombuffer(self.data, dtype="<u2").reshape(self.height, self.width)
+        return np.frombuffer(self.data, dtype=np.uint8).reshape(self.height, self.width, self.bytes_per_pixel)
+
+    def to_image(self) -> Image.Image:
+        """Wrap the pixels in a PIL image (no copy for RGBA/RGBX frames)"""
+        _, mode, raw_mode = PIXEL_FORMATS[self.pixel_format]
+        return Image.frombuffer(mode, self.size, self.data, "raw", raw_mode, 0, 1)
+
+    def to_png(self) -> bytes:
+        """Encode as opaque PNG (full resolution)"""
+        output = io.BytesIO()
+        self.to_image().convert("RGB").save(output, format="PNG")
+        return output.getvalue()
+
+    @classmethod
+    def from_image(cls, image: Image.Image, timestamp: Optional[float] = None) -> "Frame":
+        """Build a frame from a PIL image (used when raw capture is unavailable)"""
+        if image.mode != "RGBA":
+            image = image.convert("RGBA")
+        return cls(image.width, image.height, 1, memoryview(image.tobytes()), timestamp)
+
+    @classmethod
+    def from_png(cls, png_bytes: bytes) -> Optional["Frame"]:
+        """Decode a PNG screenshot into a frame, or None if it is not a valid image"""
+        try:
+            return cls.from_image(Image.open(io.BytesIO(png_bytes)))
+        except Exception as e:
+            logger.error(f"Error decoding PNG screenshot: {e}")
+            return None
+
+
+def parse_raw_screencap(raw: bytes) -> Optional[Frame]:
+    """
+    Parse `screencap` output (without -p)
+
+    The header is width, height, format as little-endian uint32, followed by a
+    dataspace field on Android 8+. The header length is picked by matching the
+    payload size.
+
+    Args:
+        raw: Bytes written by screencap
+
+    Returns:
+        Frame viewing into `raw`, or None if the output is not a raw frame
+    """
+    if not raw or len(raw) < RAW_HEADER_V1.size:
+        return None
+
+    width, height, pixel_format = RAW_HEADER_V1.unpack_from(raw)
+    if pixel_format not in PIXEL_FORMATS or not width or not height:
+        return None
+
+    expected = width * height * PIXEL_FORMATS[pixel_format][0]
+    for header in (RAW_HEADER_V2, RAW_HEADER_V1):
+        if len(raw) - header.size == expected:
+            return Frame(width, height, pixel_format, memoryview(raw)[header.size:])
+
+    logger.debug(f"Unexpected raw screencap size {len(raw)} for {width}x{height} format {pixel_format}")
+    return None
@@ -0,0 +1,107 @@
+"""Shared per-device screen capture with single-flight and freshness-based reuse"""
+import asyncio
+import time
+import logging
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from .frame import Frame
+
+logger = logging.getLogger(__name__)
+
+
+class FrameProducer:
+    """
+    One capture pipeline per device shared by every consumer
+
+    - Single-flight: concurrent requests for a device share the capture that
+      is already running instead of starting another screencap.
+    - Freshness: a consumer passing max_age_ms gets the last frame if its
+      capture started less than max_age_ms ago.
+    - invalidate() marks older frames (and captures still running) as stale,
+      e.g. after an input action, so they are never handed out again.
+
+    Frames are shared between consumers and must not be modified.
+    """
+
+    def __init__(self, capture: Callable[[str], Awaitable[Optional[Frame]]]):
+        """
+        Initialize producer
+
+        Args:
+            capture: Coroutine function capturing a frame of a device
+        """
+        self._capture = capture
+        # device_id -> (capture start (monotonic), frame)
+        self._latest: Dict[str, Tuple[float, Frame]] = {}
+        # device_id -> (capture start (monotonic), task)
+        self._inflight: Dict[str, Tuple[float, asyncio.Task]] = {}
+        # device_id -> frames captured before this time are stale
+        self._not_before: Dict[str, float] = {}
+
+        self.captures = 0
+        self.shared = 0
+        self.reused = 0
+
+    async def get_frame(self, device_id: str, max_age_ms: int = 0) -> Optional[Frame]:
+        """
+        Get a frame of the device screen
+
+        Args:
+            device_id: Device ID
+            max_age_ms: Accept the last frame if its capture started at most this
+                many milliseconds ago (0 = always wait for a capture)
+
+        Returns:
+            Frame or None if capture failed
+        """
+        now = time.monotonic()
+        not_before = self._not_before.get(device_id, 0.0)
+
+        latest = self._latest.get(device_id)
+        if latest and max_age_ms > 0:
+            started_at, frame = latest
+            if started_at >= not_before and now - started_at <= max_age_ms / 1000:
+                self.reused += 1
+                return frame
+
+        inflight = self._inflight.get(device_id)
+        if inflight and inflight[0] >= not_before:
+            self.shared += 1
+            task = inflight[1]
+        else:
+            task = asyncio.create_task(self._run(device_id, now))
+            self._inflight[device_id] = (now, task)
+
+        # A cancelled consumer must not cancel the capture other consumers wait for
+        return await asyncio.shield(task)
+
+    def invalidate(self, device_id: str):
+        """Treat frames of a device captured before now as stale (screen may have changed)"""
+        self._not_before[device_id] = time.monotonic()
+
+    def forget(self, device_id: str):
+        """Drop cached state of a device (e.g. disconnected)"""
+        self._latest.pop(device_id, None)
+        self._not_before.pop(device_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        """Capture counters: started, joined an in-flight capture, served from the last frame"""
+        return {"captures": self.captures, "shared": self.shared, "reused": self.reused}
+
+    async def _run(self, device_id: str, started_at: float) -> Optional[Frame]:
+        self.captures += 1
+        try:
+            frame = await self._capture(device_id)
+        except Exception as e:
+            logger.error(f"Error capturing frame from {device_id}: {e}")
+            frame = None
+        finally:
+            inflight = self._inflight.get(device_id)
+            if inflight and inflight[1] is asyncio.current_task():
+                del self._inflight[device_id]
+
+        if frame is not None:
+            latest = self._latest.get(device_id)
+            if latest is None or latest[0] <= started_at:
+                self._latest[device_id] = (started_at, frame)
+        return frame
@@ -0,0 +1,149 @@
+"""H.264 screen video from `screenrecord --output-format=h264` over exec-out"""
+import time
+import logging
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# NAL unit types (ITU-T H.264 table 7-1)
+NAL_TYPE_IDR = 5
+NAL_TYPE_SPS = 7
+NAL_TYPE_PPS = 8
+
+START_CODE = b"\x00\x00\x00\x01"
+
+# screenrecord stops by itself after this many seconds (Android limit)
+SCREENRECORD_TIME_LIMIT = 180
+
+
+def nal_type(nal: bytes) -> int:
+    """Type of a NAL unit produced by NALSplitter (4-byte start code included)"""
+    return nal[4] & 0x1F if len(nal) > 4 else 0
+
+
+class NALSplitter:
+    """Split an Annex-B byte stream into NAL units"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        # Position to resume searching for the next start code
+        self._scan_from = 3
+
+    def feed(self, data: bytes) -> List[bytes]:
+        """
+        Add stream bytes and return the NAL units completed by them
+
+        Returns:
+            NAL units, each prefixed with a 4-byte start code
+        """
+        self._buffer += data
+        buffer = self._buffer
+
+        start = buffer.find(b"\x00\x00\x01")
+        if start < 0:
+            # No start code yet - keep only bytes that may begin one
+            del buffer[:-2]
+            self._scan_from = 3
+            return []
+
+        units = []
+        search = max(start + 3, self._scan_from)
+        while True:
+            next_start = buffer.find(b"\x00\x00\x01", search)
+            if next_start < 0:
+                break
+            unit = self._unit(start, next_start)
+            if unit:
+                units.append(unit)
+            start = next_start
+            search = start + 3
+
+        del buffer[:start]
+        # Bytes before len-2 cannot start a start code we have not seen
+        self._scan_from = max(3, len(buffer) - 2)
+        return units
+
+    def flush(self) -> Optional[bytes]:
+        """Return the last buffered NAL unit at end of stream"""
+        start = self._buffer.find(b"\x00\x00\x01")
+        unit = self._unit(start, len(self._buffer)) if start >= 0 else None
+        self._buffer = bytearray()
+        self._scan_from = 3
+        return unit
+
+    def _unit(self, start: int, end: int) -> Optional[bytes]:
+        # Zero bytes before the next start code are trailing_zero_8bits / the
+        # first byte of a 4-byte start code, not NAL payload
+        body = bytes(self._buffer[start + 3:end]).rstrip(b"\x00")
+        return START_CODE + body if body else None
+
+
+class H264ScreenStream:
+    """
+    Continuous H.264 stream of a device screen
+
+    Runs `screenrecord --output-format=h264 -` over exec-out and restarts it
+    whenever it exits (screenrecord stops at its 3-minute limit). Each restart
+    begins with fresh SPS/PPS and an IDR frame.
+    """
+
+    # Give up after this many consecutive runs that produced no video
+    MAX_FAILED_RUNS = 3
+
+    def __init__(self, adb_client, device_id: str, bit_rate: int = 4_000_000,
+                 max_size: Optional[Tuple[int, int]] = None):
+        """
+        Initialize stream
+
+        Args:
+            adb_client: AsyncADBClient instance
+            device_id: Device ID
+            bit_rate: Video bit rate in bits per second
+            max_size: Optional (width, height) to scale the video to
+        """
+        self.adb = adb_client
+        self.device_id = device_id
+        self.bit_rate = bit_rate
+        self.max_size = max_size
+        self.restarts = 0
+
+    def command(self) -> str:
+        """screenrecord command line writing raw H.264 to stdout"""
+        cmd = f"screenrecord --output-format=h264 --bit-rate {self.bit_rate} --time-limit {SCREENRECORD_TIME_LIMIT}"
+        if self.max_size:
+            cmd += f" --size {self.max_size[0]}x{self.max_size[1]}"
+        return cmd + " -"
+
+    async def nal_units(self):
+        """
+        Yield NAL units until the stream cannot be (re)started
+
+        Yields:
+            NAL units with a 4-byte start code
+        """
+        failed_runs = 0
+        while failed_runs < self.MAX_FAILED_RUNS:
+            splitter = NALSplitter()
+            produced = False
+            started_at = time.monotonic()
+
+            async for chunk in self.adb.exec_out_stream(self.device_id, self.command()):
+                for unit in splitter.feed(chunk):
+                    produced = True
+                    yield unit
+            unit = splitter.flush()
+            if unit:
+                produced = True
+                yield unit
+
+            if produced:
+                failed_runs = 0
+                self.restarts += 1
+                logger.info(
+                    f"screenrecord on {self.device_id} ended after {time.monotonic() - started_at:.0f}s, restarting"
+                )
+            else:
+                failed_runs += 1
+                logger.warning(f"screenrecord on {self.device_id} produced no video ({failed_runs}/{self.MAX_FAILED_RUNS})")
+
+        logger.error(f"H.264 streaming unavailable on {self.device_id}")
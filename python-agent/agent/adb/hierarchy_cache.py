@@ -0,0 +1,108 @@
+"""Per-device UI hierarchy cache tagged with the screen generation"""
+import asyncio
+import time
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class HierarchyCache:
+    """
+    Reuse the last UI hierarchy dump of a device while the screen is unchanged
+
+    - A cached dump is served while the device's screen generation (bumped by
+      every input action) is the one the dump started at and it is younger
+      than `ttl` seconds (the screen can also change on its own: loading,
+      animations, incoming notifications).
+    - Single-flight: concurrent requests for the same generation share the
+      dump already running.
+    - Dumps of one device never overlap (parallel `uiautomator dump` calls on
+      a device fail); a request for a newer generation waits for the running
+      dump and then starts its own.
+
+    Cached hierarchies are shared between callers and must not be modified.
+    """
+
+    def __init__(self, dump: Callable[[str], Awaitable[Any]], generation: Callable[[str], int], ttl: float = 2.0):
+        """
+        Initialize cache
+
+        Args:
+            dump: Coroutine function dumping (and parsing) the hierarchy of a device
+            generation: Returns the current generation of a device (see AsyncADBClient.content_generation)
+            ttl: Seconds a dump is reused while the generation is unchanged (0 disables reuse)
+        """
+        self._dump = dump
+        self._generation = generation
+        self.ttl = ttl
+        # device_id -> (generation, dump start (monotonic), hierarchy)
+        self._latest: Dict[str, Tuple[int, float, Any]] = {}
+        # device_id -> (generation, task)
+        self._inflight: Dict[str, Tuple[int, asyncio.Task]] = {}
+        # device_id -> lock serializing dumps
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+        self.dumps = 0
+        self.shared = 0
+        self.hits = 0
+
+    async def get(self, device_id: str, use_cache: bool = True) -> Optional[Any]:
+        """
+        Get the hierarchy of a device
+
+        Args:
+            device_id: Device ID
+            use_cache: False to ignore the cached dump (a running dump of the
+                current generation is still shared)
+
+        Returns:
+            Hierarchy or None if the dump failed
+        """
+        generation = self._generation(device_id)
+
+        latest = self._latest.get(device_id)
+        if use_cache and latest and latest[0] == generation and time.monotonic() - latest[1] <= self.ttl:
+            self.hits += 1
+            return latest[2]
+
+        inflight = self._inflight.get(device_id)
+        if inflight and inflight[0] == generation:
+            self.shared += 1
+            task = inflight[1]
+        else:
+            task = asyncio.create_task(self._run(device_id, generation))
+            self._inflight[device_id] = (generation, task)
+
+        # A cancelled caller must not cancel the dump other callers wait for
+        return await asyncio.shield(task)
+
+    def invalidate(self, device_id: str):
+        """Drop the cached dump of a device"""
+        self._latest.pop(device_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        """Dump counters: started, joined a running dump, served from cache"""
+        return {"dumps": self.dumps, "shared": self.shared, "hits": self.hits}
+
+    async def _run(self, device_id: str, generation: int) -> Optional[Any]:
+        lock = self._locks.setdefault(device_id, asyncio.Lock())
+        try:
+            async with lock:
+                self.dumps += 1
+                started_at = time.monotonic()
+                try:
+                    hierarchy = await self._dump(device_id)
+                except Exception as e:
+                    logger.error(f"Error dumping UI hierarchy of {device_id}: {e}")
+                    hierarchy = None
+        finally:
+            inflight = self._inflight.get(device_id)
+            if inflight and inflight[1] is asyncio.current_task():
+                del self._inflight[device_id]
+
+        if hierarchy is not None:
+            latest = self._latest.get(device_id)
+            if latest is None or latest[1] <= started_at:
+                self._latest[device_id] = (generation, started_at, hierarchy)
+        return hierarchy
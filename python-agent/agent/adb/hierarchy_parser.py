@@ -0,0 +1,69 @@
+"""Streaming parser turning a UI hierarchy dump into an ElementSnapshot"""
+import re
+import logging
+from typing import Optional
+
+from lxml import etree
+
+from ..utils.element_snapshot import ElementSnapshot, ElementSnapshotBuilder
+
+logger = logging.getLogger(__name__)
+
+# "[x1,y1][x2,y2]"
+BOUNDS_RE = re.compile(r"\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]")
+
+
+class _SnapshotTarget:
+    """lxml parser target: every <node> goes straight into the snapshot columns, no tree is built"""
+
+    def __init__(self):
+        self.builder = ElementSnapshotBuilder()
+        self._depth = -1
+
+    def start(self, tag, attrib):
+        if tag != "node":
+            return
+        self._depth += 1
+        get = attrib.get
+        match = BOUNDS_RE.match(get("bounds", ""))
+        self.builder.add(
+            self._depth,
+            get("class", ""),
+            get("resource-id", ""),
+            get("package", ""),
+            get("text", ""),
+            get("content-desc", ""),
+            tuple(map(int, match.groups())) if match else None,
+            get("clickable") == "true",
+            get("enabled", "true") != "false",
+            get("focusable") == "true",
+            get("scrollable") == "true",
+        )
+
+    def end(self, tag):
+        if tag == "node":
+            self._depth -= 1
+
+    def data(self, data):
+        pass
+
+    def close(self):
+        return self.builder.build()
+
+
+def parse_hierarchy_snapshot(data: bytes) -> Optional[ElementSnapshot]:
+    """
+    Parse a hierarchy dump without building an element tree
+
+    Args:
+        data: XML bytes as produced by `uiautomator dump`
+
+    Returns:
+        ElementSnapshot of all nodes in document order, or None if the XML is malformed
+    """
+    parser = etree.XMLParser(target=_SnapshotTarget(), huge_tree=True)
+    try:
+        return etree.fromstring(data, parser)
+    except etree.XMLSyntaxError as e:
+        logger.error(f"Error parsing UI hierarchy XML: {e}")
+        return None
@@ -0,0 +1,532 @@
+"""Persistent per-device shell session with sentinel framing
+
+Keeps one long-lived `sh` on the device and runs commands back-to-back on it,
+so tiny commands (input tap, getprop, wm size) don't pay process startup and
+the adb handshake every time. Each command is framed as:
+
+    ( <command>
+    ) </dev/null; __rc=$?; printf '\\n<token>\\n' >&2; printf '\\n<token>%d\\n' "$__rc"
+
+and the output of both streams is split at the per-command token.
+"""
+import re
+import asyncio
+import struct
+import subprocess
+import threading
+import time
+import uuid
+import logging
+from typing import Optional, Tuple
+
+from .adb_protocol import (
+    ADBSocketTransport,
+    AsyncADBSocketTransport,
+    SHELL_ID_STDIN,
+    SHELL_ID_STDOUT,
+    SHELL_ID_STDERR,
+    SHELL_ID_EXIT,
+)
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait before reopening a channel that failed to open
+OPEN_RETRY_INTERVAL = 30.0
+
+
+class ShellSessionError(RuntimeError):
+    """Raised when the session channel dies before a command completes"""
+
+
+def frame_command(command: str, token: str) -> bytes:
+    """
+    Wrap a command with exit-code and end-of-output sentinels
+
+    The command runs in a subshell with stdin from /dev/null so `exit`, `cd`
+    or stdin reads can't break the session.
+    """
+    return (
+        f"( {command}\n) </dev/null; __rc=$?; "
+        f"printf '\\n%s\\n' '{token}' >&2; printf '\\n%s%d\\n' '{token}' \"$__rc\"\n"
+    ).encode("utf-8")
+
+
+class _FrameParser:
+    """Incremental sentinel search over the stdout/stderr buffers"""
+
+    def __init__(self, token: str):
+        token_bytes = token.encode("ascii")
+        self.rc_pattern = re.compile(rb"\n" + re.escape(token_bytes) + rb"(-?\d+)\n")
+        self.err_marker = b"\n" + token_bytes + b"\n"
+        # Resume positions so long outputs are not rescanned on every chunk
+        self._out_pos = 0
+        self._err_pos = 0
+        self._overlap = len(token_bytes) + 16
+
+    def find(self, out: bytearray, err: bytearray):
+        """Return (rc_match, err_index) once both sentinels are present, else None"""
+        rc_match = self.rc_pattern.search(out, self._out_pos)
+        if not rc_match:
+            self._out_pos = max(0, len(out) - self._overlap)
+            return None
+
+        err_index = err.find(self.err_marker, self._err_pos)
+        if err_index < 0:
+            # Streams are merged (no shell protocol v2): stderr sentinel lands in stdout
+            if out.rfind(self.err_marker, 0, rc_match.start() + 1) >= 0:
+                return rc_match, -1
+            self._err_pos = max(0, len(err) - self._overlap)
+            return None
+        return rc_match, err_index
+
+
+def _take_frame(out: bytearray, err: bytearray, parser: _FrameParser, found) -> Tuple[bytes, bytes, int]:
+    """Cut one command's output off the front of the buffers"""
+    rc_match, err_index = found
+    returncode = int(rc_match.group(1))
+    stdout = bytes(out[:rc_match.start()])
+    del out[:rc_match.end()]
+    if err_index >= 0:
+        stderr = bytes(err[:err_index])
+        del err[:err_index + len(parser.err_marker)]
+    else:
+        # Merged streams: drop the stderr sentinel from stdout
+        marker_index = stdout.rfind(parser.err_marker)
+        stdout = stdout[:marker_index] + stdout[marker_index + len(parser.err_marker):]
+        stderr = b""
+    return stdout, stderr, returncode
+
+
+class ShellSession:
+    """Long-lived shell channel to one device"""
+
+    def __init__(self, adb_path: str, device_id: str, socket_transport: Optional[ADBSocketTransport] = None):
+        """
+        Initialize shell session (the channel is opened lazily)
+
+        Args:
+            adb_path: Path to ADB executable (used for the subprocess channel)
+            device_id: Device ID
+            socket_transport: If given, the session runs over shell,v2 on the adb server socket
+        """
+        self.adb_path = adb_path
+        self.device_id = device_id
+        self.socket_transport = socket_transport
+
+        self._lock = threading.Lock()  # One command at a time
+        self._cond = threading.Condition()
+        self._out = bytearray()
+        self._err = bytearray()
+        self._eof = True
+        self._process: Optional[subprocess.Popen] = None
+        self._sock = None
+        self._session_id = uuid.uuid4().hex[:8]
+        self._counter = 0
+        # Bumped on every (re)open so reader threads of a dead channel are ignored
+        self._generation = 0
+        # Don't retry opening a failed channel on every command
+        self._retry_at = 0.0
+
+    @property
+    def alive(self) -> bool:
+        """Whether the underlying channel is open"""
+        return not self._eof
+
+    # ========== Channel management ==========
+
+    def _open(self):
+        """Open the underlying channel and start reader threads"""
+        with self._cond:
+            self._out.clear()
+            self._err.clear()
+            self._generation += 1
+            self._eof = False
+            generation = self._generation
+
+        try:
+            self._start_channel(generation)
+        except Exception:
+            self._mark_eof(generation)
+            raise
+        logger.debug(f"Opened persistent shell session for {self.device_id}")
+
+    def _start_channel(self, generation: int):
+        """Start the subprocess or socket channel and its reader threads"""
+        if self.socket_transport:
+            # Empty command + raw = interactive sh without PTY, stdout/stderr kept separate
+            self._sock = self.socket_transport.open_device_service(self.device_id, "shell,v2,raw:")
+            # The channel idles between commands: block in the reader thread,
+            # commands are bounded by their own deadline in _run_locked
+            self._sock.settimeout(None)
+            threading.Thread(target=self._read_socket, args=(self._sock, generation), daemon=True).start()
+        else:
+            self._process = subprocess.Popen(
+                [self.adb_path, "-s", self.device_id, "shell"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                bufsize=0,
+            )
+            threading.Thread(
+                target=self._read_pipe, args=(self._process.stdout, self._out, generation), daemon=True
+            ).start()
+            threading.Thread(
+                target=self._read_pipe, args=(self._process.stderr, self._err, generation), daemon=True
+            ).start()
+
+    def _feed(self, buffer: bytearray, data: bytes, generation: int):
+        with self._cond:
+            if generation == self._generation:
+                buffer.extend(data)
+                self._cond.notify_all()
+
+    def _mark_eof(self, generation: Optional[int] = None):
+        with self._cond:
+            if generation is None or generation == self._generation:
+                self._eof = True
+                self._cond.notify_all()
+
+    def _read_pipe(self, pipe, buffer: bytearray, generation: int):
+        """Reader thread for the subprocess channel"""
+        try:
+            while True:
+                data = pipe.read(65536)
+                if not data:
+                    break
+                self._feed(buffer, data, generation)
+        except Exception as e:
+            logger.debug(f"Shell session pipe closed: {e}")
+        finally:
+            self._mark_eof(generation)
+
+    def _read_socket(self, sock, generation: int):
+        """Reader thread for the shell,v2 socket channel"""
+        try:
+            while True:
+                header = ADBSocketTransport._recv_exactly(sock, 5)
+                packet_id, length = struct.unpack("<BI", header)
+                data = ADBSocketTransport._recv_exactly(sock, length) if length else b""
+                if packet_id == SHELL_ID_STDOUT:
+                    self._feed(self._out, data, generation)
+                elif packet_id == SHELL_ID_STDERR:
+                    self._feed(self._err, data, generation)
+                elif packet_id == SHELL_ID_EXIT:
+                    break
+        except Exception as e:
+            logger.debug(f"Shell session socket closed: {e}")
+        finally:
+            self._mark_eof(generation)
+
+    def _write(self, data: bytes):
+        if self._sock is not None:
+            self._sock.sendall(struct.pack("<BI", SHELL_ID_STDIN, len(data)) + data)
+        else:
+            self._process.stdin.write(data)
+            self._process.stdin.flush()
+
+    def close(self):
+        """Close the channel (next command reopens it)"""
+        self._mark_eof()
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except Exception:
+                pass
+            self._sock = None
+        if self._process is not None:
+            try:
+                self._process.kill()
+                self._process.wait(timeout=2)
+            except Exception:
+                pass
+            self._process = None
+
+    # ========== Command execution ==========
+
+    def try_run(self, command: str, timeout: float = 30) -> Optional[Tuple[str, str, int]]:
+        """
+        Run a command if the session is idle
+
+        Args:
+            command: Shell command
+            timeout: Timeout in seconds
+
+        Returns:
+            Tuple of (stdout, stderr, return_code), or None if another command is running
+
+        Raises:
+            ShellSessionError: Channel died before the command completed
+            TimeoutError: Command did not finish in time (session is reset)
+        """
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            return self._run_locked(command, timeout)
+        finally:
+            self._lock.release()
+
+    def run(self, command: str, timeout: float = 30) -> Tuple[str, str, int]:
+        """Run a command, waiting for the session if it is busy"""
+        with self._lock:
+            return self._run_locked(command, timeout)
+
+    def _run_locked(self, command: str, timeout: float) -> Tuple[str, str, int]:
+        if self._eof:
+            self.close()
+            if time.monotonic() < self._retry_at:
+                raise ShellSessionError("Shell session recently failed to open")
+            try:
+                self._open()
+            except Exception as e:
+                self._retry_at = time.monotonic() + OPEN_RETRY_INTERVAL
+                raise ShellSessionError(f"Failed to open shell session: {e}")
+
+        self._counter += 1
+        token = f"__AGENT_SH_{self._session_id}_{self._counter}__"
+        parser = _FrameParser(token)
+
+        try:
+            self._write(frame_command(command, token))
+        except Exception as e:
+            self.close()
+            raise ShellSessionError(f"Failed to write to shell session: {e}")
+
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                found = parser.find(self._out, self._err)
+                if found:
+                    break
+                if self._eof:
+                    raise ShellSessionError("Shell session closed before command completed")
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    # Output of the stuck command would corrupt the next frame
+                    self.close()
+                    raise TimeoutError(f"Shell session command timed out: {command}")
+                self._cond.wait(remaining)
+
+            stdout, stderr, returncode = _take_frame(self._out, self._err, parser, found)
+
+        return (
+            stdout.decode("utf-8", errors="replace"),
+            stderr.decode("utf-8", errors="replace"),
+            returncode,
+        )
+
+
+class AsyncShellSession:
+    """asyncio counterpart of ShellSession (same framing, asyncio channels)"""
+
+    def __init__(self, adb_path: str, device_id: str, socket_transport: Optional[AsyncADBSocketTransport] = None):
+        """
+        Initialize async shell session (the channel is opened lazily)
+
+        Args:
+            adb_path: Path to ADB executable (used for the subprocess channel)
+            device_id: Device ID
+            socket_transport: If given, the session runs over shell,v2 on the adb server socket
+        """
+        self.adb_path = adb_path
+        self.device_id = device_id
+        self.socket_transport = socket_transport
+
+        self._lock = asyncio.Lock()  # One command at a time
+        self._cond = asyncio.Condition()
+        self._out = bytearray()
+        self._err = bytearray()
+        self._eof = True
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._readers = []
+        self._session_id = uuid.uuid4().hex[:8]
+        self._counter = 0
+        self._generation = 0
+        self._retry_at = 0.0
+
+    @property
+    def alive(self) -> bool:
+        """Whether the underlying channel is open"""
+        return not self._eof
+
+    @property
+    def busy(self) -> bool:
+        """Whether a command is currently running"""
+        return self._lock.locked()
+
+    async def _open(self):
+        """Open the underlying channel and start reader tasks"""
+        async with self._cond:
+            self._out.clear()
+            self._err.clear()
+            self._generation += 1
+            self._eof = False
+            generation = self._generation
+
+        try:
+            if self.socket_transport:
+                reader, self._writer = await self.socket_transport.open_device_service(
+                    self.device_id, "shell,v2,raw:"
+                )
+                self._readers = [asyncio.create_task(self._read_socket(reader, generation))]
+            else:
+                self._process = await asyncio.create_subprocess_exec(
+                    self.adb_path, "-s", self.device_id, "shell",
+                    stdin=asyncio.subprocess.PIPE,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                )
+                self._readers = [
+                    asyncio.create_task(self._read_stream(self._process.stdout, self._out, generation)),
+                    asyncio.create_task(self._read_stream(self._process.stderr, self._err, generation)),
+                ]
+        except BaseException:
+            await self._mark_eof(generation)
+            raise
+        logger.debug(f"Opened async persistent shell session for {self.device_id}")
+
+    async def _feed(self, buffer: bytearray, data: bytes, generation: int):
+        async with self._cond:
+            if generation == self._generation:
+                buffer.extend(data)
+                self._cond.notify_all()
+
+    async def _mark_eof(self, generation: Optional[int] = None):
+        async with self._cond:
+            if generation is None or generation == self._generation:
+                self._eof = True
+                self._cond.notify_all()
+
+    async def _read_stream(self, stream: asyncio.StreamReader, buffer: bytearray, generation: int):
+        """Reader task for the subprocess channel"""
+        try:
+            while True:
+                data = await stream.read(65536)
+                if not data:
+                    break
+                await self._feed(buffer, data, generation)
+        except Exception as e:
+            logger.debug(f"Async shell session pipe closed: {e}")
+        finally:
+            await self._mark_eof(generation)
+
+    async def _read_socket(self, reader: asyncio.StreamReader, generation: int):
+        """Reader task for the shell,v2 socket channel"""
+        try:
+            while True:
+                header = await reader.readexactly(5)
+                packet_id, length = struct.unpack("<BI", header)
+                data = await reader.readexactly(length) if length else b""
+                if packet_id == SHELL_ID_STDOUT:
+                    await self._feed(self._out, data, generation)
+                elif packet_id == SHELL_ID_STDERR:
+                    await self._feed(self._err, data, generation)
+                elif packet_id == SHELL_ID_EXIT:
+                    break
+        except Exception as e:
+            logger.debug(f"Async shell session socket closed: {e}")
+        finally:
+            await self._mark_eof(generation)
+
+    async def _write(self, data: bytes):
+        if self._writer is not None:
+            self._writer.write(struct.pack("<BI", SHELL_ID_STDIN, len(data)) + data)
+            await self._writer.drain()
+        else:
+            self._process.stdin.write(data)
+            await self._process.stdin.drain()
+
+    async def close(self):
+        """Close the channel (next command reopens it)"""
+        await self._mark_eof()
+        for task in self._readers:
+            task.cancel()
+        self._readers = []
+        if self._writer is not None:
+            try:
+                self._writer.close()
+            except Exception:
+                pass
+            self._writer = None
+        if self._process is not None:
+            try:
+                self._process.kill()
+                await asyncio.wait_for(self._process.wait(), timeout=2)
+            except Exception:
+                pass
+            self._process = None
+
+    async def try_run(self, command: str, timeout: float = 30) -> Optional[Tuple[str, str, int]]:
+        """
+        Run a command if the session is idle
+
+        Returns:
+            Tuple of (stdout, stderr, return_code), or None if another command is running
+
+        Raises:
+            ShellSessionError: Channel died before the command completed
+            TimeoutError: Command did not finish in time (session is reset)
+        """
+        if self._lock.locked():
+            return None
+        async with self._lock:
+            return await self._run_locked(command, timeout)
+
+    async def run(self, command: str, timeout: float = 30) -> Tuple[str, str, int]:
+        """Run a command, waiting for the session if it is busy"""
+        async with self._lock:
+            return await self._run_locked(command, timeout)
+
+    async def _run_locked(self, command: str, timeout: float) -> Tuple[str, str, int]:
+        if self._eof:
+            await self.close()
+            if time.monotonic() < self._retry_at:
+                raise ShellSessionError("Shell session recently failed to open")
+            try:
+                await self._open()
+            except Exception as e:
+                self._retry_at = time.monotonic() + OPEN_RETRY_INTERVAL
+                raise ShellSessionError(f"Failed to open shell session: {e}")
+
+        self._counter += 1
+        token = f"__AGENT_SH_{self._session_id}_{self._counter}__"
+        parser = _FrameParser(token)
+
+        # Until the frame is taken, the command's output and sentinels are in
+        # the buffers; if we leave early (error, timeout, caller cancelled)
+        # they would end up in the next command's output, so the session is
+        # closed instead
+        completed = False
+        try:
+            try:
+                await self._write(frame_command(command, token))
+            except Exception as e:
+                raise ShellSessionError(f"Failed to write to shell session: {e}")
+
+            deadline = time.monotonic() + timeout
+            async with self._cond:
+                while True:
+                    found = parser.find(self._out, self._err)
+                    if found:
+                        break
+                    if self._eof:
+                        raise ShellSessionError("Shell session closed before command completed")
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"Shell session command timed out: {command}")
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        pass
+
+                stdout, stderr, returncode = _take_frame(self._out, self._err, parser, found)
+                completed = True
+        finally:
+            if not completed:
+                await asyncio.shield(self.close())
+
+        return (
+            stdout.decode("utf-8", errors="replace"),
+            stderr.decode("utf-8", errors="replace"),
+            returncode,
+        )
@@ -2,56 +2,165 @@
 import tempfile
 import os
 import uuid
-from typing import Optional
+from typing import Dict, Optional
 from lxml import etree
 import logging
 
-from .adb_client import ADBClient
+from .async_adb_client import AsyncADBClient
+from .hierarchy_cache import HierarchyCache
+from .hierarchy_parser import parse_hierarchy_snapshot
+from ..utils.attribute_index import normalize_text
+from ..utils.element_snapshot import ElementSnapshot
 
 logger = logging.getLogger(__name__)
 
+# Hierarchy dump strategies in order of preference: name -> UIAutomator method
+DUMP_STRATEGIES = {
+    "exec-out-compressed": "_dump_exec_out_compressed",
+    "exec-out": "_dump_exec_out",
+    "stdout": "_dump_stdout",
+    "file": "_dump_file",
+}
+
+
+def _extract_xml(output: bytes) -> Optional[bytes]:
+    """
+    XML document from dump output (drops "UI hierchary dumped to ..." and other noise)
+
+    None if the document is not complete (no closing </hierarchy>, e.g. a
+    dump cut short), so the dump counts as failed.
+    """
+    start = output.find(b"<?xml")
+    if start < 0:
+        return None
+    end = output.rfind(b"</hierarchy>")
+    if end < start:
+        return None
+    return output[start:end + len(b"</hierarchy>")]
+
 
 class UIAutomator:
     """Wrapper for UI Automator commands"""
 
-    def __init__(self, adb_client: ADBClient):
+    def __init__(self, adb_client: AsyncADBClient, cache_ttl: float = 2.0, compressed_dump: bool = False):
         """
         Initialize UI Automator wrapper
 
         Args:
-            adb_client: ADBClient instance
+            adb_client: AsyncADBClient instance
+            cache_ttl: Seconds a hierarchy dump is reused while no input action
+                happened on the device (0 = dump every time)
+            compressed_dump: Prefer `uiautomator dump --compressed` (smaller and faster,
+                but leaves out layout containers not important for accessibility,
+                with their resource ids, from every element lookup)
         """
         self.adb = adb_client
         self.use_accessibility = True  # Use uiautomator dump (accessibility service via ADB shell)
-
-    def dump_hierarchy(self, device_id: str) -> Optional[str]:
+        self.compressed_dump = compressed_dump
+        # device_id -> name of the dump strategy that last worked
+        self._dump_strategies: Dict[str, str] = {}
+        # Parsed hierarchies (ElementSnapshot) per device, invalidated by input
+        # actions and content updates (content generation)
+        self.cache = HierarchyCache(self._dump_and_parse, adb_client.content_generation, ttl=cache_ttl)
+
+    async def dump_hierarchy(self, device_id: str) -> Optional[str]:
         """
         Dump UI hierarchy to XML string
 
-        Tries multiple approaches:
-        1. Direct stdout dump (if supported)
-        2. Dump to /sdcard/ then cat (most reliable)
-        3. Dump to /data/local/tmp/ then cat (fallback)
-
         Args:
             device_id: Device ID
 
         Returns:
             XML string of UI hierarchy or None
         """
-        # Method 1: Try direct stdout dump (may not work on all devices)
-        try:
-            stdout, stderr, returncode = self.adb.shell(
-                "uiautomator dump /dev/stdout 2>/dev/null",
-                device_id
-            )
-            if returncode == 0 and stdout and stdout.strip().startswith('<?xml'):
-                logger.debug("Successfully dumped UI hierarchy via stdout")
-                return stdout
-        except Exception as e:
-            logger.debug(f"Direct stdout dump not supported: {e}")
+        xml_bytes = await self.dump_hierarchy_bytes(device_id)
+        return xml_bytes.decode("utf-8", errors="replace") if xml_bytes else None
+
+    async def dump_hierarchy_bytes(self, device_id: str) -> Optional[bytes]:
+        """
+        Dump UI hierarchy to XML bytes (as produced on the device, not decoded)
+
+        Uses the on-device automation server when one is available, otherwise
+        uiautomator dump strategies, cheapest first (see DUMP_STRATEGIES):
+        1. "exec-out-compressed": dump --compressed, cat and rm in one exec-out round trip
+           (only with compressed_dump)
+        2. "exec-out": the same without --compressed
+        3. "stdout": dump straight to /dev/stdout (not supported on all devices)
+        4. "file": dump to /sdcard/ or /data/local/tmp/, then cat and rm (most compatible)
+
+        The strategy that worked is remembered per device and tried first next
+        time; the others are only tried when it stops working.
+
+        Args:
+            device_id: Device ID
+
+        Returns:
+            XML bytes of UI hierarchy or None
+        """
+        # On-device automation server: no instrumentation start per dump
+        server = self.adb.automation_server
+        if server and await server.available(device_id):
+            xml_content = await server.dump_hierarchy(device_id)
+            if xml_content:
+                return xml_content.encode("utf-8")
+            logger.debug(f"Automation server dump failed on {device_id}, using uiautomator dump")
+
+        strategies = [name for name in DUMP_STRATEGIES if self.compressed_dump or name != "exec-out-compressed"]
+        remembered = self._dump_strategies.get(device_id)
+        if remembered in strategies:
+            strategies.remove(remembered)
+            strategies.insert(0, remembered)
+
+        for name in strategies:
+            try:
+                xml_content = await getattr(self, DUMP_STRATEGIES[name])(device_id)
+            except Exception as e:
+                logger.warning(f"UI dump strategy {name} failed: {e}")
+                xml_content = None
+
+            if xml_content:
+                if remembered != name:
+                    logger.debug(f"Using UI dump strategy {name} for {device_id}")
+                    self._dump_strategies[device_id] = name
+                return xml_content
 
-        # Method 2: Dump to file then cat (more reliable)
+            if name == remembered:
+                logger.info(f"UI dump strategy {name} stopped working for {device_id}, trying others")
+                self._dump_strategies.pop(device_id, None)
+
+        # All methods failed
+        logger.error("Failed to dump UI hierarchy: All methods failed")
+        return None
+
+    async def _dump_exec_out(self, device_id: str, compressed: bool = False) -> Optional[bytes]:
+        """Dump, stream and delete the dump file with one exec-out command"""
+        path = f"/data/local/tmp/ui_dump_{str(uuid.uuid4())[:8]}.xml"
+        option = " --compressed" if compressed else ""
+        output = await self.adb.exec_out(
+            device_id,
+            f"uiautomator dump{option} {path} >/dev/null 2>&1 && cat {path}; rm -f {path}",
+            timeout=15,
+        )
+        if not output:
+            return None
+        return _extract_xml(output)
+
+    async def _dump_exec_out_compressed(self, device_id: str) -> Optional[bytes]:
+        """Compressed dump (only views important for accessibility) in one round trip"""
+        return await self._dump_exec_out(device_id, compressed=True)
+
+    async def _dump_stdout(self, device_id: str) -> Optional[bytes]:
+        """Dump straight to stdout"""
+        stdout, stderr, returncode = await self.adb.shell(
+            "uiautomator dump /dev/stdout 2>/dev/null",
+            device_id
+        )
+        if returncode == 0 and stdout:
+            return _extract_xml(stdout.encode("utf-8"))
+        return None
+
+    async def _dump_file(self, device_id: str) -> Optional[bytes]:
+        """Dump to a file, then cat and rm (separate round trips)"""
         unique_id = str(uuid.uuid4())[:8]
         device_tmp_paths = [
             f"/sdcard/ui_dump_{unique_id}.xml",
@@ -61,7 +170,7 @@ class UIAutomator:
         for device_tmp_path in device_tmp_paths:
             try:
                 # Step 1: Dump UI hierarchy to file on device
-                stdout, stderr, returncode = self.adb.shell(
+                stdout, stderr, returncode = await self.adb.shell(
                     f"uiautomator dump {device_tmp_path}",
                     device_id
                 )
@@ -71,42 +180,55 @@ class UIAutomator:
                     continue
 
                 # Step 2: Read file content directly via shell (cat) - no need to pull to local
-                stdout, stderr, returncode = self.adb.shell(
+                stdout, stderr, returncode = await self.adb.shell(
                     f"cat {device_tmp_path}",
                     device_id
                 )
 
-                if returncode == 0 and stdout and stdout.strip().startswith('<?xml'):
-                    xml_content = stdout
-
-                    # Step 3: Clean up device file (best effort)
-                    try:
-                        self.adb.shell(f"rm {device_tmp_path}", device_id)
-                    except:
-                        pass
+                # Step 3: Clean up device file (best effort)
+                try:
+                    await self.adb.shell(f"rm {device_tmp_path}", device_id)
+                except:
+                    pass
 
+                xml_content = _extract_xml(stdout.encode("utf-8")) if returncode == 0 and stdout else None
+                if xml_content:
                     logger.debug(f"Successfully dumped UI hierarchy via {device_tmp_path}")
                     return xml_content
-                else:
-                    logger.warning(f"Failed to read UI hierarchy file: {stderr}")
-                    # Try to clean up device file
-                    try:
-                        self.adb.shell(f"rm {device_tmp_path}", device_id)
-                    except:
-                        pass
-                    continue
+                logger.warning(f"Failed to read UI hierarchy file: {stderr}")
 
             except Exception as e:
                 logger.warning(f"Error with path {device_tmp_path}: {e}")
                 continue
 
-        # All methods failed
-        logger.error("Failed to dump UI hierarchy: All methods failed")
         return None
 
-    def get_hierarchy_xml(self, device_id: str) -> Optional[etree.Element]:
+    async def get_snapshot(self, device_id: str, interactive_only: bool = False,
+                           use_cache: bool = True) -> Optional[ElementSnapshot]:
+        """
+        Get UI hierarchy as an ElementSnapshot (no dicts are built)
+
+        The last dump is reused while no input action happened on the device
+        and it is younger than the cache TTL; concurrent calls share one dump.
+
+        Args:
+            device_id: Device ID
+            interactive_only: Only elements that can be interacted with (see list_all_elements)
+            use_cache: False to force a new dump
+
+        Returns:
+            ElementSnapshot of elements with a class (immutable, shared) or None
+        """
+        snapshot = await self.cache.get(device_id, use_cache=use_cache)
+        if snapshot is None:
+            return None
+        return snapshot.filter(interactive_only=interactive_only)
+
+    async def get_hierarchy_xml(self, device_id: str) -> Optional[etree.Element]:
         """
-        Get UI hierarchy as parsed XML element
+        Get UI hierarchy as parsed XML element tree (new dump, not cached)
+
+        Prefer get_snapshot(): it is cached and does not build a tree.
 
         Args:
             device_id: Device ID
@@ -114,195 +236,126 @@ class UIAutomator:
         Returns:
             Parsed XML element tree or None
         """
-        xml_string = self.dump_hierarchy(device_id)
-        if not xml_string:
+        xml_bytes = await self.dump_hierarchy_bytes(device_id)
+        if not xml_bytes:
             return None
 
         try:
             # Parse XML
-            root = etree.fromstring(xml_string.encode('utf-8'))
-            return root
+            return etree.fromstring(xml_bytes, etree.XMLParser(huge_tree=True))
         except Exception as e:
             logger.error(f"Error parsing UI hierarchy XML: {e}")
             return None
 
-    def find_element_by_resource_id(self, device_id: str, resource_id: str) -> Optional[dict]:
+    async def _dump_and_parse(self, device_id: str) -> Optional[ElementSnapshot]:
+        """Dump and parse the UI hierarchy into a snapshot of all nodes (uncached)"""
+        xml_bytes = await self.dump_hierarchy_bytes(device_id)
+        if not xml_bytes:
+            return None
+        return parse_hierarchy_snapshot(xml_bytes)
+
+    async def find_element_by_resource_id(self, device_id: str, resource_id: str,
+                                          snapshot: Optional[ElementSnapshot] = None) -> Optional[dict]:
         """
         Find element by resource ID
 
         Args:
             device_id: Device ID
             resource_id: Resource ID to find
+            snapshot: Search this snapshot instead of the current hierarchy
 
         Returns:
             Element info dict or None
         """
-        root = self.get_hierarchy_xml(device_id)
-        if root is None:
+        snapshot = snapshot if snapshot is not None else await self.get_snapshot(device_id)
+        if snapshot is None:
             return None
 
-        # Search for element with matching resource-id
-        for elem in root.iter():
-            if elem.get('resource-id') == resource_id:
-                return self._element_to_dict(elem)
+        rows = snapshot.attribute_index().with_resource_id(resource_id)
+        return snapshot.element(rows[0]) if rows else None
 
-        return None
-
-    def find_element_by_text(self, device_id: str, text: str, exact: bool = False) -> Optional[dict]:
+    async def find_element_by_text(self, device_id: str, text: str, exact: bool = False,
+                                   snapshot: Optional[ElementSnapshot] = None) -> Optional[dict]:
         """
         Find element by text
 
         Args:
             device_id: Device ID
             text: Text to find
-            exact: If True, exact match. If False, partial match.
+            exact: If True, exact match. If False, partial match ignoring case and diacritics.
+            snapshot: Search this snapshot instead of the current hierarchy
 
         Returns:
             Element info dict or None
         """
-        root = self.get_hierarchy_xml(device_id)
-        if root is None:
+        snapshot = snapshot if snapshot is not None else await self.get_snapshot(device_id)
+        if snapshot is None:
             return None
 
-        text_lower = text.lower()
-
-        # Search for element with matching text
-        for elem in root.iter():
-            elem_text = elem.get('text', '')
-            elem_content_desc = elem.get('content-desc', '')
+        index = snapshot.attribute_index()
+        key = normalize_text(text)
+        if exact:
+            # Normalized keys narrow the search, the raw values decide
+            rows = [row for row in index.text.equal(key) if snapshot.text(row) == text]
+            rows += [row for row in index.desc.equal(key) if snapshot.content_desc(row) == text]
+        else:
+            rows = index.text.containing(key) + index.desc.containing(key)
 
-            if exact:
-                if elem_text == text or elem_content_desc == text:
-                    return self._element_to_dict(elem)
-            else:
-                if text_lower in elem_text.lower() or text_lower in elem_content_desc.lower():
-                    return self._element_to_dict(elem)
+        return snapshot.element(min(rows)) if rows else None
 
-        return None
-
-    def find_element_by_description(self, device_id: str, description: str, exact: bool = False) -> Optional[dict]:
+    async def find_element_by_description(self, device_id: str, description: str, exact: bool = False,
+                                          snapshot: Optional[ElementSnapshot] = None) -> Optional[dict]:
         """
         Find element by content description
 
         Args:
             device_id: Device ID
             description: Content description to find
-            exact: If True, exact match. If False, partial match.
+            exact: If True, exact match. If False, partial match ignoring case and diacritics.
+            snapshot: Search this snapshot instead of the current hierarchy
 
         Returns:
             Element info dict or None
         """
-        root = self.get_hierarchy_xml(device_id)
-        if root is None:
+        snapshot = snapshot if snapshot is not None else await self.get_snapshot(device_id)
+        if snapshot is None:
             return None
 
-        desc_lower = description.lower()
-
-        # Search for element with matching content-desc
-        for elem in root.iter():
-            elem_desc = elem.get('content-desc', '')
+        index = snapshot.attribute_index()
+        key = normalize_text(description)
+        if exact:
+            rows = [row for row in index.desc.equal(key) if snapshot.content_desc(row) == description]
+        else:
+            rows = index.desc.containing(key)
 
-            if exact:
-                if elem_desc == description:
-                    return self._element_to_dict(elem)
-            else:
-                if desc_lower in elem_desc.lower():
-                    return self._element_to_dict(elem)
+        return snapshot.element(rows[0]) if rows else None
 
-        return None
-
-    def find_elements_by_class(self, device_id: str, class_name: str) -> list:
+    async def find_elements_by_class(self, device_id: str, class_name: str,
+                                     snapshot: Optional[ElementSnapshot] = None) -> list:
         """
         Find all elements by class name
 
         Args:
             device_id: Device ID
             class_name: Class name (e.g., 'android.widget.Button')
+            snapshot: Search this snapshot instead of the current hierarchy
 
         Returns:
             List of element info dicts
         """
-        root = self.get_hierarchy_xml(device_id)
-        if root is None:
+        snapshot = snapshot if snapshot is not None else await self.get_snapshot(device_id)
+        if snapshot is None:
             return []
 
-        elements = []
-        for elem in root.iter():
-            if elem.get('class') == class_name:
-                elements.append(self._element_to_dict(elem))
-
-        return elements
+        return [snapshot.element(row) for row in snapshot.attribute_index().with_class(class_name)]
 
-    def _element_to_dict(self, elem: etree.Element) -> dict:
-        """
-        Convert XML element to dict
-
-        Args:
-            elem: XML element
-
-        Returns:
-            Element info dict
-        """
-        bounds = elem.get('bounds', '')
-        x1, y1, x2, y2 = self._parse_bounds(bounds)
-
-        return {
-            'class': elem.get('class', ''),
-            'resource_id': elem.get('resource-id', ''),
-            'text': elem.get('text', ''),
-            'content_desc': elem.get('content-desc', ''),
-            'package': elem.get('package', ''),
-            'bounds': bounds,
-            'x1': x1,
-            'y1': y1,
-            'x2': x2,
-            'y2': y2,
-            'center_x': (x1 + x2) // 2 if x1 and x2 else None,
-            'center_y': (y1 + y2) // 2 if y1 and y2 else None,
-            'clickable': elem.get('clickable', 'false').lower() == 'true',
-            'enabled': elem.get('enabled', 'true').lower() == 'true',
-            'focusable': elem.get('focusable', 'false').lower() == 'true',
-        }
-
-    @staticmethod
-    def _parse_bounds(bounds_str: str) -> tuple:
-        """
-        Parse bounds string like "[x1,y1][x2,y2]" to coordinates
-
-        Args:
-            bounds_str: Bounds string
-
-        Returns:
-            Tuple of (x1, y1, x2, y2)
-        """
-        try:
-            # Format: [x1,y1][x2,y2]
-            bounds_str = bounds_str.strip()
-            if not bounds_str.startswith('[') or ']' not in bounds_str:
-                return (None, None, None, None)
-
-            # Split into two parts
-            parts = bounds_str.split('][')
-            if len(parts) != 2:
-                return (None, None, None, None)
-
-            # Parse first coordinate [x1,y1
-            part1 = parts[0].replace('[', '').replace(']', '')
-            x1, y1 = map(int, part1.split(','))
-
-            # Parse second coordinate x2,y2]
-            part2 = parts[1].replace('[', '').replace(']', '')
-            x2, y2 = map(int, part2.split(','))
-
-            return (x1, y1, x2, y2)
-        except Exception as e:
-            logger.error(f"Error parsing bounds '{bounds_str}': {e}")
-            return (None, None, None, None)
-
-    def list_all_elements(self, device_id: str, interactive_only: bool = True) -> list:
+    async def list_all_elements(self, device_id: str, interactive_only: bool = True) -> list:
         """
         List elements in UI hierarchy - uses accessibility service if available, otherwise uiautomator dump
 
+        Builds one dict per element; tools that only search the hierarchy
+        should use get_snapshot() instead.
+
         Args:
             device_id: Device ID
             interactive_only: If True, only return elements that can be interacted with
@@ -312,39 +365,7 @@ class UIAutomator:
             List of element info dicts (filtered to interactive elements if interactive_only=True)
         """
         # Use uiautomator dump (accessibility service via ADB shell - không cần cài app)
-        root = self.get_hierarchy_xml(device_id)
-        if root is None:
+        snapshot = await self.get_snapshot(device_id, interactive_only=interactive_only)
+        if snapshot is None:
             return []
-
-        elements = []
-        for elem in root.iter():
-            # Skip root node if it's just a container
-            if elem.tag == 'hierarchy':
-                continue
-
-            element_dict = self._element_to_dict(elem)
-
-            # Only include elements with class
-            if not element_dict['class']:
-                continue
-
-            # Filter: Only include interactive elements if interactive_only=True
-            if interactive_only:
-                # Element is interactive if it's clickable, enabled, or focusable
-                is_interactive = (
-                    element_dict.get('clickable', False) or
-                    element_dict.get('focusable', False) or
-                    element_dict.get('enabled', True)  # Enabled elements can be interacted with
-                )
-
-                # Also include elements with text or content_desc (likely interactive)
-                has_text = bool(element_dict.get('text', '').strip())
-                has_desc = bool(element_dict.get('content_desc', '').strip())
-
-                if not (is_interactive or has_text or has_desc):
-                    continue
-
-            elements.append(element_dict)
-
-        return elements
-
+        return snapshot.to_dicts()
@@ -19,7 +19,7 @@ try:
 except ImportError:
     raise ImportError("openai package not installed. Run: pip install openai")
 
-from .adb.adb_client import ADBClient
+from .adb.async_adb_client import AsyncADBClient
 from .adb.uiautomator import UIAutomator
 from .tools.device_tools import create_device_tools
 from .tools.screen_tools import create_screen_tools
@@ -28,13 +28,16 @@ from .tools.app_tools import create_app_tools
 
 logger = logging.getLogger(__name__)
 
+# Tools whose calls start a new "observe, then act" plan step
+SCREENSHOT_TOOLS = ("mobile_take_screenshot", "mobile_take_marked_screenshot", "mobile_observe")
+
 
 class MobileAgent:
     """Mobile agent with OpenAI Agents SDK"""
 
     def __init__(
         self,
-        adb_client: ADBClient,
+        adb_client: AsyncADBClient,
         ui_automator: UIAutomator,
         on_tool_started: Optional[Callable] = None,
         on_tool_completed: Optional[Callable] = None,
@@ -49,7 +52,7 @@ class MobileAgent:
         Initialize mobile agent
 
         Args:
-            adb_client: ADB client instance
+            adb_client: AsyncADBClient instance
             ui_automator: UI Automator instance
             on_tool_started: Callback when tool starts
             on_tool_completed: Callback when tool completes
@@ -277,10 +280,13 @@ For each post:
 
 ### 6. Tool Usage:
 
+- `mobile_observe`: Screenshot + interactive elements + foreground app in one call - Prefer this to see current state
 - `mobile_take_screenshot`: Returns file_id (saves tokens) - Use this to see current state
+- `mobile_take_marked_screenshot`: Screenshot with numbered boxes on interactive elements plus a legend - then click with `mark=<number>`
 - `mobile_list_elements_on_screen`: Get all clickable elements to find what you need
-- `mobile_click_element`: Click elements by text, resource_id, description, or class
+- `mobile_click_element`: Click elements by text, resource_id, description, class, or mark
 - `mobile_swipe_element`: Scroll by swiping between elements or in directions
+- `mobile_type_keys`: Type into the focused field, or pass `label="Email"` to tap the field next to that label first
 - `mobile_list_apps`: Find apps by name
 - `mobile_launch_app`: Open apps by package name
 - `mobile_wait_for_device`: Wait for device to be ready
@@ -595,12 +601,12 @@ Remember: You are an intelligent agent. Think, reason, adapt, and solve problems
             args_dict = self._parse_arguments(tc_args)
 
             # Group screenshot + action pairs together
-            if tc_name == "mobile_take_screenshot":
+            if tc_name in SCREENSHOT_TOOLS:
                 # Start new group with screenshot
                 if current_group:
                     tool_groups.append(current_group)
                 current_group = [tc]
-            elif current_group and current_group[0].get("function", {}).get("name") == "mobile_take_screenshot":
+            elif current_group and current_group[0].get("function", {}).get("name") in SCREENSHOT_TOOLS:
                 # Add action to screenshot group
                 current_group.append(tc)
             else:
@@ -0,0 +1,124 @@
+"""Per-client outgoing mailbox for screen stream frames"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+Message = Union[bytes, str]
+
+
+class FrameMailbox:
+    """
+    Decouples frame capture from a client's send speed
+
+    A background task sends whatever is in the mailbox to the client, so a
+    slow viewer never holds up capture or other viewers.
+
+    - put_latest(): single slot, a newer image replaces an unsent one
+      (counted as dropped)
+    - put_ordered(): ordered queue for H.264 NAL units, which cannot be
+      skipped individually; when the backlog exceeds max_backlog_bytes it is
+      dropped as a whole and `primed` is cleared so the producer restarts
+      the client from the last keyframe
+
+    `primed`, `last_keyframe`, `last_frame` and `frame_size` are producer
+    bookkeeping: whether the client has been given a complete picture it can
+    apply updates to, when, and at what size. `latency` is a moving average
+    of the time from put_latest() to the frame being sent.
+    """
+
+    def __init__(self, websocket, max_backlog_bytes: int = 4 * 1024 * 1024):
+        """
+        Initialize mailbox and start its sender task
+
+        Args:
+            websocket: Client connection
+            max_backlog_bytes: Ordered backlog size that triggers a resync
+        """
+        self.websocket = websocket
+        self.max_backlog_bytes = max_backlog_bytes
+        self._latest: Optional[Message] = None
+        self._ordered = deque()
+        self._ordered_bytes = 0
+        self._wakeup = asyncio.Event()
+
+        self.sent = 0
+        self.dropped = 0
+        self.failed = False
+        self.primed = False
+        self.last_keyframe = 0.0
+        self.last_frame = 0.0
+        self.frame_size = None
+        self.latency = 0.0
+        self._latest_queued_at = 0.0
+
+        self._task = asyncio.create_task(self._run())
+
+    @property
+    def has_pending(self) -> bool:
+        """True if a put_latest() frame has not been sent yet"""
+        return self._latest is not None
+
+    def put_latest(self, message: Message):
+        """Queue a frame, replacing any frame the client has not received yet"""
+        if self._latest is not None:
+            self.dropped += 1
+        self._latest = message
+        self._latest_queued_at = time.monotonic()
+        self._wakeup.set()
+
+    def put_ordered(self, messages: List[Message]):
+        """Queue frames that must be delivered in order"""
+        for message in messages:
+            self._ordered.append(message)
+            self._ordered_bytes += len(message)
+
+        if self._ordered_bytes > self.max_backlog_bytes:
+            self.dropped += len(self._ordered)
+            self._ordered.clear()
+            self._ordered_bytes = 0
+            self.primed = False
+            return
+        self._wakeup.set()
+
+    def stats(self) -> dict:
+        """Sent/dropped frame counters and send latency"""
+        return {"sent": self.sent, "dropped": self.dropped, "latency_ms": round(self.latency * 1000, 1)}
+
+    async def close(self):
+        """Stop the sender task and discard pending frames"""
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._latest = None
+        self._ordered.clear()
+        self._ordered_bytes = 0
+
+    async def _run(self):
+        try:
+            while True:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+
+                while self._ordered:
+                    message = self._ordered.popleft()
+                    self._ordered_bytes -= len(message)
+                    await self.websocket.send(message)
+                    self.sent += 1
+
+                message, self._latest = self._latest, None
+                if message is not None:
+                    queued_at = self._latest_queued_at
+                    await self.websocket.send(message)
+                    self.sent += 1
+                    self.latency += 0.3 * (time.monotonic() - queued_at - self.latency)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Error sending screen frame to client: {e}")
+            self.failed = True
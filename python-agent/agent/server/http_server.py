@@ -10,9 +10,10 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.types import Message
 import uvicorn
 
-from ..adb.adb_client import ADBClient
+from ..adb.async_adb_client import AsyncADBClient
 from ..adb.uiautomator import UIAutomator
 from ..agent import MobileAgent
+from ..tools.screen_tools import screenshot_upload_cache
 from .websocket_server import WebSocketServer
 
 logger = logging.getLogger(__name__)
@@ -72,7 +73,7 @@ class HTTPServer:
 
     def __init__(
         self,
-        adb_client: ADBClient,
+        adb_client: AsyncADBClient,
         ui_automator: UIAutomator,
         ws_server: WebSocketServer,
         host: str = "127.0.0.1",
@@ -136,8 +137,12 @@ class HTTPServer:
         )
 
         # If tool is mobile_take_screenshot and result has file_id or image_url, also send screenshot event
-        if tool == "mobile_take_screenshot" and success and result:
+        if tool in ("mobile_take_screenshot", "mobile_take_marked_screenshot", "mobile_observe") and success and result:
             try:
+                # Marked screenshots and observations return [text, image]
+                if isinstance(result, (list, tuple)):
+                    result = next((item for item in result if hasattr(item, "file_id")), None)
+
                 # Extract file_id/image_url and device_id from result
                 # Result can be ToolOutputImage object (from SDK) or dict (for backward compatibility)
                 file_id = None
@@ -199,7 +204,7 @@ class HTTPServer:
         async def get_devices():
             """Get list of devices"""
             try:
-                devices = self.adb_client.devices()
+                devices = await self.adb_client.devices()
                 formatted_devices = []
                 for d in devices:
                     if d["state"] == "device":
@@ -222,12 +227,13 @@ class HTTPServer:
                 raise HTTPException(status_code=500, detail=str(e))
 
         @self.app.get("/api/devices/{device_id}/screen")
-        async def get_screen(device_id: str):
-            """Get screenshot"""
+        async def get_screen(device_id: str, max_age_ms: int = 250):
+            """Get screenshot (may reuse a frame captured up to max_age_ms ago)"""
             try:
-                screenshot_bytes = self.adb_client.screencap(device_id)
-                if not screenshot_bytes:
+                frame = await self.adb_client.get_frame(device_id, max_age_ms=max_age_ms)
+                if not frame:
                     raise HTTPException(status_code=500, detail="Failed to capture screenshot")
+                screenshot_bytes = await asyncio.to_thread(frame.to_png)
 
                 from fastapi.responses import Response
                 return Response(content=screenshot_bytes, media_type="image/png")
@@ -239,7 +245,7 @@ class HTTPServer:
         async def click(device_id: str, request: ClickRequest):
             """Click at coordinates (legacy)"""
             try:
-                success = self.adb_client.input_tap(device_id, request.x, request.y)
+                success = await self.adb_client.input_tap(device_id, request.x, request.y)
                 return {"success": success}
             except Exception as e:
                 logger.error(f"Error clicking: {e}")
@@ -249,7 +255,7 @@ class HTTPServer:
         async def swipe(device_id: str, request: SwipeRequest):
             """Swipe (legacy)"""
             try:
-                success = self.adb_client.input_swipe(
+                success = await self.adb_client.input_swipe(
                     device_id,
                     request.x1,
                     request.y1,
@@ -266,7 +272,7 @@ class HTTPServer:
         async def type_text(device_id: str, request: TypeRequest):
             """Type text (legacy)"""
             try:
-                success = self.adb_client.input_text(device_id, request.text)
+                success = await self.adb_client.input_text(device_id, request.text)
                 return {"success": success}
             except Exception as e:
                 logger.error(f"Error typing: {e}")
@@ -276,12 +282,30 @@ class HTTPServer:
         async def press_key(device_id: str, request: KeyRequest):
             """Press key (legacy)"""
             try:
-                success = self.adb_client.input_key(device_id, request.key)
+                success = await self.adb_client.input_key(device_id, request.key)
                 return {"success": success}
             except Exception as e:
                 logger.error(f"Error pressing key: {e}")
                 raise HTTPException(status_code=500, detail=str(e))
 
+        @self.app.get("/api/stream/stats")
+        async def get_stream_stats():
+            """Per-client frame counters and adaptive settings of active screen streams"""
+            return {
+                "success": True,
+                "streams": self.ws_server.get_stream_stats(),
+            }
+
+        @self.app.get("/api/cache/stats")
+        async def get_cache_stats():
+            """Counters of the screen capture, UI hierarchy and screenshot upload caches"""
+            return {
+                "success": True,
+                "frames": self.adb_client.frames.stats(),
+                "hierarchy": self.ui_automator.cache.stats(),
+                "uploads": screenshot_upload_cache.stats(),
+            }
+
         @self.app.post("/api/ai/chat")
         async def chat(request: ChatRequest, background_tasks: BackgroundTasks):
             """Chat endpoint"""
@@ -463,6 +487,16 @@ class HTTPServer:
                         "description": "Take a screenshot of the mobile device. Uploads to OpenAI Files API and returns file_id to save tokens.",
                         "category": "screen"
                     },
+                    {
+                        "name": "mobile_observe",
+                        "description": "Observe the screen in one call: screenshot (file_id), interactive elements and foreground app, captured concurrently.",
+                        "category": "screen"
+                    },
+                    {
+                        "name": "mobile_take_marked_screenshot",
+                        "description": "Take a screenshot with numbered boxes on interactive elements and a legend mapping each number to its element. Click by mark with mobile_click_element(mark=N).",
+                        "category": "screen"
+                    },
                     {
                         "name": "mobile_list_elements_on_screen",
                         "description": "List all UI elements on screen with their properties (text, resource-id, bounds, etc.). Use this to find elements before interacting with them.",
@@ -470,7 +504,7 @@ class HTTPServer:
                     },
                     {
                         "name": "mobile_click_element",
-                        "description": "Click on an element on the screen. Finds element by resource-id, text, or description. Always use this instead of coordinates.",
+                        "description": "Click on an element on the screen. Finds element by resource-id, text, description, or mark id from a marked screenshot. Always use this instead of coordinates.",
                         "category": "interaction"
                     },
                     {
@@ -490,7 +524,7 @@ class HTTPServer:
                     },
                     {
                         "name": "mobile_type_keys",
-                        "description": "Type text into the focused element.",
+                        "description": "Type text into the focused element, or into the input field next to a label.",
                         "category": "interaction"
                     },
                     {
@@ -0,0 +1,193 @@
+"""Adaptive frame rate, resolution and quality for screenshot streams"""
+import time
+import logging
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StreamController:
+    """
+    Adapts a device's screenshot stream to what the host and viewers can sustain
+
+    Measurements:
+    - capture and encode time per frame (moving averages)
+    - per-client send latency and whether the previous frame was still
+      queued when the next one arrived (FrameMailbox)
+
+    Decisions, at most once per ADJUST_INTERVAL:
+    - fps is capped so capture + encode use at most MAX_BUSY_RATIO of each
+      frame interval, leaving the CPU idle the rest of the time
+    - when a client falls behind: lower quality, then resolution, then fps
+    - after RECOVER_AFTER intervals without congestion: raise them again
+      in the reverse order
+
+    Everything stays within the bounds given to the constructor.
+    """
+
+    ADJUST_INTERVAL = 1.0
+    RECOVER_AFTER = 3
+    MAX_BUSY_RATIO = 0.75
+    MAX_SEND_LATENCY = 0.25
+    QUALITY_STEP = 10
+    SCALE_STEP = 0.125
+    # Weight of the newest sample in moving averages
+    SMOOTHING = 0.3
+
+    def __init__(
+        self,
+        min_fps: float = 2,
+        max_fps: float = 30,
+        max_width: int = 1280,
+        max_height: int = 720,
+        min_scale: float = 0.5,
+        min_quality: int = 40,
+        max_quality: int = 85,
+    ):
+        """
+        Initialize controller at the highest settings
+
+        Args:
+            min_fps: Lowest frame rate the controller degrades to
+            max_fps: Highest frame rate
+            max_width: Output width at full resolution
+            max_height: Output height at full resolution
+            min_scale: Lowest resolution as a fraction of max_width x max_height
+            min_quality: Lowest JPEG/WebP quality
+            max_quality: Highest JPEG/WebP quality
+        """
+        self.min_fps = min_fps
+        self.max_fps = max_fps
+        self.max_width = max_width
+        self.max_height = max_height
+        self.min_scale = min_scale
+        self.min_quality = min_quality
+        self.max_quality = max_quality
+
+        self.fps = max_fps
+        self.scale = 1.0
+        self.quality = max_quality
+        # Highest fps any current client asked for
+        self.client_fps = max_fps
+
+        self.capture_time = 0.0
+        self.encode_time = 0.0
+
+        self._last_adjust = time.monotonic()
+        self._healthy_intervals = 0
+        self._max_latency = 0.0
+        self._frames = 0
+        self._backlogged = 0
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict]) -> "StreamController":
+        """Create controller from the `stream` config section (missing keys use defaults)"""
+        config = config or {}
+        keys = ("min_fps", "max_fps", "max_width", "max_height", "min_scale", "min_quality", "max_quality")
+        return cls(**{key: config[key] for key in keys if config.get(key) is not None})
+
+    @property
+    def load_fps(self) -> float:
+        """Frame rate at which capture + encode use MAX_BUSY_RATIO of the time"""
+        busy = self.capture_time + self.encode_time
+        return self.MAX_BUSY_RATIO / busy if busy > 0 else self.max_fps
+
+    @property
+    def target_fps(self) -> float:
+        """Frame rate the stream loop should run at"""
+        return min(self.fps, self.client_fps, max(self.min_fps, self.load_fps))
+
+    @property
+    def frame_interval(self) -> float:
+        """Seconds between frame captures"""
+        return 1.0 / self.target_fps
+
+    @property
+    def max_size(self) -> Tuple[int, int]:
+        """Current output (max_width, max_height)"""
+        return max(1, int(self.max_width * self.scale)), max(1, int(self.max_height * self.scale))
+
+    def record_capture(self, seconds: float):
+        """Add a frame capture duration"""
+        self.capture_time = self._smooth(self.capture_time, seconds)
+
+    def record_encode(self, seconds: float):
+        """Add a frame encode duration"""
+        self.encode_time = self._smooth(self.encode_time, seconds)
+
+    def observe_client(self, latency: float, backlogged: bool):
+        """
+        Add one client's state when a frame is handed to it
+
+        Args:
+            latency: Client's recent time from queueing a frame to sending it
+            backlogged: The client had not received the previous frame yet
+        """
+        self._frames += 1
+        self._max_latency = max(self._max_latency, latency)
+        if backlogged:
+            self._backlogged += 1
+
+    def adjust(self) -> bool:
+        """
+        Re-evaluate settings if ADJUST_INTERVAL has passed
+
+        Returns:
+            True if fps, resolution or quality changed
+        """
+        now = time.monotonic()
+        if now - self._last_adjust < self.ADJUST_INTERVAL:
+            return False
+        self._last_adjust = now
+
+        congested = self._max_latency > self.MAX_SEND_LATENCY or (
+            self._frames > 0 and self._backlogged * 2 > self._frames
+        )
+        self._max_latency = 0.0
+        self._frames = 0
+        self._backlogged = 0
+
+        before = (self.fps, self.scale, self.quality)
+        if congested:
+            self._healthy_intervals = 0
+            if self.quality > self.min_quality:
+                self.quality = max(self.min_quality, self.quality - self.QUALITY_STEP)
+            elif self.scale > self.min_scale:
+                self.scale = max(self.min_scale, self.scale - self.SCALE_STEP)
+            elif self.fps > self.min_fps:
+                self.fps = max(self.min_fps, self.fps / 2)
+        else:
+            self._healthy_intervals += 1
+            if self._healthy_intervals >= self.RECOVER_AFTER:
+                self._healthy_intervals = 0
+                if self.fps < self.max_fps:
+                    self.fps = min(self.max_fps, self.fps * 2)
+                elif self.scale < 1.0:
+                    self.scale = min(1.0, self.scale + self.SCALE_STEP)
+                elif self.quality < self.max_quality:
+                    self.quality = min(self.max_quality, self.quality + self.QUALITY_STEP)
+
+        if (self.fps, self.scale, self.quality) != before:
+            logger.info(
+                f"Stream {'degraded' if congested else 'recovered'}: "
+                f"fps={self.fps:g} scale={self.scale:g} quality={self.quality}"
+            )
+            return True
+        return False
+
+    def stats(self) -> Dict:
+        """Current settings and measurements"""
+        width, height = self.max_size
+        return {
+            "fps": round(self.target_fps, 2),
+            "max_width": width,
+            "max_height": height,
+            "quality": self.quality,
+            "capture_ms": round(self.capture_time * 1000, 1),
+            "encode_ms": round(self.encode_time * 1000, 1),
+        }
+
+    def _smooth(self, average: float, sample: float) -> float:
+        if average == 0.0:
+            return sample
+        return average + self.SMOOTHING * (sample - average)
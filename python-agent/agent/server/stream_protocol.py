@@ -0,0 +1,136 @@
+"""Binary WebSocket frame format for screen streaming
+
+Every binary message is one frame:
+
+    offset  size  field
+    0       1     version (1)
+    1       1     format (FORMAT_*)
+    2       1     flags (FLAG_*)
+    3       1     device id length N
+    4       4     sequence number (uint32, per device stream)
+    8       8     capture timestamp in milliseconds since epoch (uint64)
+    16      N     device id (UTF-8)
+    16+N    ...   payload (JPEG/WebP image, H.264 NAL unit with start code)
+
+With FLAG_TILES the payload carries only the changed regions of an image
+frame (the image format applies to each tile):
+
+    TILES_HEADER  frame width, frame height, tile count (3 x uint16)
+    per tile      x, y, width, height (4 x uint16), length (uint32), image bytes
+
+All integers are big-endian.
+"""
+import struct
+import time
+from typing import Dict, List, Optional, Tuple, Union
+
+PROTOCOL_VERSION = 1
+
+HEADER = struct.Struct(">BBBBIQ")
+TILES_HEADER = struct.Struct(">HHH")
+TILE_HEADER = struct.Struct(">HHHHI")
+
+# Payload formats
+FORMAT_JPEG = 1
+FORMAT_PNG = 2
+FORMAT_H264 = 3
+FORMAT_WEBP = 4
+
+# Flags
+FLAG_KEYFRAME = 0x01  # H.264 IDR slice
+FLAG_CONFIG = 0x02    # H.264 SPS/PPS - decoder configuration
+FLAG_TILES = 0x04     # Payload is a set of dirty tiles (see module docstring)
+
+
+def pack_frame(device_id: str, seq: int, format: int, payload: Union[bytes, memoryview],
+               flags: int = 0, timestamp_ms: Optional[int] = None) -> bytes:
+    """
+    Build a binary stream frame
+
+    Args:
+        device_id: Device ID
+        seq: Sequence number within the device stream
+        format: Payload format (FORMAT_*)
+        payload: Frame payload
+        flags: FLAG_* bits
+        timestamp_ms: Capture time in ms since epoch (defaults to now)
+
+    Returns:
+        Bytes to send as one binary WebSocket message
+    """
+    device = device_id.encode("utf-8")
+    if timestamp_ms is None:
+        timestamp_ms = int(time.time() * 1000)
+    header = HEADER.pack(PROTOCOL_VERSION, format, flags, len(device), seq & 0xFFFFFFFF, timestamp_ms)
+    return b"".join((header, device, payload))
+
+
+def unpack_frame(data: bytes) -> Dict:
+    """
+    Parse a binary stream frame
+
+    Returns:
+        Dict with version, format, flags, seq, timestamp_ms, device_id and payload
+
+    Raises:
+        ValueError: Data is not a valid frame
+    """
+    if len(data) < HEADER.size:
+        raise ValueError("Frame shorter than header")
+    version, format, flags, device_len, seq, timestamp_ms = HEADER.unpack_from(data)
+    if version != PROTOCOL_VERSION:
+        raise ValueError(f"Unsupported frame version {version}")
+    payload_start = HEADER.size + device_len
+    if len(data) < payload_start:
+        raise ValueError("Frame shorter than device id")
+    return {
+        "version": version,
+        "format": format,
+        "flags": flags,
+        "seq": seq,
+        "timestamp_ms": timestamp_ms,
+        "device_id": bytes(data[HEADER.size:payload_start]).decode("utf-8"),
+        "payload": memoryview(data)[payload_start:],
+    }
+
+
+def pack_tiles(frame_size: Tuple[int, int], tiles: List[Tuple[Tuple[int, int, int, int], bytes]]) -> bytes:
+    """
+    Build a FLAG_TILES payload
+
+    Args:
+        frame_size: (width, height) of the full image the tiles belong to
+        tiles: List of ((x, y, width, height), encoded image bytes)
+
+    Returns:
+        Payload bytes for pack_frame(..., flags=FLAG_TILES)
+    """
+    parts = [TILES_HEADER.pack(frame_size[0], frame_size[1], len(tiles))]
+    for (x, y, width, height), image in tiles:
+        parts.append(TILE_HEADER.pack(x, y, width, height, len(image)))
+        parts.append(image)
+    return b"".join(parts)
+
+
+def unpack_tiles(payload: Union[bytes, memoryview]) -> Dict:
+    """
+    Parse a FLAG_TILES payload
+
+    Returns:
+        Dict with width, height and tiles: list of {x, y, width, height, image}
+    """
+    width, height, count = TILES_HEADER.unpack_from(payload)
+    offset = TILES_HEADER.size
+    tiles = []
+    for _ in range(count):
+        x, y, tile_width, tile_height, length = TILE_HEADER.unpack_from(payload, offset)
+        offset += TILE_HEADER.size
+        tiles.append({
+            "x": x,
+            "y": y,
+            "width": tile_width,
+            "height": tile_height,
+            "image": payload[offset:offset + length],
+        })
+        offset += length
+    return {"width": width, "height": height, "tiles": tiles}
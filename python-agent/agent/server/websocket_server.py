@@ -3,30 +3,63 @@ import asyncio
 import json
 import logging
 import base64
-import io
-from typing import Dict, Set, Optional, Callable
+import functools
+import math
+import time
+from typing import Dict, List, Set, Optional, Callable, Tuple, Union
 from websockets.server import serve, WebSocketServerProtocol
 from websockets.exceptions import ConnectionClosed
-from PIL import Image
+
+from ..adb.frame import Frame
+from ..adb.h264_stream import H264ScreenStream, nal_type, NAL_TYPE_IDR, NAL_TYPE_SPS, NAL_TYPE_PPS
+from .frame_mailbox import FrameMailbox
+from .stream_controller import StreamController
+from ..utils.frame_diff import FrameChange, FrameChangeDetector
+from .stream_protocol import (
+    pack_frame,
+    pack_tiles,
+    FORMAT_H264,
+    FORMAT_JPEG,
+    FORMAT_WEBP,
+    FLAG_KEYFRAME,
+    FLAG_CONFIG,
+    FLAG_TILES,
+)
+from ..utils.screenshot import fit_image, encode_image
 
 logger = logging.getLogger(__name__)
 
+# Image formats for screenshot streaming -> (PIL format, stream_protocol format)
+IMAGE_FORMATS = {
+    "jpeg": ("JPEG", FORMAT_JPEG),
+    "webp": ("WEBP", FORMAT_WEBP),
+}
+
 
 class WebSocketServer:
     """WebSocket server for broadcasting events to frontend"""
 
-    def __init__(self, host: str = "127.0.0.1", port: int = 3002, adb_client=None):
+    # Upper bound on H.264 NAL units kept for replay to clients joining mid-GOP
+    MAX_GOP_CACHE_BYTES = 8 * 1024 * 1024
+    # Tiled screenshot streams: full keyframe at least this often (seconds)
+    KEYFRAME_INTERVAL = 5.0
+    # Tiled screenshot streams: send a keyframe instead when more of the screen changed
+    MAX_TILE_DIRTY_RATIO = 0.5
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 3002, adb_client=None, stream_config: Optional[Dict] = None):
         """
         Initialize WebSocket server
 
         Args:
             host: Host to bind to
             port: Port to bind to
-            adb_client: ADB client instance for screen streaming
+            adb_client: AsyncADBClient instance for screen streaming
+            stream_config: Adaptive screenshot stream bounds (`stream` config section)
         """
         self.host = host
         self.port = port
         self.adb_client = adb_client
+        self.stream_config = stream_config or {}
         self.clients: Set[WebSocketServerProtocol] = set()
         self.sessions: Dict[str, Set[WebSocketServerProtocol]] = {}  # session_id -> clients
         self.server = None
@@ -35,6 +68,50 @@ class WebSocketServer:
         self.streaming_tasks: Dict[str, asyncio.Task] = {}
         # Streaming clients: device_id -> Set[websocket]
         self.streaming_clients: Dict[str, Set[WebSocketServerProtocol]] = {}
+        # Active stream method per device: "screenshot" (JPEG) or "h264"
+        self.streaming_modes: Dict[str, str] = {}
+        # Clients that negotiated binary screen frames: device_id -> {websocket: "jpeg" | "webp"}
+        self.binary_clients: Dict[str, Dict[WebSocketServerProtocol, str]] = {}
+        # Binary clients that want dirty-tile updates: device_id -> Set[websocket]
+        self.tile_clients: Dict[str, Set[WebSocketServerProtocol]] = {}
+        # Client requested limits: device_id -> {websocket: (max_width, max_height, max_fps)}
+        self.client_limits: Dict[str, Dict[WebSocketServerProtocol, Tuple]] = {}
+        # Adaptive fps/resolution/quality per screenshot stream: device_id -> StreamController
+        self.stream_controllers: Dict[str, StreamController] = {}
+        # Outgoing frame mailbox per streaming client: device_id -> {websocket: FrameMailbox}
+        self.stream_mailboxes: Dict[str, Dict[WebSocketServerProtocol, FrameMailbox]] = {}
+
+        # Push device list changes from the device registry to all clients
+        if self.adb_client and hasattr(self.adb_client, "device_registry"):
+            self.adb_client.device_registry.add_listener(self._on_devices_changed)
+
+    @staticmethod
+    def _format_devices(devices: List[Dict]) -> List[Dict]:
+        """Format online devices for the frontend"""
+        formatted_devices = []
+        for d in devices:
+            if d["state"] == "device":
+                device_info = {
+                    "id": d["id"],
+                    "device": d["id"],  # Alias for compatibility
+                    "state": d["state"],
+                    "status": d["state"],  # Frontend expects "status"
+                    "model": d.get("model", "Unknown"),
+                    "name": d.get("model", d["id"]),  # Use model as name, fallback to id
+                }
+                formatted_devices.append(device_info)
+        return formatted_devices
+
+    async def _on_devices_changed(self, current: Dict[str, Dict], previous: Dict[str, Dict]):
+        """Broadcast the new device list when a device connects, disconnects or changes state"""
+        if not self.clients:
+            return
+        formatted_devices = self._format_devices(list(current.values()))
+        await self.broadcast({
+            "type": "devices",
+            "devices": formatted_devices,
+        })
+        logger.debug(f"Pushed {len(formatted_devices)} devices to clients")
 
     async def register_client(self, websocket: WebSocketServerProtocol):
         """Register new client"""
@@ -50,19 +127,7 @@ class WebSocketServer:
         # Send devices list immediately when client connects
         if self.adb_client:
             try:
-                devices = self.adb_client.devices()
-                formatted_devices = []
-                for d in devices:
-                    if d["state"] == "device":
-                        device_info = {
-                            "id": d["id"],
-                            "device": d["id"],  # Alias for compatibility
-                            "state": d["state"],
-                            "status": d["state"],  # Frontend expects "status"
-                            "model": d.get("model", "Unknown"),
-                            "name": d.get("model", d["id"]),  # Use model as name, fallback to id
-                        }
-                        formatted_devices.append(device_info)
+                formatted_devices = self._format_devices(await self.adb_client.devices())
 
                 await self.send_to_client(websocket, {
                     "type": "devices",
@@ -175,7 +240,17 @@ class WebSocketServer:
                         device_id = data.get("deviceId")
                         use_scrcpy = data.get("useScrcpy", False)
                         if device_id:
-                            await self.start_screen_stream(websocket, device_id, use_scrcpy)
+                            await self.start_screen_stream(
+                                websocket,
+                                device_id,
+                                use_scrcpy,
+                                binary=data.get("binary", False) or data.get("tiles", False),
+                                tiles=data.get("tiles", False),
+                                image_format=data.get("format", "jpeg"),
+                                max_width=data.get("maxWidth"),
+                                max_height=data.get("maxHeight"),
+                                max_fps=data.get("maxFps"),
+                            )
                     elif msg_type == "stopScreenStream":
                         # Stop screen streaming for device
                         device_id = data.get("deviceId")
@@ -185,19 +260,7 @@ class WebSocketServer:
                         # Client requests device list refresh
                         if self.adb_client:
                             try:
-                                devices = self.adb_client.devices()
-                                formatted_devices = []
-                                for d in devices:
-                                    if d["state"] == "device":
-                                        device_info = {
-                                            "id": d["id"],
-                                            "device": d["id"],
-                                            "state": d["state"],
-                                            "status": d["state"],
-                                            "model": d.get("model", "Unknown"),
-                                            "name": d.get("model", d["id"]),
-                                        }
-                                        formatted_devices.append(device_info)
+                                formatted_devices = self._format_devices(await self.adb_client.devices())
 
                                 await self.send_to_client(websocket, {
                                     "type": "devices",
@@ -448,8 +511,28 @@ class WebSocketServer:
         websocket: WebSocketServerProtocol,
         device_id: str,
         use_scrcpy: bool = False,
+        binary: bool = False,
+        image_format: str = "jpeg",
+        tiles: bool = False,
+        max_width: Optional[int] = None,
+        max_height: Optional[int] = None,
+        max_fps: Optional[float] = None,
     ):
-        """Start screen streaming for device"""
+        """
+        Start screen streaming for device
+
+        Args:
+            websocket: Client connection
+            device_id: Device ID
+            use_scrcpy: Stream H.264 video (always binary frames)
+            binary: Client accepts binary screen frames (see stream_protocol)
+                instead of base64 JSON screen:updated messages
+            image_format: Image format for binary frames ("jpeg" or "webp")
+            tiles: Send only changed rectangles between keyframes (binary only)
+            max_width: Largest frame width this client wants
+            max_height: Largest frame height this client wants
+            max_fps: Highest frame rate this client wants
+        """
         if not self.adb_client:
             logger.warning("ADB client not available for screen streaming")
             await self.send_to_client(websocket, {
@@ -462,21 +545,57 @@ class WebSocketServer:
         if device_id not in self.streaming_clients:
             self.streaming_clients[device_id] = set()
         self.streaming_clients[device_id].add(websocket)
+        if binary:
+            fmt = image_format if image_format in IMAGE_FORMATS else "jpeg"
+            self.binary_clients.setdefault(device_id, {})[websocket] = fmt
+        elif device_id in self.binary_clients:
+            self.binary_clients[device_id].pop(websocket, None)
+        if binary and tiles:
+            self.tile_clients.setdefault(device_id, set()).add(websocket)
+        elif device_id in self.tile_clients:
+            self.tile_clients[device_id].discard(websocket)
+        if max_width or max_height or max_fps:
+            self.client_limits.setdefault(device_id, {})[websocket] = (
+                int(max_width) if max_width else None,
+                int(max_height) if max_height else None,
+                float(max_fps) if max_fps else None,
+            )
+        elif device_id in self.client_limits:
+            self.client_limits[device_id].pop(websocket, None)
 
         # Start streaming task if not already running
+        # (clients joining a running stream get the method already in use)
         if device_id not in self.streaming_tasks:
             logger.info(f"Starting screen stream for device: {device_id}")
+            self.streaming_modes[device_id] = "h264" if use_scrcpy else "screenshot"
             task = asyncio.create_task(self._screen_stream_loop(device_id, use_scrcpy))
             self.streaming_tasks[device_id] = task
 
-            # Send stream started event
-            await self.send_to_client(websocket, {
+        # Send stream started event
+        await self.send_to_client(websocket, self._stream_started_event(device_id, websocket))
+
+    def _stream_started_event(self, device_id: str, websocket: WebSocketServerProtocol) -> Dict:
+        """screen:streamStarted payload for the stream method active on a device"""
+        if self.streaming_modes.get(device_id) == "h264":
+            # NAL units arrive as binary frames (see stream_protocol)
+            return {
                 "type": "screen:streamStarted",
                 "deviceId": device_id,
-                "method": "screenshot" if not use_scrcpy else "scrcpy",
-                "format": "jpeg",  # Optimized JPEG format
-                "fps": 60,  # Target 60 FPS for smooth streaming
-            })
+                "method": "screenrecord",
+                "format": "h264",
+                "binary": True,
+            }
+        binary_format = self.binary_clients.get(device_id, {}).get(websocket)
+        return {
+            "type": "screen:streamStarted",
+            "deviceId": device_id,
+            "method": "screenshot",
+            "format": binary_format or "jpeg",  # Optimized JPEG format
+            "binary": binary_format is not None,
+            "tiles": websocket in self.tile_clients.get(device_id, set()),
+            # Upper bound - the actual rate adapts to capture speed and client load
+            "fps": self._requested_fps(device_id, StreamController.from_config(self.stream_config).max_fps),
+        }
 
     async def stop_screen_stream(
         self,
@@ -484,6 +603,14 @@ class WebSocketServer:
         device_id: str,
     ):
         """Stop screen streaming for device"""
+        if device_id in self.binary_clients:
+            self.binary_clients[device_id].pop(websocket, None)
+        if device_id in self.tile_clients:
+            self.tile_clients[device_id].discard(websocket)
+        if device_id in self.client_limits:
+            self.client_limits[device_id].pop(websocket, None)
+        await self._close_mailbox(device_id, websocket)
+
         if device_id in self.streaming_clients:
             self.streaming_clients[device_id].discard(websocket)
 
@@ -496,12 +623,21 @@ class WebSocketServer:
                         await task
                     except asyncio.CancelledError:
                         pass
-                    del self.streaming_tasks[device_id]
-                del self.streaming_clients[device_id]
+                    self.streaming_tasks.pop(device_id, None)
+                self.streaming_clients.pop(device_id, None)
                 logger.info(f"Stopped screen stream for device: {device_id}")
 
     async def cleanup_client_streams(self, websocket: WebSocketServerProtocol):
         """Clean up all streams for a client"""
+        for binary_clients in self.binary_clients.values():
+            binary_clients.pop(websocket, None)
+        for tile_clients in self.tile_clients.values():
+            tile_clients.discard(websocket)
+        for client_limits in self.client_limits.values():
+            client_limits.pop(websocket, None)
+        for device_id in list(self.stream_mailboxes):
+            await self._close_mailbox(device_id, websocket)
+
         devices_to_clean = []
         for device_id, clients in self.streaming_clients.items():
             if websocket in clients:
@@ -517,113 +653,107 @@ class WebSocketServer:
                     await task
                 except asyncio.CancelledError:
                     pass
-                del self.streaming_tasks[device_id]
-            del self.streaming_clients[device_id]
+                self.streaming_tasks.pop(device_id, None)
+            self.streaming_clients.pop(device_id, None)
 
-    def _optimize_screenshot(self, screenshot_bytes: bytes, max_width: int = 1280, max_height: int = 720, quality: int = 85) -> bytes:
+    def _optimize_screenshot(
+        self,
+        frame: Frame,
+        max_width: int = 1280,
+        max_height: int = 720,
+        quality: int = 85,
+        formats=("jpeg",),
+        tile_formats=(),
+        tile_rects: Optional[List[Tuple[int, int, int, int]]] = None,
+    ) -> Tuple[Dict[str, bytes], Dict[str, bytes]]:
         """
-        Optimize screenshot by resizing and converting to JPEG
+        Optimize screenshot by resizing and converting to JPEG (or WebP)
+
+        The frame is resized once; full images and dirty tiles are cut from
+        the same resized image.
 
         Args:
-            screenshot_bytes: Original PNG screenshot bytes
+            frame: Raw captured frame
             max_width: Maximum width (default 1280)
             max_height: Maximum height (default 720)
-            quality: JPEG quality 1-100 (default 85)
+            quality: JPEG/WebP quality 1-100 (default 85)
+            formats: Formats to encode the full image in ("jpeg", "webp")
+            tile_formats: Formats to encode dirty tiles in
+            tile_rects: Dirty rectangles (x, y, width, height) in frame pixels
 
         Returns:
-            Optimized JPEG bytes
+            ({format: full image bytes}, {format: stream_protocol tiles payload})
         """
-        try:
-            # Load PNG image from bytes
-            img = Image.open(io.BytesIO(screenshot_bytes))
-
-            # Get original dimensions
-            orig_width, orig_height = img.size
-
-            # Calculate new dimensions maintaining aspect ratio
-            if orig_width > max_width or orig_height > max_height:
-                ratio = min(max_width / orig_width, max_height / orig_height)
-                new_width = int(orig_width * ratio)
-                new_height = int(orig_height * ratio)
-                img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-
-            # Convert to RGB if necessary (JPEG doesn't support transparency)
-            if img.mode in ('RGBA', 'LA', 'P'):
-                # Create white background
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                if img.mode == 'P':
-                    img = img.convert('RGBA')
-                background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
-                img = background
-            elif img.mode != 'RGB':
-                img = img.convert('RGB')
-
-            # Convert to JPEG with optimization
-            output = io.BytesIO()
-            img.save(output, format='JPEG', quality=quality, optimize=True)
-            return output.getvalue()
-        except Exception as e:
-            logger.error(f"Error optimizing screenshot: {e}")
-            # Fallback: return original if optimization fails
-            return screenshot_bytes
+        img = fit_image(frame.to_image(), max_width, max_height)
+
+        encoded = {}
+        for image_format in formats:
+            encoded[image_format] = encode_image(img, IMAGE_FORMATS[image_format][0], quality)
+
+        tiles = {}
+        if tile_formats and tile_rects:
+            scale_x = img.width / frame.width
+            scale_y = img.height / frame.height
+            boxes = []
+            for x, y, width, height in tile_rects:
+                # Round outwards so scaled tiles still cover the change
+                box = (
+                    int(x * scale_x),
+                    int(y * scale_y),
+                    min(img.width, math.ceil((x + width) * scale_x)),
+                    min(img.height, math.ceil((y + height) * scale_y)),
+                )
+                if box[2] > box[0] and box[3] > box[1]:
+                    boxes.append(box)
+            for image_format in tile_formats:
+                tiles[image_format] = pack_tiles(img.size, [
+                    ((box[0], box[1], box[2] - box[0], box[3] - box[1]),
+                     encode_image(img.crop(box), IMAGE_FORMATS[image_format][0], quality))
+                    for box in boxes
+                ])
+
+        return encoded, tiles
 
     async def _screen_stream_loop(self, device_id: str, use_scrcpy: bool = False):
-        """Background task to stream screenshots with optimization"""
-        target_fps = 60  # Target 60 FPS for smooth streaming
-        frame_delay = 1.0 / target_fps  # ~16.67ms per frame
+        """
+        Background task to stream screenshots with optimization
+
+        Frame rate, resolution and quality follow the device's StreamController.
+        """
         consecutive_errors = 0
         max_errors = 5
+        seq = 0
+        detector = FrameChangeDetector()
+        controller = StreamController.from_config(self.stream_config)
+        self.stream_controllers[device_id] = controller
 
         try:
+            if use_scrcpy:
+                await self._h264_stream_loop(device_id)
+                if not self.streaming_clients.get(device_id):
+                    return
+                # screenrecord unavailable on this device - fall back to screenshots
+                logger.warning(f"Falling back to screenshot stream for device: {device_id}")
+                self.streaming_modes[device_id] = "screenshot"
+                for client in self.streaming_clients[device_id].copy():
+                    await self.send_to_client(client, self._stream_started_event(device_id, client))
+
             while device_id in self.streaming_clients and self.streaming_clients[device_id]:
                 start_time = asyncio.get_event_loop().time()
 
                 try:
-                    # Capture screenshot in executor to avoid blocking
-                    loop = asyncio.get_event_loop()
-                    screenshot_bytes = await loop.run_in_executor(
-                        None,
-                        self.adb_client.screencap,
-                        device_id
-                    )
-
-                    if screenshot_bytes:
-                        # Optimize screenshot (resize + JPEG compression) in executor
-                        optimized_bytes = await loop.run_in_executor(
-                            None,
-                            self._optimize_screenshot,
-                            screenshot_bytes
-                        )
-
-                        # Convert to base64
-                        screenshot_base64 = base64.b64encode(optimized_bytes).decode('utf-8')
-
-                        # Send to all clients streaming this device
-                        clients = self.streaming_clients[device_id].copy()
-                        send_tasks = []
-                        for client in clients:
-                            try:
-                                send_tasks.append(
-                                    self.send_to_client(client, {
-                                        "type": "screen:updated",
-                                        "deviceId": device_id,
-                                        "screenshot": screenshot_base64,
-                                        "format": "jpeg",  # Indicate JPEG format
-                                    })
-                                )
-                            except Exception as e:
-                                logger.warning(f"Error preparing screenshot send to client: {e}")
-                                self.streaming_clients[device_id].discard(client)
-
-                        # Send to all clients concurrently
-                        if send_tasks:
-                            results = await asyncio.gather(*send_tasks, return_exceptions=True)
-                            for i, result in enumerate(results):
-                                if isinstance(result, Exception):
-                                    logger.warning(f"Error sending screenshot to client: {result}")
-                                    if i < len(clients):
-                                        self.streaming_clients[device_id].discard(list(clients)[i])
-
+                    # Capture screenshot through the shared producer (joins captures
+                    # already in flight for tools/HTTP, makes frames reusable by them)
+                    frame = await self.adb_client.get_frame(device_id)
+                    controller.record_capture(asyncio.get_event_loop().time() - start_time)
+
+                    if frame:
+                        # Skip encoding and sending entirely when nothing changed
+                        change = await asyncio.get_event_loop().run_in_executor(None, detector.update, frame)
+                        if await self._send_screen_frame(device_id, frame, seq, change, controller):
+                            seq += 1
+                        controller.client_fps = self._requested_fps(device_id, controller.max_fps)
+                        controller.adjust()
                         consecutive_errors = 0  # Reset error counter on success
                     else:
                         consecutive_errors += 1
@@ -641,7 +771,7 @@ class WebSocketServer:
 
                 # Calculate delay to maintain target FPS
                 elapsed = asyncio.get_event_loop().time() - start_time
-                sleep_time = max(0, frame_delay - elapsed)
+                sleep_time = max(0, controller.frame_interval - elapsed)
                 if sleep_time > 0:
                     await asyncio.sleep(sleep_time)
 
@@ -655,4 +785,245 @@ class WebSocketServer:
                 del self.streaming_tasks[device_id]
             if device_id in self.streaming_clients:
                 del self.streaming_clients[device_id]
+            self.streaming_modes.pop(device_id, None)
+            self.binary_clients.pop(device_id, None)
+            self.tile_clients.pop(device_id, None)
+            self.client_limits.pop(device_id, None)
+            self.stream_controllers.pop(device_id, None)
+            for mailbox in self.stream_mailboxes.pop(device_id, {}).values():
+                await mailbox.close()
+
+    async def _send_screen_frame(
+        self,
+        device_id: str,
+        frame: Frame,
+        seq: int,
+        change: FrameChange,
+        controller: StreamController,
+    ) -> bool:
+        """
+        Encode a frame once per needed format and size and hand it to every streaming client
+
+        Binary clients get a stream_protocol frame with the raw image bytes;
+        other clients get the JSON screen:updated message with base64 JPEG.
+        Clients that already have the picture get nothing when the screen did
+        not change. Tiled clients get only the dirty rectangles, with a full
+        keyframe when they join, when an update is still undelivered, when
+        most of the screen changed, or every KEYFRAME_INTERVAL seconds.
+        Resolution and quality come from the controller, capped by each
+        client's requested maximums; clients are skipped until their maxFps
+        interval has passed. Each message is built once and shared by all its
+        recipients.
+
+        Returns:
+            True if anything was sent
+        """
+        clients = self.streaming_clients.get(device_id)
+        if not clients:
+            return False
+        binary_clients = self.binary_clients.get(device_id, {})
+        tile_clients = self.tile_clients.get(device_id, set())
+        client_limits = self.client_limits.get(device_id, {})
+        stream_width, stream_height = controller.max_size
+        now = time.monotonic()
+
+        # client -> (kind, format, size); kind is "full" or "tiles", format None means JSON
+        plan = {}
+        for client in list(clients):
+            mailbox = self._get_mailbox(device_id, client)
+            if mailbox.failed:
+                clients.discard(client)
+                binary_clients.pop(client, None)
+                tile_clients.discard(client)
+                client_limits.pop(client, None)
+                await self._close_mailbox(device_id, client)
+                continue
+            if mailbox.primed and not change.changed:
+                continue
+
+            max_width, max_height, max_fps = client_limits.get(client, (None, None, None))
+            if max_fps and now - mailbox.last_frame < 1.0 / max_fps:
+                # Skipped a change - the next frame this client gets must be complete
+                mailbox.primed = False
+                continue
+
+            image_format = binary_clients.get(client)
+            size = (min(stream_width, max_width or stream_width), min(stream_height, max_height or stream_height))
+            kind = "full"
+            if (
+                client in tile_clients
+                and mailbox.primed
+                and not mailbox.has_pending
+                and change.dirty_ratio <= self.MAX_TILE_DIRTY_RATIO
+                and now - mailbox.last_keyframe < self.KEYFRAME_INTERVAL
+                and size == mailbox.frame_size
+            ):
+                kind = "tiles"
+            plan[client] = (kind, image_format, size)
+            controller.observe_client(mailbox.latency, mailbox.has_pending)
+
+        if not plan:
+            return False
+
+        # Optimize screenshot (resize + compression) in executor, once per output size
+        loop = asyncio.get_event_loop()
+        encode_start = time.monotonic()
+        encoded = {}
+        tiles = {}
+        for size in {size for _, _, size in plan.values()}:
+            full_formats = {fmt or "jpeg" for kind, fmt, s in plan.values() if s == size and kind == "full"}
+            tile_formats = {fmt for kind, fmt, s in plan.values() if s == size and kind == "tiles"}
+            encoded[size], tiles[size] = await loop.run_in_executor(
+                None,
+                functools.partial(
+                    self._optimize_screenshot,
+                    frame,
+                    max_width=size[0],
+                    max_height=size[1],
+                    quality=controller.quality,
+                    formats=full_formats,
+                    tile_formats=tile_formats,
+                    tile_rects=change.dirty_rects,
+                ),
+            )
+        controller.record_encode(time.monotonic() - encode_start)
+
+        timestamp_ms = int(frame.timestamp * 1000)
+        messages = {}
+
+        def message_for(kind: str, image_format: Optional[str], size: Tuple[int, int]) -> Union[bytes, str]:
+            key = (kind, image_format, size)
+            if key not in messages:
+                if kind == "tiles":
+                    messages[key] = pack_frame(device_id, seq, IMAGE_FORMATS[image_format][1], tiles[size][image_format],
+                                               flags=FLAG_TILES, timestamp_ms=timestamp_ms)
+                elif image_format:
+                    messages[key] = pack_frame(device_id, seq, IMAGE_FORMATS[image_format][1], encoded[size][image_format],
+                                               flags=FLAG_KEYFRAME, timestamp_ms=timestamp_ms)
+                else:
+                    messages[key] = json.dumps({
+                        "type": "screen:updated",
+                        "deviceId": device_id,
+                        "screenshot": base64.b64encode(encoded[size]["jpeg"]).decode('utf-8'),
+                        "format": "jpeg",  # Indicate JPEG format
+                        "seq": seq,
+                    })
+            return messages[key]
+
+        # Hand off to each client's mailbox - slow clients skip stale frames
+        for client, (kind, image_format, size) in plan.items():
+            mailbox = self._get_mailbox(device_id, client)
+            mailbox.put_latest(message_for(kind, image_format, size))
+            mailbox.primed = True
+            mailbox.last_frame = now
+            if kind == "full":
+                mailbox.last_keyframe = now
+                mailbox.frame_size = size
+        return True
+
+    def _requested_fps(self, device_id: str, default: float) -> float:
+        """Highest frame rate any streaming client of a device accepts"""
+        clients = self.streaming_clients.get(device_id, set())
+        limits = self.client_limits.get(device_id, {})
+        return max((limits.get(client, (None, None, None))[2] or default for client in clients), default=default)
+
+    def _get_mailbox(self, device_id: str, websocket: WebSocketServerProtocol) -> FrameMailbox:
+        """Get or create the frame mailbox of a streaming client"""
+        mailboxes = self.stream_mailboxes.setdefault(device_id, {})
+        mailbox = mailboxes.get(websocket)
+        if mailbox is None:
+            mailbox = FrameMailbox(websocket)
+            mailboxes[websocket] = mailbox
+        return mailbox
+
+    async def _close_mailbox(self, device_id: str, websocket: WebSocketServerProtocol):
+        """Stop a client's frame mailbox and log its counters"""
+        mailbox = self.stream_mailboxes.get(device_id, {}).pop(websocket, None)
+        if mailbox:
+            await mailbox.close()
+            logger.debug(f"Screen stream client left {device_id}: sent {mailbox.sent}, dropped {mailbox.dropped} frames")
+
+    def get_stream_stats(self) -> Dict[str, Dict]:
+        """
+        Per-client frame counters and adaptive settings of active screen streams
+
+        Returns:
+            device_id -> {"clients": [{"client", "sent", "dropped", "latency_ms"}],
+                          "settings": StreamController.stats() or None}
+        """
+        stats = {}
+        for device_id, mailboxes in self.stream_mailboxes.items():
+            controller = self.stream_controllers.get(device_id)
+            stats[device_id] = {
+                "clients": [
+                    {"client": str(getattr(client, "remote_address", id(client))), **mailbox.stats()}
+                    for client, mailbox in mailboxes.items()
+                ],
+                "settings": controller.stats() if controller else None,
+            }
+        return stats
+
+    async def _h264_stream_loop(self, device_id: str):
+        """
+        Forward H.264 NAL units from screenrecord to streaming clients as binary frames
+
+        Clients joining mid-stream (or dropped for falling behind) first get the
+        cached SPS/PPS and the NAL units since the last IDR frame so they can
+        start decoding immediately.
+        Returns when no clients are left or screenrecord cannot be started.
+        """
+        stream = H264ScreenStream(self.adb_client, device_id)
+        seq = 0
+        config_packets = []  # latest SPS/PPS
+        gop_packets = []  # NAL units since the last IDR
+        gop_bytes = 0
+
+        nal_units = stream.nal_units()
+        try:
+            async for nal in nal_units:
+                clients = self.streaming_clients.get(device_id)
+                if not clients:
+                    return
+
+                kind = nal_type(nal)
+                flags = 0
+                if kind in (NAL_TYPE_SPS, NAL_TYPE_PPS):
+                    flags = FLAG_CONFIG
+                elif kind == NAL_TYPE_IDR:
+                    flags = FLAG_KEYFRAME
+                packet = pack_frame(device_id, seq, FORMAT_H264, nal, flags)
+                seq += 1
+
+                if kind == NAL_TYPE_SPS:
+                    config_packets = [packet]
+                    gop_packets, gop_bytes = [], 0
+                elif kind == NAL_TYPE_PPS:
+                    config_packets.append(packet)
+                elif kind == NAL_TYPE_IDR:
+                    gop_packets, gop_bytes = [packet], len(packet)
+                elif gop_packets:
+                    gop_packets.append(packet)
+                    gop_bytes += len(packet)
+                    if gop_bytes > self.MAX_GOP_CACHE_BYTES:
+                        # Too long to replay - late joiners wait for the next IDR
+                        gop_packets, gop_bytes = [], 0
+
+                for client in list(clients):
+                    mailbox = self._get_mailbox(device_id, client)
+                    if mailbox.failed:
+                        clients.discard(client)
+                        await self._close_mailbox(device_id, client)
+                        continue
+
+                    if mailbox.primed:
+                        mailbox.put_ordered([packet])
+                    else:
+                        # New client, or one that fell too far behind: start it from the last keyframe
+                        mailbox.primed = True
+                        backlog = config_packets + gop_packets
+                        if not any(p is packet for p in backlog):
+                            backlog.append(packet)
+                        mailbox.put_ordered(backlog)
+        finally:
+            await nal_units.aclose()
 
@@ -15,12 +15,12 @@ except ImportError:
     except ImportError:
         raise ImportError("function_tool not found. Please install openai-agents package.")
 
-from ..adb.adb_client import ADBClient
+from ..adb.async_adb_client import AsyncADBClient
 
 logger = logging.getLogger(__name__)
 
 
-def create_app_tools(adb_client: ADBClient) -> List:
+def create_app_tools(adb_client: AsyncADBClient) -> List:
     """
     Create app management tools for mobile device.
 
@@ -45,7 +45,7 @@ def create_app_tools(adb_client: ADBClient) -> List:
             Dict with success status
         """
         try:
-            success = adb_client.launch_app(device, package_name)
+            success = await adb_client.launch_app(device, package_name)
             return {"success": success}
         except Exception as e:
             logger.error(f"Error launching app: {e}")
@@ -64,7 +64,7 @@ def create_app_tools(adb_client: ADBClient) -> List:
             Dict with success status
         """
         try:
-            success = adb_client.open_url(device, url)
+            success = await adb_client.open_url(device, url)
             return {"success": success}
         except Exception as e:
             logger.error(f"Error opening URL: {e}")
@@ -82,7 +82,7 @@ def create_app_tools(adb_client: ADBClient) -> List:
             Dict with list of apps
         """
         try:
-            packages = adb_client.list_packages(device)
+            packages = await adb_client.list_packages(device)
             return {
                 "success": True,
                 "apps": [{"package_name": pkg} for pkg in packages],
@@ -105,7 +105,7 @@ def create_app_tools(adb_client: ADBClient) -> List:
             Dict with success status
         """
         try:
-            success = adb_client.terminate_app(device, package_name)
+            success = await adb_client.terminate_app(device, package_name)
             return {"success": success}
         except Exception as e:
             logger.error(f"Error terminating app: {e}")
@@ -123,8 +123,8 @@ def create_app_tools(adb_client: ADBClient) -> List:
             Dict with current app info (package, activity)
         """
         try:
-            package = adb_client.get_current_package(device)
-            activity = adb_client.get_current_activity(device)
+            package = await adb_client.get_current_package(device)
+            activity = await adb_client.get_current_activity(device)
 
             if package:
                 return {
@@ -151,7 +151,7 @@ def create_app_tools(adb_client: ADBClient) -> List:
             Dict with app information (label, version, main_activity, etc.)
         """
         try:
-            info = adb_client.get_app_info(device, package_name)
+            info = await adb_client.get_app_info(device, package_name)
             if info:
                 return {
                     "success": True,
@@ -16,12 +16,12 @@ except ImportError:
     except ImportError:
         raise ImportError("function_tool not found. Please install openai-agents package.")
 
-from ..adb.adb_client import ADBClient
+from ..adb.async_adb_client import AsyncADBClient
 
 logger = logging.getLogger(__name__)
 
 
-def create_device_tools(adb_client: ADBClient) -> List:
+def create_device_tools(adb_client: AsyncADBClient) -> List:
     """
     Create device management tools for mobile device.
 
@@ -42,7 +42,7 @@ def create_device_tools(adb_client: ADBClient) -> List:
             Dict with 'devices' list containing device info
         """
         try:
-            devices = adb_client.devices()
+            devices = await adb_client.devices()
             return {
                 "success": True,
                 "devices": [
@@ -72,7 +72,7 @@ def create_device_tools(adb_client: ADBClient) -> List:
             Dict with width and height
         """
         try:
-            size = adb_client.get_screen_size(device)
+            size = await adb_client.get_screen_size(device)
             if size:
                 width, height = size
                 return {
@@ -102,7 +102,7 @@ def create_device_tools(adb_client: ADBClient) -> List:
             if orientation not in ["portrait", "landscape"]:
                 return {"success": False, "error": "Orientation must be 'portrait' or 'landscape'"}
 
-            success = adb_client.set_orientation(device, orientation)
+            success = await adb_client.set_orientation(device, orientation)
             return {"success": success}
         except Exception as e:
             logger.error(f"Error setting orientation: {e}")
@@ -120,7 +120,7 @@ def create_device_tools(adb_client: ADBClient) -> List:
             Dict with orientation
         """
         try:
-            orientation = adb_client.get_orientation(device)
+            orientation = await adb_client.get_orientation(device)
             if orientation:
                 return {"success": True, "orientation": orientation}
             else:
@@ -141,7 +141,7 @@ def create_device_tools(adb_client: ADBClient) -> List:
             Dict with device information
         """
         try:
-            info = adb_client.get_device_info(device)
+            info = await adb_client.get_device_info(device)
             if info:
                 return {"success": True, **info}
             else:
@@ -162,7 +162,7 @@ def create_device_tools(adb_client: ADBClient) -> List:
             Dict with battery level
         """
         try:
-            level = adb_client.get_battery_level(device)
+            level = await adb_client.get_battery_level(device)
             if level is not None:
                 return {"success": True, "battery_level": level}
             else:
@@ -184,7 +184,7 @@ def create_device_tools(adb_client: ADBClient) -> List:
             Dict with success status
         """
         try:
-            success = adb_client.wait_for_device(device, timeout)
+            success = await adb_client.wait_for_device(device, timeout)
             return {"success": success}
         except Exception as e:
             logger.error(f"Error waiting for device: {e}")
@@ -1,5 +1,6 @@
 """Interaction tools for clicking, swiping, typing - all based on elements"""
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
+import asyncio
 import logging
 
 # Import function_tool decorator from agents package
@@ -15,14 +16,17 @@ except ImportError:
     except ImportError:
         raise ImportError("function_tool not found. Please install openai-agents package.")
 
-from ..adb.adb_client import ADBClient
+from ..adb.async_adb_client import AsyncADBClient
 from ..adb.uiautomator import UIAutomator
 from ..utils.element_parser import ElementParser
+from ..utils.element_snapshot import SCROLLABLE
+from ..utils.set_of_marks import screen_marks
+from ..utils.spatial_index import intersection
 
 logger = logging.getLogger(__name__)
 
 
-def create_interaction_tools(adb_client: ADBClient, ui_automator: UIAutomator) -> list:
+def create_interaction_tools(adb_client: AsyncADBClient, ui_automator: UIAutomator) -> list:
     """
     Create interaction tools for mobile device.
 
@@ -34,6 +38,65 @@ def create_interaction_tools(adb_client: ADBClient, ui_automator: UIAutomator) -
     to access tool metadata (tool_name, tool_call_id, tool_arguments, context, usage).
     """
 
+    def _unknown_mark(mark: int) -> Dict:
+        return {
+            "success": False,
+            "error": f"Unknown or expired mark {mark} (marks expire when the screen changes)",
+            "hint": "Use mobile_take_marked_screenshot to get current marks"
+        }
+
+    async def _tap_point(device: str, element: Dict) -> Optional[Tuple[int, int]]:
+        """
+        Point to tap an element at: inside the on-screen part of its bounds and
+        not under another clickable element (its center if bounds are unknown).
+        None if the element is entirely off-screen.
+        """
+        center = ElementParser.get_element_center(element)
+        if center is None or element.get('x1') is None:
+            return center
+        rect = (element['x1'], element['y1'], element['x2'], element['y2'])
+
+        screen_size = await adb_client.get_screen_size(device)
+        screen = (0, 0, screen_size[0], screen_size[1]) if screen_size else None
+        snapshot = await ui_automator.get_snapshot(device, interactive_only=True)
+        if snapshot is None:
+            if screen and intersection(rect, screen) is None:
+                return None
+            return center
+        return snapshot.spatial_index().tap_point(rect, screen)
+
+    async def _exact_selector(device: str, element: Dict) -> Optional[Dict]:
+        """
+        Exact resource_id/text/description of a found element for a click by
+        properties, or None if another element has them too: the server clicks
+        the first element with equal attributes, which may not be this one.
+        """
+        selector = {
+            "resource_id": element.get('resource_id') or None,
+            "text": element.get('text') or None,
+            "description": element.get('content_desc') or None,
+        }
+        if not any(selector.values()):
+            return None
+        snapshot = await ui_automator.get_snapshot(device)
+        if snapshot is None:
+            return None
+        expected = (selector["resource_id"], selector["text"], selector["description"])
+        matches = 0
+        for _index, _class, *fields in snapshot.iter_fields():
+            if all(value is None or value == field for value, field in zip(expected, fields)):
+                matches += 1
+                if matches > 1:
+                    return None
+        return selector if matches == 1 else None
+
+    def _off_screen(element: Dict) -> Dict:
+        return {
+            "success": False,
+            "error": f"Element {element.get('bounds')} is outside the visible screen area",
+            "hint": "Scroll it into view first (mobile_swipe_element)"
+        }
+
     @function_tool
     async def mobile_click_element(
         device: str,
@@ -41,9 +104,11 @@ def create_interaction_tools(adb_client: ADBClient, ui_automator: UIAutomator) -
         text: Optional[str] = None,
         description: Optional[str] = None,
         class_name: Optional[str] = None,
+        mark: Optional[int] = None,
     ) -> Dict:
         """
-        Click on an element on the screen. Finds element by resource-id, text, or description.
+        Click on an element on the screen. Finds element by resource-id, text, or description,
+        or by mark id from the last mobile_take_marked_screenshot.
 
         Args:
             device: Device ID
@@ -51,31 +116,37 @@ def create_interaction_tools(adb_client: ADBClient, ui_automator: UIAutomator) -
             text: Text of element to click
             description: Content description of element to click
             class_name: Class name of element to click
+            mark: Mark id from mobile_take_marked_screenshot (expires once the screen changes)
 
         Returns:
             Dict with success status
         """
         try:
             # Validate that at least one search parameter is provided
-            if not any([resource_id, text, description, class_name]):
+            if not any([resource_id, text, description, class_name]) and mark is None:
                 return {
                     "success": False,
-                    "error": "At least one search parameter (resource_id, text, description, or class_name) must be provided"
+                    "error": "At least one search parameter (resource_id, text, description, class_name, or mark) must be provided"
                 }
 
-            # Get all elements
-            elements = ui_automator.list_all_elements(device)
-            if not elements:
-                return {"success": False, "error": "No elements found on screen"}
+            if mark is not None:
+                element = screen_marks.get(device, mark, adb_client.screen_generation(device))
+                if not element:
+                    return _unknown_mark(mark)
+            else:
+                # Get all elements
+                elements = await ui_automator.get_snapshot(device, interactive_only=True)
+                if not elements:
+                    return {"success": False, "error": "No elements found on screen"}
 
-            # Find matching element
-            element = ElementParser.find_element(
-                elements,
-                resource_id=resource_id,
-                text=text,
-                description=description,
-                class_name=class_name,
-            )
+                # Find matching element
+                element = ElementParser.find_element(
+                    elements,
+                    resource_id=resource_id,
+                    text=text,
+                    description=description,
+                    class_name=class_name,
+                )
 
             if not element:
                 # Provide helpful error message with available elements
@@ -99,14 +170,15 @@ def create_interaction_tools(adb_client: ADBClient, ui_automator: UIAutomator) -
             if not element.get("clickable", False):
                 logger.warning(f"Element is not marked as clickable, but attempting click anyway")
 
-            # Try accessibility service first (click by element properties)
-            if hasattr(adb_client, 'accessibility_click_element') and adb_client.use_accessibility:
-                success = adb_client.accessibility_click_element(
-                    device,
-                    resource_id=resource_id,
-                    text=text,
-                    description=description
-                )
+            # Try accessibility service first (click by element properties). The
+            # query may be fuzzy or use class_name, so send the found element's
+            # own attributes, and only if no other element shares them
+            selector = None
+            if (mark is None and not class_name and hasattr(adb_client, 'accessibility_click_element')
+                    and adb_client.use_accessibility):
+                selector = await _exact_selector(device, element)
+            if selector:
+                success = await adb_client.accessibility_click_element(device, **selector)
                 if success:
                     return {
                         "success": True,
@@ -117,24 +189,17 @@ def create_interaction_tools(adb_client: ADBClient, ui_automator: UIAutomator) -
                 logger.debug("Accessibility click_element failed, falling back to coordinate-based click")
 
             # Get center coordinates for coordinate-based click
-            center = ElementParser.get_element_center(element)
-            if not center:
+            if not ElementParser.get_element_center(element):
                 return {"success": False, "error": "Could not determine element center coordinates"}
 
-            x, y = center
-
-            # Validate coordinates are within screen bounds
-            screen_size = adb_client.get_screen_size(device)
-            if screen_size:
-                screen_width, screen_height = screen_size
-                if x < 0 or x > screen_width or y < 0 or y > screen_height:
-                    return {
-                        "success": False,
-                        "error": f"Element coordinates ({x}, {y}) are out of screen bounds ({screen_width}x{screen_height})"
-                    }
+            # Validate coordinates: visible part of the element, not covered by another element
+            point = await _tap_point(device, element)
+            if not point:
+                return _off_screen(element)
+            x, y = point
 
             # Click at center (uses accessibility service if available, otherwise ADB)
-            success = adb_client.input_tap(device, x, y)
+            success = await adb_client.input_tap(device, x, y)
             if not success:
                 return {
                     "success": False,
@@ -166,6 +231,7 @@ def create_interaction_tools(adb_client: ADBClient, ui_automator: UIAutomator) -
     ) -> Dict:
         """
         Swipe on the screen. Can swipe from one element to another, or swipe in a direction from an element.
+        Without a source element, a direction swipe starts in the main scrollable list on screen.
 
         Args:
             device: Device ID
@@ -183,12 +249,12 @@ def create_interaction_tools(adb_client: ADBClient, ui_automator: UIAutomator) -
         """
         try:
             # Get all elements
-            elements = ui_automator.list_all_elements(device)
+            elements = await ui_automator.get_snapshot(device, interactive_only=True)
             if not elements:
                 return {"success": False, "error": "No elements found on screen"}
 
             # Get screen size for direction-based swipes
-            screen_size = adb_client.get_screen_size(device)
+            screen_size = await adb_client.get_screen_size(device)
             if not screen_size:
                 return {"success": False, "error": "Could not get screen size"}
             screen_width, screen_height = screen_size
@@ -205,15 +271,38 @@ def create_interaction_tools(adb_client: ADBClient, ui_automator: UIAutomator) -
                 if not from_element:
                     return {"success": False, "error": "Source element not found"}
 
+            # Scrollable container the swipe happens in: the innermost one under the
+            # source element, otherwise the largest one on screen
+            index = elements.spatial_index()
+            screen = (0, 0, screen_width, screen_height)
+            container = None
+
             # Determine start coordinates
             if from_element:
                 start_center = ElementParser.get_element_center(from_element)
                 if not start_center:
                     return {"success": False, "error": "Could not determine source element center"}
                 x1, y1 = start_center
+                scrollables = index.at(x1, y1, flags=SCROLLABLE)
+                if scrollables:
+                    container = scrollables[0]
             else:
-                # Use screen center as start
-                x1, y1 = screen_width // 2, screen_height // 2
+                visible = [
+                    (intersection(index.bounds(i), screen), i)
+                    for i in index.intersecting(screen, flags=SCROLLABLE)
+                ]
+                if visible:
+                    area, container = max(visible, key=lambda v: (v[0][2] - v[0][0]) * (v[0][3] - v[0][1]))
+                    # Start in the middle of the list
+                    x1, y1 = (area[0] + area[2]) // 2, (area[1] + area[3]) // 2
+                else:
+                    # Use screen center as start
+                    x1, y1 = screen_width // 2, screen_height // 2
+
+            # Area the swipe may end in (screen edges start system gestures)
+            area = screen
+            if container is not None:
+                area = intersection(index.bounds(container), screen) or screen
 
             # Determine end coordinates
             if to_resource_id or to_text or to_description:
@@ -244,16 +333,25 @@ def create_interaction_tools(adb_client: ADBClient, ui_automator: UIAutomator) -
                     x2, y2 = x1 + distance, y1
                 else:
                     return {"success": False, "error": f"Invalid direction: {direction}"}
+
+                # Keep the end inside the container, off its edges
+                margin_x = max((area[2] - area[0]) // 20, 1)
+                margin_y = max((area[3] - area[1]) // 20, 1)
+                x2 = min(max(x2, area[0] + margin_x), area[2] - margin_x)
+                y2 = min(max(y2, area[1] + margin_y), area[3] - margin_y)
             else:
                 return {"success": False, "error": "Must specify either target element or direction"}
 
             # Perform swipe
-            success = adb_client.input_swipe(device, x1, y1, x2, y2, duration=300)
-            return {
+            success = await adb_client.input_swipe(device, x1, y1, x2, y2, duration=300)
+            result = {
                 "success": success,
                 "from": {"x": x1, "y": y1},
                 "to": {"x": x2, "y": y2},
             }
+            if container is not None:
+                result["container"] = ElementParser.format_element_info(elements[container])
+            return result
         except Exception as e:
             logger.error(f"Error swiping: {e}")
             return {"success": False, "error": str(e)}
@@ -264,6 +362,7 @@ def create_interaction_tools(adb_client: ADBClient, ui_automator: UIAutomator) -
         resource_id: Optional[str] = None,
         text: Optional[str] = None,
         description: Optional[str] = None,
+        mark: Optional[int] = None,
     ) -> Dict:
         """
         Double-tap on an element on the screen.
@@ -273,39 +372,46 @@ def create_interaction_tools(adb_client: ADBClient, ui_automator: UIAutomator) -
             resource_id: Resource ID of element
             text: Text of element
             description: Content description of element
+            mark: Mark id from mobile_take_marked_screenshot (expires once the screen changes)
 
         Returns:
             Dict with success status
         """
         try:
-            # Get all elements
-            elements = ui_automator.list_all_elements(device)
-            if not elements:
-                return {"success": False, "error": "No elements found on screen"}
+            if mark is not None:
+                element = screen_marks.get(device, mark, adb_client.screen_generation(device))
+                if not element:
+                    return _unknown_mark(mark)
+            else:
+                # Get all elements
+                elements = await ui_automator.get_snapshot(device, interactive_only=True)
+                if not elements:
+                    return {"success": False, "error": "No elements found on screen"}
 
-            # Find element
-            element = ElementParser.find_element(
-                elements,
-                resource_id=resource_id,
-                text=text,
-                description=description,
-            )
+                # Find element
+                element = ElementParser.find_element(
+                    elements,
+                    resource_id=resource_id,
+                    text=text,
+                    description=description,
+                )
 
             if not element:
                 return {"success": False, "error": "Element not found"}
 
             # Get center coordinates
-            center = ElementParser.get_element_center(element)
-            if not center:
+            if not ElementParser.get_element_center(element):
                 return {"success": False, "error": "Could not determine element center"}
 
-            x, y = center
+            point = await _tap_point(device, element)
+            if not point:
+                return _off_screen(element)
+            x, y = point
 
             # Double tap (tap twice quickly with small delay)
-            import time
-            success1 = adb_client.input_tap(device, x, y)
-            time.sleep(0.15)  # Slightly longer delay for better double-tap recognition
-            success2 = adb_client.input_tap(device, x, y)
+            success1 = await adb_client.input_tap(device, x, y)
+            await asyncio.sleep(0.15)  # Slightly longer delay for better double-tap recognition
+            success2 = await adb_client.input_tap(device, x, y)
 
             if not (success1 and success2):
                 return {
@@ -330,6 +436,7 @@ def create_interaction_tools(adb_client: ADBClient, ui_automator: UIAutomator) -
         resource_id: Optional[str] = None,
         text: Optional[str] = None,
         description: Optional[str] = None,
+        mark: Optional[int] = None,
     ) -> Dict:
         """
         Long press on an element on the screen.
@@ -339,40 +446,48 @@ def create_interaction_tools(adb_client: ADBClient, ui_automator: UIAutomator) -
             resource_id: Resource ID of element
             text: Text of element
             description: Content description of element
+            mark: Mark id from mobile_take_marked_screenshot (expires once the screen changes)
 
         Returns:
             Dict with success status
         """
         try:
-            # Get all elements
-            elements = ui_automator.list_all_elements(device)
-            if not elements:
-                return {"success": False, "error": "No elements found on screen"}
+            if mark is not None:
+                element = screen_marks.get(device, mark, adb_client.screen_generation(device))
+                if not element:
+                    return _unknown_mark(mark)
+            else:
+                # Get all elements
+                elements = await ui_automator.get_snapshot(device, interactive_only=True)
+                if not elements:
+                    return {"success": False, "error": "No elements found on screen"}
 
-            # Find element
-            element = ElementParser.find_element(
-                elements,
-                resource_id=resource_id,
-                text=text,
-                description=description,
-            )
+                # Find element
+                element = ElementParser.find_element(
+                    elements,
+                    resource_id=resource_id,
+                    text=text,
+                    description=description,
+                )
 
             if not element:
                 return {"success": False, "error": "Element not found"}
 
             # Get center coordinates
-            center = ElementParser.get_element_center(element)
-            if not center:
+            if not ElementParser.get_element_center(element):
                 return {"success": False, "error": "Could not determine element center"}
 
-            x, y = center
+            point = await _tap_point(device, element)
+            if not point:
+                return _off_screen(element)
+            x, y = point
 
             # Long press using dedicated method (swipe with same start and end but longer duration)
             # Use input_long_press if available, otherwise use swipe
             if hasattr(adb_client, 'input_long_press'):
-                success = adb_client.input_long_press(device, x, y, duration=1000)
+                success = await adb_client.input_long_press(device, x, y, duration=1000)
             else:
-                success = adb_client.input_swipe(device, x, y, x, y, duration=1000)
+                success = await adb_client.input_swipe(device, x, y, x, y, duration=1000)
 
             if not success:
                 return {
@@ -392,14 +507,16 @@ def create_interaction_tools(adb_client: ADBClient, ui_automator: UIAutomator) -
             return {"success": False, "error": str(e)}
 
     @function_tool
-    async def mobile_type_keys(device: str, text: str, submit: bool = False) -> Dict:
+    async def mobile_type_keys(device: str, text: str, submit: bool = False, label: Optional[str] = None) -> Dict:
         """
-        Type text into the focused element.
+        Type text into the focused element, or into the input field next to a label.
 
         Args:
             device: Device ID
             text: Text to type
             submit: Whether to submit (press Enter after typing)
+            label: Label (or hint) of the input field to type into, e.g. "Email";
+                the field is tapped first. Omit to type into the focused element.
 
         Returns:
             Dict with success status
@@ -408,19 +525,43 @@ def create_interaction_tools(adb_client: ADBClient, ui_automator: UIAutomator) -
             if not text:
                 return {"success": False, "error": "Text cannot be empty"}
 
-            success = adb_client.input_text(device, text)
+            field = None
+            if label:
+                elements = await ui_automator.get_snapshot(device, interactive_only=True)
+                if not elements:
+                    return {"success": False, "error": "No elements found on screen"}
+                field = ElementParser.find_labeled_input(elements, label)
+                if not field:
+                    return {
+                        "success": False,
+                        "error": f"No input field found for label: {label}",
+                        "hint": "Use mobile_list_elements_on_screen to see available elements"
+                    }
+                point = await _tap_point(device, field)
+                if not point:
+                    return _off_screen(field)
+                if not await adb_client.input_tap(device, *point):
+                    return {"success": False, "error": "Failed to focus input field"}
+                # Let the field take focus before typing
+                await asyncio.sleep(0.3)
+
+            success = await adb_client.input_text(device, text)
             if not success:
                 return {"success": False, "error": "Failed to input text"}
 
             if submit:
-                submit_success = adb_client.input_key(device, "ENTER")
-                return {
+                submit_success = await adb_client.input_key(device, "ENTER")
+                result = {
                     "success": success and submit_success,
                     "text_entered": success,
                     "submitted": submit_success
                 }
+            else:
+                result = {"success": success}
 
-            return {"success": success}
+            if field:
+                result["field"] = ElementParser.format_element_info(field)
+            return result
         except Exception as e:
             logger.error(f"Error typing keys: {e}", exc_info=True)
             return {"success": False, "error": str(e)}
@@ -453,7 +594,7 @@ def create_interaction_tools(adb_client: ADBClient, ui_automator: UIAutomator) -
             if button_upper not in valid_buttons and not button.isdigit():
                 logger.warning(f"Button '{button}' not in known list, but attempting anyway")
 
-            success = adb_client.input_key(device, button)
+            success = await adb_client.input_key(device, button)
             if not success:
                 return {"success": False, "error": f"Failed to press button: {button}"}
 
@@ -1,7 +1,10 @@
 """Screen tools for screenshots and UI hierarchy"""
-from typing import Dict, List, Union
+from typing import Callable, Dict, List, Optional, Union
 import os
 import io
+import json
+import hashlib
+import asyncio
 import logging
 
 # Import function_tool decorator and ToolOutputImage from agents package
@@ -21,18 +24,31 @@ except ImportError:
         raise ImportError("function_tool not found. Please install openai-agents package.")
 
 try:
-    from openai import OpenAI
+    from openai import APIConnectionError, RateLimitError, InternalServerError
 except ImportError:
     raise ImportError("openai package not installed. Run: pip install openai")
 
-from ..adb.adb_client import ADBClient
+from ..adb.async_adb_client import AsyncADBClient
 from ..adb.uiautomator import UIAutomator
-from ..utils.screenshot import bytes_to_base64, resize_image
+from ..utils.screenshot import bytes_to_base64
+from ..utils.upload_cache import ScreenshotUploadCache, screenshot_fingerprint
+from ..utils.openai_pool import openai_clients
+from ..utils.observation import observation_pipeline
+from ..utils.set_of_marks import select_marks, draw_marks, format_legend, screen_marks
+from ..utils.element_snapshot import ElementSnapshot
 
 logger = logging.getLogger(__name__)
 
+# Screenshots may reuse a frame this recent (e.g. from the live screen stream);
+# frames older than the last input action are never reused
+SCREENSHOT_MAX_AGE_MS = 500
 
-def create_screen_tools(adb_client: ADBClient, ui_automator: UIAutomator) -> List:
+# Uploaded screenshots by content, shared by all agent instances (tools are
+# created per chat request)
+screenshot_upload_cache = ScreenshotUploadCache()
+
+
+def create_screen_tools(adb_client: AsyncADBClient, ui_automator: UIAutomator) -> List:
     """
     Create screen tools for mobile device.
 
@@ -44,11 +60,141 @@ def create_screen_tools(adb_client: ADBClient, ui_automator: UIAutomator) -> Lis
     to access tool metadata (tool_name, tool_call_id, tool_arguments, context, usage).
     """
 
+    async def _upload_observation(
+        ctx: ToolContext,
+        frame,
+        region: Optional[List[int]] = None,
+        annotate: Optional[Callable] = None,
+        variant_suffix: str = "",
+    ) -> Union[ToolOutputImage, ToolOutputText]:
+        """
+        Prepare a frame as a model observation and upload it (or reuse an earlier upload)
+
+        Args:
+            ctx: ToolContext containing context with API key and model
+            frame: Captured frame
+            region: Optional [x1, y1, x2, y2] in screen pixels to crop to
+            annotate: Optional drawing on the prepared image (see ObservationPipeline.prepare)
+            variant_suffix: Distinguishes annotated images of the same frame in the upload cache
+
+        Returns:
+            ToolOutputImage with file_id, or ToolOutputText with an error message
+        """
+        # Get OpenAI API key from context (passed from frontend via Runner.run context)
+        # Context should be a dict with 'api_key' key
+        api_key = None
+        model = None
+        if ctx.context and isinstance(ctx.context, dict):
+            api_key = ctx.context.get("api_key")
+            model = ctx.context.get("model")
+
+        # Fallback to environment variable for backward compatibility
+        if not api_key:
+            api_key = os.environ.get("OPENAI_API_KEY")
+
+        if not api_key:
+            logger.error("❌ OpenAI API key not found in context or environment. Cannot upload screenshot.")
+            # CRITICAL: Don't use base64 fallback - it causes GPT-5 validation errors
+            # Return error message instead
+            return ToolOutputText(
+                text="Error: OpenAI API key is required to upload screenshots. Please provide API key in context."
+            )
+
+        # Same (or near-identical) screen already uploaded - reuse its file_id
+        variant = observation_pipeline.variant(model, region) + variant_suffix
+        fingerprint = await asyncio.to_thread(screenshot_fingerprint, frame, variant)
+        cached_file_id = screenshot_upload_cache.lookup(api_key, fingerprint)
+        if cached_file_id:
+            logger.info(f"✅ Screenshot unchanged, reusing uploaded file_id={cached_file_id}")
+            return ToolOutputImage(
+                file_id=cached_file_id,
+                detail=observation_pipeline.detail
+            )
+
+        # Crop/resize to the model's budget and compress (once, off the event loop)
+        observation = await asyncio.to_thread(observation_pipeline.prepare, frame, model, region, annotate)
+        logger.info(
+            f"Screenshot observation: {observation.width}x{observation.height} {observation.format}, "
+            f"{observation.size_bytes} bytes, ~{observation.estimated_tokens} tokens ({model or 'default model'})"
+        )
+
+        # Upload to OpenAI Files API
+        # CRITICAL: Must always upload and use file_id - NEVER use base64 image_url
+        # Base64 image_url causes GPT-5 validation errors when stored in session history
+        # If upload fails, return error instead of base64 fallback
+        max_retries = 3
+        retry_delay = 1.0
+
+        # Pooled AsyncOpenAI client: keep-alive connection per API key
+        client = openai_clients.get(api_key)
+
+        for attempt in range(max_retries):
+            try:
+                # Create file-like object from bytes
+                screenshot_file = io.BytesIO(observation.data)
+                screenshot_file.name = observation.filename
+
+                # Upload file to OpenAI
+                # According to OpenAI API: files.create() for uploading files
+                async with openai_clients.upload_slots:
+                    uploaded_file = await client.files.create(
+                        file=screenshot_file,
+                        purpose="vision"  # Use "vision" purpose for image files
+                    )
+
+                file_id = uploaded_file.id
+                logger.info(f"✅ Screenshot uploaded to OpenAI Files API: file_id={file_id} (attempt {attempt + 1})")
+                screenshot_upload_cache.store(api_key, fingerprint, file_id)
+
+                # CRITICAL: Only return file_id - NEVER include image_url
+                # When file_id is present, SDK uses it and won't need image_url
+                # image_url is sent separately to frontend via WebSocket (see http_server.py)
+                # This prevents GPT-5 from seeing base64 strings in session history
+                return ToolOutputImage(
+                    file_id=file_id,
+                    detail=observation_pipeline.detail  # "auto" lets the API decide
+                )
+            except Exception as upload_error:
+                error_str = str(upload_error).lower()
+                is_retryable = (
+                    isinstance(upload_error, (APIConnectionError, RateLimitError, InternalServerError)) or
+                    'rate limit' in error_str or
+                    'timeout' in error_str or
+                    'connection' in error_str or
+                    '429' in error_str or
+                    '503' in error_str or
+                    '502' in error_str
+                )
+
+                if is_retryable and attempt < max_retries - 1:
+                    # Retry-able error - wait (without blocking the event loop) and retry
+                    logger.warning(f"⚠️ Upload attempt {attempt + 1} failed (retryable): {upload_error}. Retrying in {retry_delay}s...")
+                    await asyncio.sleep(retry_delay)
+                    retry_delay *= 2  # Exponential backoff
+                    continue
+                else:
+                    # Non-retryable error or max retries reached
+                    logger.error(f"❌ Failed to upload screenshot to OpenAI after {attempt + 1} attempts: {upload_error}", exc_info=True)
+                    logger.error(f"   CRITICAL: Cannot use base64 fallback as it causes GPT-5 validation errors.")
+
+                    # Return error message instead of base64
+                    # This prevents corrupted base64 from being stored in session
+                    return ToolOutputText(
+                        text=f"Error: Failed to upload screenshot to OpenAI after {attempt + 1} attempts. Please check API key and network connection. Error: {str(upload_error)[:200]}"
+                    )
+
     @function_tool
-    async def mobile_take_screenshot(ctx: ToolContext, device: str) -> Union[ToolOutputImage, ToolOutputText]:
+    async def mobile_take_screenshot(
+        ctx: ToolContext,
+        device: str,
+        region: Optional[List[int]] = None,
+    ) -> Union[ToolOutputImage, ToolOutputText]:
         """
         Take a screenshot of the mobile device and upload to OpenAI Files API.
         Returns ToolOutputImage with file_id to save tokens.
+        The image is sized to what the model can see and compressed (see
+        config.yaml `observation`); pass region to look at part of the screen
+        in more detail for fewer tokens.
 
         According to OpenAI Agents SDK documentation:
         https://openai.github.io/openai-agents-python/ref/tool/#agents.tool.ToolOutputImageDict
@@ -57,6 +203,7 @@ def create_screen_tools(adb_client: ADBClient, ui_automator: UIAutomator) -> Lis
         Args:
             ctx: ToolContext containing context with API key
             device: Device ID
+            region: Optional [x1, y1, x2, y2] in screen pixels to crop to
 
         Returns:
             ToolOutputImage with file_id (OpenAI file ID) when upload succeeds.
@@ -64,98 +211,160 @@ def create_screen_tools(adb_client: ADBClient, ui_automator: UIAutomator) -> Lis
             ToolOutputText with error message if screenshot capture fails.
         """
         try:
-            screenshot_bytes = adb_client.screencap(device)
-            if not screenshot_bytes:
+            frame = await adb_client.get_frame(device, max_age_ms=SCREENSHOT_MAX_AGE_MS)
+            if not frame:
                 return ToolOutputText(
                     text="Error: Failed to capture screenshot from device"
                 )
 
-            # Resize if too large (to save bandwidth and upload time)
-            screenshot_bytes = resize_image(screenshot_bytes, max_width=1920, max_height=1080)
+            return await _upload_observation(ctx, frame, region=region)
+        except Exception as e:
+            logger.error(f"Error taking screenshot: {e}", exc_info=True)
+            return ToolOutputText(
+                text=f"Error taking screenshot: {str(e)}"
+            )
+
+    @function_tool
+    async def mobile_take_marked_screenshot(
+        ctx: ToolContext,
+        device: str,
+    ) -> Union[List[Union[ToolOutputText, ToolOutputImage]], ToolOutputText]:
+        """
+        Take a screenshot with numbered boxes ("marks") drawn on interactive elements,
+        plus a legend of what each mark is. Replaces mobile_take_screenshot followed by
+        mobile_list_elements_on_screen. Click, double tap or long press a mark with the
+        mark parameter of the element tools (e.g. mobile_click_element(device, mark=3)).
+        Marks are valid until the screen changes; take a new marked screenshot after actions.
 
-            # Get OpenAI API key from context (passed from frontend via Runner.run context)
-            # Context should be a dict with 'api_key' key
-            api_key = None
-            if ctx.context and isinstance(ctx.context, dict):
-                api_key = ctx.context.get("api_key")
+        Args:
+            ctx: ToolContext containing context with API key
+            device: Device ID
 
-            # Fallback to environment variable for backward compatibility
-            if not api_key:
-                api_key = os.environ.get("OPENAI_API_KEY")
+        Returns:
+            Legend (one line per mark: id, class, label, resource id, center) and the
+            annotated screenshot (file_id), or ToolOutputText with an error message
+        """
+        try:
+            # Marks expire once anything changes the screen after this point
+            generation = adb_client.screen_generation(device)
 
-            if not api_key:
-                logger.error("❌ OpenAI API key not found in context or environment. Cannot upload screenshot.")
-                # CRITICAL: Don't use base64 fallback - it causes GPT-5 validation errors
-                # Return error message instead
+            # One frame and one hierarchy dump, captured concurrently
+            frame, elements = await asyncio.gather(
+                adb_client.get_frame(device, max_age_ms=SCREENSHOT_MAX_AGE_MS),
+                ui_automator.list_all_elements(device, interactive_only=False),
+            )
+            if not frame:
                 return ToolOutputText(
-                    text="Error: OpenAI API key is required to upload screenshots. Please provide API key in context."
+                    text="Error: Failed to capture screenshot from device"
                 )
 
-            # Upload to OpenAI Files API
-            # CRITICAL: Must always upload and use file_id - NEVER use base64 image_url
-            # Base64 image_url causes GPT-5 validation errors when stored in session history
-            # If upload fails, return error instead of base64 fallback
-            max_retries = 3
-            retry_delay = 1.0
+            marks = select_marks(elements or [], frame.size)
+            legend = format_legend(marks)
+            screen_marks.set(device, marks, generation)
 
-            for attempt in range(max_retries):
-                try:
-                    client = OpenAI(api_key=api_key)
+            image = await _upload_observation(
+                ctx,
+                frame,
+                annotate=lambda img, to_image: draw_marks(img, marks, to_image),
+                variant_suffix=":marks:" + hashlib.sha1(legend.encode("utf-8")).hexdigest(),
+            )
+            if isinstance(image, ToolOutputText):
+                return image
 
-                    # Create file-like object from bytes
-                    screenshot_file = io.BytesIO(screenshot_bytes)
-                    screenshot_file.name = "screenshot.png"
+            header = f"{len(marks)} marks on screen {frame.width}x{frame.height} (mark: class \"label\" id=resource-id (center x,y))"
+            return [ToolOutputText(text=f"{header}\n{legend}" if marks else "No interactive elements found"), image]
+        except Exception as e:
+            logger.error(f"Error taking marked screenshot: {e}", exc_info=True)
+            return ToolOutputText(
+                text=f"Error taking marked screenshot: {str(e)}"
+            )
 
-                    # Upload file to OpenAI
-                    # According to OpenAI API: files.create() for uploading files
-                    uploaded_file = client.files.create(
-                        file=screenshot_file,
-                        purpose="vision"  # Use "vision" purpose for image files
-                    )
+    def _format_elements(elements: Union[List[Dict], ElementSnapshot]) -> List[Dict]:
+        """Format elements for a tool response - prioritize actionable information"""
+        formatted_elements = []
+        for elem in elements:
+            # Only include elements that have meaningful information
+            has_text = bool(elem.get("text", "").strip())
+            has_desc = bool(elem.get("content_desc", "").strip())
+            has_resource_id = bool(elem.get("resource_id", "").strip())
+            is_clickable = elem.get("clickable", False)
+            is_focusable = elem.get("focusable", False)
+
+            # Skip elements without any identifying information
+            if not (has_text or has_desc or has_resource_id or is_clickable or is_focusable):
+                continue
+
+            formatted_elem = {
+                "class": elem.get("class", ""),
+                "resource_id": elem.get("resource_id", ""),
+                "text": elem.get("text", ""),
+                "content_desc": elem.get("content_desc", ""),
+                "bounds": elem.get("bounds", ""),
+                "center_x": elem.get("center_x"),
+                "center_y": elem.get("center_y"),
+                "clickable": elem.get("clickable", False),
+                "enabled": elem.get("enabled", True),
+                "focusable": elem.get("focusable", False),
+            }
+            formatted_elements.append(formatted_elem)
+        return formatted_elements
 
-                    file_id = uploaded_file.id
-                    logger.info(f"✅ Screenshot uploaded to OpenAI Files API: file_id={file_id} (attempt {attempt + 1})")
+    @function_tool
+    async def mobile_observe(
+        ctx: ToolContext,
+        device: str,
+    ) -> Union[List[Union[ToolOutputText, ToolOutputImage]], ToolOutputText]:
+        """
+        Observe the current screen in one call: screenshot, interactive elements and
+        foreground app. Use this instead of calling mobile_take_screenshot,
+        mobile_list_elements_on_screen and mobile_get_current_app one after another.
 
-                    # CRITICAL: Only return file_id - NEVER include image_url
-                    # When file_id is present, SDK uses it and won't need image_url
-                    # image_url is sent separately to frontend via WebSocket (see http_server.py)
-                    # This prevents GPT-5 from seeing base64 strings in session history
-                    return ToolOutputImage(
-                        file_id=file_id,
-                        detail="auto"  # Let SDK automatically decide detail level
-                    )
-                except Exception as upload_error:
-                    error_str = str(upload_error).lower()
-                    is_retryable = (
-                        'rate limit' in error_str or
-                        'timeout' in error_str or
-                        'connection' in error_str or
-                        '429' in error_str or
-                        '503' in error_str or
-                        '502' in error_str
-                    )
+        Args:
+            ctx: ToolContext containing context with API key
+            device: Device ID
 
-                    if is_retryable and attempt < max_retries - 1:
-                        # Retry-able error - wait and retry
-                        import time
-                        logger.warning(f"⚠️ Upload attempt {attempt + 1} failed (retryable): {upload_error}. Retrying in {retry_delay}s...")
-                        time.sleep(retry_delay)
-                        retry_delay *= 2  # Exponential backoff
-                        continue
-                    else:
-                        # Non-retryable error or max retries reached
-                        logger.error(f"❌ Failed to upload screenshot to OpenAI after {attempt + 1} attempts: {upload_error}", exc_info=True)
-                        logger.error(f"   CRITICAL: Cannot use base64 fallback as it causes GPT-5 validation errors.")
-
-                        # Return error message instead of base64
-                        # This prevents corrupted base64 from being stored in session
-                        return ToolOutputText(
-                            text=f"Error: Failed to upload screenshot to OpenAI after {attempt + 1} attempts. Please check API key and network connection. Error: {str(upload_error)[:200]}"
-                        )
+        Returns:
+            JSON with the foreground app (package, activity) and interactive elements,
+            plus the screenshot (file_id), or ToolOutputText with an error message
+        """
+        try:
+            # Screencap, hierarchy dump and focus query run concurrently on the device;
+            # a failed part is reported without losing the others
+            frame, elements, activity = await asyncio.gather(
+                adb_client.get_frame(device, max_age_ms=SCREENSHOT_MAX_AGE_MS),
+                ui_automator.get_snapshot(device, interactive_only=True),
+                adb_client.get_current_activity(device),
+                return_exceptions=True,
+            )
+            if isinstance(frame, BaseException) or not frame:
+                error = frame if isinstance(frame, BaseException) else "Failed to capture screenshot from device"
+                return ToolOutputText(text=f"Error: {error}")
+
+            observation = {}
+            if isinstance(activity, BaseException):
+                logger.warning(f"Foreground app query failed: {activity}")
+                observation["app"] = None
+            else:
+                package = activity.split("/")[0] if activity and "/" in activity else None
+                observation["app"] = {"package": package, "activity": activity} if package else None
+
+            if isinstance(elements, BaseException):
+                logger.warning(f"UI hierarchy dump failed: {elements}")
+                observation["elements"] = []
+                observation["elements_error"] = str(elements)
+            else:
+                observation["elements"] = _format_elements(elements or [])
+            observation["count"] = len(observation["elements"])
+            observation["screen"] = {"width": frame.width, "height": frame.height}
+
+            image = await _upload_observation(ctx, frame)
+            if isinstance(image, ToolOutputText):
+                return image
+            return [ToolOutputText(text=json.dumps(observation, ensure_ascii=False)), image]
         except Exception as e:
-            logger.error(f"Error taking screenshot: {e}", exc_info=True)
+            logger.error(f"Error observing screen: {e}", exc_info=True)
             return ToolOutputText(
-                text=f"Error taking screenshot: {str(e)}"
+                text=f"Error observing screen: {str(e)}"
             )
 
     @function_tool
@@ -172,35 +381,8 @@ def create_screen_tools(adb_client: ADBClient, ui_automator: UIAutomator) -> Lis
         """
         try:
             # Only get interactive elements (clickable, enabled, focusable, or have text/description)
-            elements = ui_automator.list_all_elements(device, interactive_only=True)
-
-            # Format elements for response - prioritize actionable information
-            formatted_elements = []
-            for elem in elements:
-                # Only include elements that have meaningful information
-                has_text = bool(elem.get("text", "").strip())
-                has_desc = bool(elem.get("content_desc", "").strip())
-                has_resource_id = bool(elem.get("resource_id", "").strip())
-                is_clickable = elem.get("clickable", False)
-                is_focusable = elem.get("focusable", False)
-
-                # Skip elements without any identifying information
-                if not (has_text or has_desc or has_resource_id or is_clickable or is_focusable):
-                    continue
-
-                formatted_elem = {
-                    "class": elem.get("class", ""),
-                    "resource_id": elem.get("resource_id", ""),
-                    "text": elem.get("text", ""),
-                    "content_desc": elem.get("content_desc", ""),
-                    "bounds": elem.get("bounds", ""),
-                    "center_x": elem.get("center_x"),
-                    "center_y": elem.get("center_y"),
-                    "clickable": elem.get("clickable", False),
-                    "enabled": elem.get("enabled", True),
-                    "focusable": elem.get("focusable", False),
-                }
-                formatted_elements.append(formatted_elem)
+            elements = await ui_automator.get_snapshot(device, interactive_only=True)
+            formatted_elements = _format_elements(elements or [])
 
             return {
                 "success": True,
@@ -225,10 +407,11 @@ def create_screen_tools(adb_client: ADBClient, ui_automator: UIAutomator) -> Lis
             Dict with success status and file path
         """
         try:
-            # Get screenshot bytes
-            screenshot_bytes = adb_client.screencap(device)
-            if not screenshot_bytes:
+            # Capture raw frame and encode it on the host (full resolution)
+            frame = await adb_client.get_frame(device, max_age_ms=SCREENSHOT_MAX_AGE_MS)
+            if not frame:
                 return {"success": False, "error": "Failed to capture screenshot"}
+            screenshot_bytes = await asyncio.to_thread(frame.to_png)
 
             # Ensure directory exists
             import os
@@ -255,6 +438,8 @@ def create_screen_tools(adb_client: ADBClient, ui_automator: UIAutomator) -> Lis
     # Return decorated functions - Agent will automatically use them as tools
     return [
         mobile_take_screenshot,
+        mobile_take_marked_screenshot,
+        mobile_observe,
         mobile_list_elements_on_screen,
         mobile_save_screenshot,
     ]
@@ -0,0 +1,175 @@
+"""Inverted indexes over element attributes for selector lookups"""
+import unicodedata
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set
+
+from .element_snapshot import ElementSnapshot
+
+
+@lru_cache(maxsize=8192)
+def normalize_text(value: str) -> str:
+    """
+    Key used to compare texts: lowercase, diacritics removed, whitespace collapsed
+
+    Vietnamese labels fold to plain letters ("Đăng nhập" -> "dang nhap"), so
+    queries typed with or without diacritics (or with a different Unicode
+    composition) find the same element.
+    """
+    if not value:
+        return ""
+    folded = unicodedata.normalize("NFD", value.casefold())
+    folded = "".join(char for char in folded if not unicodedata.combining(char))
+    # đ is a letter of its own, not d + combining mark
+    folded = folded.replace("đ", "d")
+    return " ".join(folded.split())
+
+
+def _bigrams(value: str) -> Set[str]:
+    """Character bigrams of a normalized string (the string itself if shorter)"""
+    if len(value) < 2:
+        return {value} if value else set()
+    return {value[i:i + 2] for i in range(len(value) - 1)}
+
+
+class _FieldIndex:
+    """
+    Normalized values of one text attribute with exact-key, bigram and
+    character postings
+
+    Postings are per distinct value: UIs repeat labels (list rows,
+    icons' descriptions), so most elements share a value with another one.
+    """
+
+    def __init__(self, values: Iterable[str]):
+        self.values: List[str] = []
+        # normalized value -> element indexes
+        self.keys: Dict[str, List[int]] = {}
+        # bigram or character -> normalized values
+        self.grams: Dict[str, List[str]] = {}
+        for index, value in enumerate(values):
+            value = normalize_text(value)
+            self.values.append(value)
+            if not value:
+                continue
+            rows = self.keys.get(value)
+            if rows is None:
+                rows = self.keys[value] = []
+                for gram in _bigrams(value) | set(value):
+                    self.grams.setdefault(gram, []).append(value)
+            rows.append(index)
+
+    def equal(self, query: str) -> List[int]:
+        return self.keys.get(query, [])
+
+    def similar(self, query: str) -> Set[int]:
+        """
+        Elements sharing a character with the query
+
+        Every fuzzy scorer gives 0 to a value without a character in common
+        with the query, so no value that can reach a positive cutoff is left
+        out (a shared bigram is not required: "abc" and "acb" share none).
+        """
+        keys = set()
+        for char in set(query):
+            keys.update(self.grams.get(char, ()))
+        return {index for key in keys for index in self.keys[key]}
+
+    def nonempty(self) -> Set[int]:
+        """Elements with a value"""
+        return {index for rows in self.keys.values() for index in rows}
+
+    def containing(self, query: str) -> List[int]:
+        """Elements whose value contains the query"""
+        if len(query) < 2:
+            keys = self.keys
+        else:
+            postings = sorted((self.grams.get(gram, []) for gram in _bigrams(query)), key=len)
+            keys = set(postings[0]).intersection(*postings[1:]) if postings[0] else ()
+        return sorted(index for key in keys if query in key for index in self.keys[key])
+
+
+class AttributeIndex:
+    """
+    Lookup tables from attribute values to element indexes of one snapshot
+
+    - resource id and class: exact values
+    - text and content description: normalized values (see normalize_text)
+      plus character and bigram postings giving fuzzy-match candidates
+
+    Element indexes are positions in the snapshot (view) the index was built
+    from and are returned in document order. Use
+    ElementSnapshot.attribute_index() to get the shared index of a snapshot.
+    """
+
+    def __init__(self, snapshot: ElementSnapshot):
+        """
+        Build indexes
+
+        Args:
+            snapshot: Elements to index
+        """
+        self.snapshot = snapshot
+        self.resource_ids: Dict[str, List[int]] = {}
+        self.classes: Dict[str, List[int]] = {}
+        texts, descs = [], []
+        for index, elem_class, elem_resource_id, elem_text, elem_desc in snapshot.iter_fields():
+            if elem_resource_id:
+                self.resource_ids.setdefault(elem_resource_id, []).append(index)
+            if elem_class:
+                self.classes.setdefault(elem_class, []).append(index)
+            texts.append(elem_text)
+            descs.append(elem_desc)
+        self.text = _FieldIndex(texts)
+        self.desc = _FieldIndex(descs)
+
+    def with_resource_id(self, resource_id: str) -> List[int]:
+        """Elements with exactly this resource id"""
+        return self.resource_ids.get(resource_id, [])
+
+    def with_class(self, class_name: str) -> List[int]:
+        """Elements with exactly this class"""
+        return self.classes.get(class_name, [])
+
+    def candidates(
+        self,
+        resource_id: Optional[str] = None,
+        text: Optional[str] = None,
+        description: Optional[str] = None,
+        class_name: Optional[str] = None,
+        prune_texts: bool = True,
+    ) -> List[int]:
+        """
+        Elements that can match a selector (see ElementParser.find_element)
+
+        Resource id and class must match exactly, so they narrow the
+        candidates on their own. Otherwise an element is a candidate if its
+        text or description shares a character with the normalized query:
+        substring matches and fuzzy matches above a cutoff of 0 always do, so
+        the candidates narrow the search without changing its result.
+
+        Args:
+            resource_id: Exact resource id
+            text: Normalized text query
+            description: Normalized content description query
+            class_name: Exact class
+            prune_texts: False = every element with a text (description) is a
+                candidate, for fuzzy matching with a cutoff of 0
+
+        Returns:
+            Element indexes in document order
+        """
+        if resource_id or class_name:
+            rows = None
+            if resource_id:
+                rows = self.with_resource_id(resource_id)
+            if class_name:
+                by_class = self.with_class(class_name)
+                rows = by_class if rows is None else sorted(set(rows).intersection(by_class))
+            return rows
+
+        found = set()
+        if text:
+            found.update(self.text.similar(text) if prune_texts else self.text.nonempty())
+        if description:
+            found.update(self.desc.similar(description) if prune_texts else self.desc.nonempty())
+        return sorted(found)
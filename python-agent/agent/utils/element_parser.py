@@ -1,17 +1,128 @@
 """Element parser for UI hierarchy"""
-from typing import List, Dict, Optional
-from difflib import SequenceMatcher
+from typing import Iterator, List, Dict, Optional, Tuple, Union
 import logging
 
+from .attribute_index import normalize_text
+from .element_snapshot import ElementSnapshot, CLICKABLE, ENABLED, HAS_BOUNDS
+from .fuzzy_match import fuzzy_matcher
+
 logger = logging.getLogger(__name__)
 
+# Element dicts or a snapshot of them
+Elements = Union[List[Dict], ElementSnapshot]
+
 
 class ElementParser:
     """Parser for finding and matching UI elements"""
 
+    @staticmethod
+    def _scored(
+        elements: Elements,
+        resource_id: Optional[str],
+        text: Optional[str],
+        description: Optional[str],
+        class_name: Optional[str],
+        fuzzy_match: bool,
+        min_similarity: float,
+    ) -> Iterator[Tuple[int, float]]:
+        """
+        (index, score) of every element matching any criterion, in document order
+
+        Text and description are compared normalized (see normalize_text),
+        each against all elements in one fuzzy_matcher batch. For a snapshot
+        only the candidates of its attribute index are scored.
+        """
+        text = normalize_text(text) if text else text
+        description = normalize_text(description) if description else description
+
+        if isinstance(elements, ElementSnapshot):
+            index = elements.attribute_index()
+            rows = index.candidates(resource_id, text, description, class_name,
+                                    prune_texts=not fuzzy_match or min_similarity > 0)
+            classes = [elements.class_name(row) for row in rows] if class_name else None
+            resource_ids = [elements.resource_id(row) for row in rows] if resource_id else None
+            texts = [index.text.values[row] for row in rows] if text else None
+            descs = [index.desc.values[row] for row in rows] if description else None
+        else:
+            rows = range(len(elements))
+            classes = [elem.get('class', '') for elem in elements] if class_name else None
+            resource_ids = [elem.get('resource_id', '') for elem in elements] if resource_id else None
+            texts = [normalize_text(elem.get('text') or '') for elem in elements] if text else None
+            descs = [normalize_text(elem.get('content_desc') or '') for elem in elements] if description else None
+
+        text_similarities = ElementParser._similarities(text, texts, fuzzy_match, min_similarity) if text else None
+        desc_similarities = (
+            ElementParser._similarities(description, descs, fuzzy_match, min_similarity) if description else None
+        )
+
+        for position, row in enumerate(rows):
+            score = ElementParser._match_score(
+                classes[position] if classes else '',
+                resource_ids[position] if resource_ids else '',
+                resource_id,
+                class_name,
+                text_similarities[position] if text_similarities else None,
+                desc_similarities[position] if desc_similarities else None,
+            )
+            if score is not None:
+                yield row, score
+
+    @staticmethod
+    def _similarities(
+        query: str,
+        values: List[str],
+        fuzzy_match: bool,
+        min_similarity: float,
+    ) -> List[Optional[float]]:
+        """Similarity of each normalized value to a normalized query, None where it does not match"""
+        if fuzzy_match:
+            scores = fuzzy_matcher.score_many(query, values, cutoff=min_similarity)
+            return [score if value and score >= min_similarity else None for value, score in zip(values, scores)]
+        return [1.0 if value and (query in value or value in query) else None for value in values]
+
+    @staticmethod
+    def _match_score(
+        elem_class: str,
+        elem_resource_id: str,
+        resource_id: Optional[str],
+        class_name: Optional[str],
+        text_similarity: Optional[float],
+        desc_similarity: Optional[float],
+    ) -> Optional[float]:
+        """Normalized match score of one element, None if it does not match any criterion"""
+        score = 0.0
+        matches = 0
+
+        # Match resource ID (exact match only)
+        if resource_id:
+            if elem_resource_id == resource_id:
+                score += 1.0
+                matches += 1
+            else:
+                return None  # Resource ID must match exactly
+
+        # Match class name (exact match only)
+        if class_name:
+            if elem_class == class_name:
+                score += 0.5
+                matches += 1
+            else:
+                return None  # Class must match exactly
+
+        # Match text and description (see _similarities)
+        for similarity in (text_similarity, desc_similarity):
+            if similarity is not None:
+                score += similarity
+                matches += 1
+
+        # Only consider elements that match at least one criterion
+        if matches == 0:
+            return None
+        return score / matches
+
     @staticmethod
     def find_element(
-        elements: List[Dict],
+        elements: Elements,
         resource_id: Optional[str] = None,
         text: Optional[str] = None,
         description: Optional[str] = None,
@@ -23,78 +134,108 @@ class ElementParser:
         Find element matching criteria
 
         Args:
-            elements: List of element dicts
+            elements: List of element dicts or an ElementSnapshot
             resource_id: Resource ID to match
-            text: Text to match
-            description: Content description to match
+            text: Text to match (case and diacritics are ignored)
+            description: Content description to match (case and diacritics are ignored)
             class_name: Class name to match
-            fuzzy_match: Use fuzzy matching for text/description
+            fuzzy_match: Use fuzzy matching for text/description (see fuzzy_match.fuzzy_matcher)
             min_similarity: Minimum similarity for fuzzy match (0-1)
 
         Returns:
             Matching element dict or None
         """
-        best_match = None
+        best_index = ElementParser._find_index(
+            elements, resource_id, text, description, class_name, fuzzy_match, min_similarity,
+        )
+        if best_index is None:
+            return None
+        return elements[best_index]
+
+    @staticmethod
+    def _find_index(
+        elements: Elements,
+        resource_id: Optional[str],
+        text: Optional[str],
+        description: Optional[str],
+        class_name: Optional[str],
+        fuzzy_match: bool,
+        min_similarity: float,
+    ) -> Optional[int]:
+        """Index of the best matching element (see find_element) or None"""
+        best_index = None
         best_score = 0.0
 
-        for elem in elements:
-            score = 0.0
-            matches = 0
-
-            # Match resource ID (exact match only)
-            if resource_id:
-                if elem.get('resource_id') == resource_id:
-                    score += 1.0
-                    matches += 1
-                else:
-                    continue  # Resource ID must match exactly
-
-            # Match class name (exact match only)
-            if class_name:
-                if elem.get('class') == class_name:
-                    score += 0.5
-                    matches += 1
-                else:
-                    continue  # Class must match exactly
-
-            # Match text
-            if text:
-                elem_text = elem.get('text', '')
-                if fuzzy_match:
-                    similarity = SequenceMatcher(None, text.lower(), elem_text.lower()).ratio()
-                    if similarity >= min_similarity:
-                        score += similarity
-                        matches += 1
-                else:
-                    if text.lower() in elem_text.lower() or elem_text.lower() in text.lower():
-                        score += 1.0
-                        matches += 1
-
-            # Match description
-            if description:
-                elem_desc = elem.get('content_desc', '')
-                if fuzzy_match:
-                    similarity = SequenceMatcher(None, description.lower(), elem_desc.lower()).ratio()
-                    if similarity >= min_similarity:
-                        score += similarity
-                        matches += 1
-                else:
-                    if description.lower() in elem_desc.lower() or elem_desc.lower() in description.lower():
-                        score += 1.0
-                        matches += 1
-
-            # Only consider elements that match at least one criterion
-            if matches > 0:
-                normalized_score = score / matches if matches > 0 else 0
-                if normalized_score > best_score:
-                    best_score = normalized_score
-                    best_match = elem
-
-        return best_match if best_score >= min_similarity else None
+        for index, normalized_score in ElementParser._scored(
+            elements, resource_id, text, description, class_name, fuzzy_match, min_similarity,
+        ):
+            if normalized_score > best_score:
+                best_score = normalized_score
+                best_index = index
+
+        if best_index is None or best_score < min_similarity:
+            return None
+        return best_index
+
+    @staticmethod
+    def is_text_input(class_name: str) -> bool:
+        """Whether a class is a text field (EditText and subclasses such as AutoCompleteTextView)"""
+        return "EditText" in class_name or class_name.endswith("AutoCompleteTextView")
+
+    @staticmethod
+    def find_labeled_input(
+        snapshot: ElementSnapshot,
+        label: str,
+        fuzzy_match: bool = True,
+        min_similarity: float = 0.6
+    ) -> Optional[Dict]:
+        """
+        Find the text field a label belongs to
+
+        The label is matched against text and content description. A matching
+        text field (hint text) is returned as is; otherwise the text field
+        nearest to the label, preferring fields to its right or below it
+        (where forms put them).
+
+        Args:
+            snapshot: Elements on screen
+            label: Label text
+            fuzzy_match: Use fuzzy matching for the label
+            min_similarity: Minimum similarity for fuzzy match (0-1)
+
+        Returns:
+            Text field element dict or None
+        """
+        label_index = ElementParser._find_index(
+            snapshot, None, label, label, None, fuzzy_match, min_similarity,
+        )
+        if label_index is None:
+            return None
+        if ElementParser.is_text_input(snapshot.class_name(label_index)):
+            return snapshot[label_index]
+
+        label_bounds = snapshot.bounds(label_index)
+        if label_bounds is None:
+            return None
+        x1, y1, x2, y2 = label_bounds
+        index = snapshot.spatial_index()
+        candidates = index.nearest(
+            (x1 + x2) / 2, (y1 + y2) / 2, k=4,
+            predicate=lambda i: ElementParser.is_text_input(snapshot.class_name(i)),
+        )
+        if not candidates:
+            return None
+
+        for field_index, _ in candidates:
+            fx1, fy1, fx2, fy2 = index.bounds(field_index)
+            # Entirely above or to the left of the label: more likely the previous field
+            if fy2 > y1 and fx2 > x1:
+                return snapshot[field_index]
+        return snapshot[candidates[0][0]]
 
     @staticmethod
     def find_elements(
-        elements: List[Dict],
+        elements: Elements,
         resource_id: Optional[str] = None,
         text: Optional[str] = None,
         description: Optional[str] = None,
@@ -106,12 +247,12 @@ class ElementParser:
         Find all elements matching criteria
 
         Args:
-            elements: List of element dicts
+            elements: List of element dicts or an ElementSnapshot
             resource_id: Resource ID to match
-            text: Text to match
-            description: Content description to match
+            text: Text to match (case and diacritics are ignored)
+            description: Content description to match (case and diacritics are ignored)
             class_name: Class name to match
-            fuzzy_match: Use fuzzy matching for text/description
+            fuzzy_match: Use fuzzy matching for text/description (see fuzzy_match.fuzzy_matcher)
             min_similarity: Minimum similarity for fuzzy match (0-1)
 
         Returns:
@@ -119,71 +260,30 @@ class ElementParser:
         """
         matches = []
 
-        for elem in elements:
-            score = 0.0
-            matches_count = 0
-
-            # Match resource ID (exact match only)
-            if resource_id:
-                if elem.get('resource_id') == resource_id:
-                    score += 1.0
-                    matches_count += 1
-                else:
-                    continue  # Resource ID must match exactly
-
-            # Match class name (exact match only)
-            if class_name:
-                if elem.get('class') == class_name:
-                    score += 0.5
-                    matches_count += 1
-                else:
-                    continue  # Class must match exactly
-
-            # Match text
-            if text:
-                elem_text = elem.get('text', '')
-                if fuzzy_match:
-                    similarity = SequenceMatcher(None, text.lower(), elem_text.lower()).ratio()
-                    if similarity >= min_similarity:
-                        score += similarity
-                        matches_count += 1
-                else:
-                    if text.lower() in elem_text.lower() or elem_text.lower() in text.lower():
-                        score += 1.0
-                        matches_count += 1
-
-            # Match description
-            if description:
-                elem_desc = elem.get('content_desc', '')
-                if fuzzy_match:
-                    similarity = SequenceMatcher(None, description.lower(), elem_desc.lower()).ratio()
-                    if similarity >= min_similarity:
-                        score += similarity
-                        matches_count += 1
-                else:
-                    if description.lower() in elem_desc.lower() or elem_desc.lower() in description.lower():
-                        score += 1.0
-                        matches_count += 1
-
-            # Only consider elements that match at least one criterion
-            if matches_count > 0:
-                normalized_score = score / matches_count if matches_count > 0 else 0
-                if normalized_score >= min_similarity:
-                    elem['_match_score'] = normalized_score
-                    matches.append(elem)
+        for index, normalized_score in ElementParser._scored(
+            elements, resource_id, text, description, class_name, fuzzy_match, min_similarity,
+        ):
+            if normalized_score >= min_similarity:
+                elem = elements[index]
+                elem['_match_score'] = normalized_score
+                matches.append(elem)
 
         # Sort by match score (highest first)
         matches.sort(key=lambda x: x.get('_match_score', 0), reverse=True)
         return matches
 
     @staticmethod
-    def get_clickable_elements(elements: List[Dict]) -> List[Dict]:
-        """Filter to only clickable elements"""
+    def get_clickable_elements(elements: Elements) -> Elements:
+        """Filter to only clickable elements (a snapshot view for a snapshot)"""
+        if isinstance(elements, ElementSnapshot):
+            return elements.filter(flags=CLICKABLE)
         return [e for e in elements if e.get('clickable', False)]
 
     @staticmethod
-    def get_visible_elements(elements: List[Dict]) -> List[Dict]:
-        """Filter to only visible/enabled elements"""
+    def get_visible_elements(elements: Elements) -> Elements:
+        """Filter to only visible/enabled elements (a snapshot view for a snapshot)"""
+        if isinstance(elements, ElementSnapshot):
+            return elements.filter(flags=ENABLED | HAS_BOUNDS)
         return [e for e in elements if e.get('enabled', True) and e.get('center_x') is not None]
 
     @staticmethod
@@ -0,0 +1,271 @@
+"""Immutable columnar store of the elements of one UI hierarchy dump"""
+import sys
+from array import array
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from .attribute_index import AttributeIndex
+    from .spatial_index import SpatialIndex
+
+# Flag bits (one byte per element)
+CLICKABLE = 1
+ENABLED = 2
+FOCUSABLE = 4
+HAS_BOUNDS = 8
+SCROLLABLE = 16
+
+
+def _readonly(values: array) -> memoryview:
+    return memoryview(values).toreadonly()
+
+
+class ElementSnapshot:
+    """
+    Elements of a hierarchy dump stored as columns
+
+    - bounds: int32 array, 4 values per element
+    - clickable/enabled/focusable/scrollable: bit flags, one byte per element
+    - class, resource id and package: indexes into interned string tables
+    - text and content description: tuples of strings
+
+    Snapshots are immutable and safe to share between tools and devices'
+    caches. filter() returns a view over the same columns. Element dicts
+    (the format tools return) are only built by element(), iteration and
+    to_dicts(). Views, the spatial index and the attribute index are built
+    once per snapshot and live as long as it does (the hierarchy cache keeps
+    it for one screen).
+    """
+
+    __slots__ = ("_strings", "_class_ids", "_resource_ids", "_package_ids", "_texts", "_descs",
+                 "_bounds", "_flags", "_depths", "_rows", "_derived")
+
+    def __init__(self, strings: Tuple[str, ...], class_ids: array, resource_ids: array, package_ids: array,
+                 texts: Tuple[str, ...], descs: Tuple[str, ...], bounds: array, flags: array, depths: array,
+                 rows: Optional[Sequence[int]] = None):
+        """Use ElementSnapshotBuilder (or filter()) instead of calling this directly"""
+        self._strings = strings
+        self._class_ids = _readonly(class_ids) if isinstance(class_ids, array) else class_ids
+        self._resource_ids = _readonly(resource_ids) if isinstance(resource_ids, array) else resource_ids
+        self._package_ids = _readonly(package_ids) if isinstance(package_ids, array) else package_ids
+        self._texts = texts
+        self._descs = descs
+        self._bounds = _readonly(bounds) if isinstance(bounds, array) else bounds
+        self._flags = _readonly(flags) if isinstance(flags, array) else flags
+        self._depths = _readonly(depths) if isinstance(depths, array) else depths
+        # Element positions of this view into the columns (None = all)
+        self._rows = rows
+        # filter() views and indexes, built on first use
+        self._derived: Dict = {}
+
+    # ========== Sequence protocol (elements as dicts) ==========
+
+    def __len__(self) -> int:
+        return len(self._rows) if self._rows is not None else len(self._texts)
+
+    def __getitem__(self, index: int) -> Dict:
+        return self.element(index)
+
+    def __iter__(self) -> Iterator[Dict]:
+        for index in range(len(self)):
+            yield self.element(index)
+
+    def element(self, index: int) -> Dict:
+        """Element info dict of an element (new dict on every call)"""
+        row = self._row(index)
+        flags = self._flags[row]
+        if flags & HAS_BOUNDS:
+            x1, y1, x2, y2 = self._bounds[4 * row:4 * row + 4]
+            bounds = f"[{x1},{y1}][{x2},{y2}]"
+            center_x, center_y = (x1 + x2) // 2, (y1 + y2) // 2
+        else:
+            x1 = y1 = x2 = y2 = center_x = center_y = None
+            bounds = ""
+        return {
+            'class': self._strings[self._class_ids[row]],
+            'resource_id': self._strings[self._resource_ids[row]],
+            'text': self._texts[row],
+            'content_desc': self._descs[row],
+            'package': self._strings[self._package_ids[row]],
+            'bounds': bounds,
+            'x1': x1,
+            'y1': y1,
+            'x2': x2,
+            'y2': y2,
+            'center_x': center_x,
+            'center_y': center_y,
+            'clickable': bool(flags & CLICKABLE),
+            'enabled': bool(flags & ENABLED),
+            'focusable': bool(flags & FOCUSABLE),
+            'scrollable': bool(flags & SCROLLABLE),
+        }
+
+    def to_dicts(self) -> List[Dict]:
+        """Element info dicts of all elements"""
+        return [self.element(index) for index in range(len(self))]
+
+    # ========== Column access (no dicts) ==========
+
+    def class_name(self, index: int) -> str:
+        return self._strings[self._class_ids[self._row(index)]]
+
+    def resource_id(self, index: int) -> str:
+        return self._strings[self._resource_ids[self._row(index)]]
+
+    def package(self, index: int) -> str:
+        return self._strings[self._package_ids[self._row(index)]]
+
+    def text(self, index: int) -> str:
+        return self._texts[self._row(index)]
+
+    def content_desc(self, index: int) -> str:
+        return self._descs[self._row(index)]
+
+    def flags(self, index: int) -> int:
+        return self._flags[self._row(index)]
+
+    def depth(self, index: int) -> int:
+        return self._depths[self._row(index)]
+
+    def bounds(self, index: int) -> Optional[Tuple[int, int, int, int]]:
+        """(x1, y1, x2, y2) or None"""
+        row = self._row(index)
+        if not self._flags[row] & HAS_BOUNDS:
+            return None
+        return tuple(self._bounds[4 * row:4 * row + 4])
+
+    def center(self, index: int) -> Optional[Tuple[int, int]]:
+        """Center (x, y) or None"""
+        bounds = self.bounds(index)
+        if bounds is None:
+            return None
+        return (bounds[0] + bounds[2]) // 2, (bounds[1] + bounds[3]) // 2
+
+    def iter_fields(self) -> Iterator[Tuple[int, str, str, str, str]]:
+        """(index, class, resource id, text, content description) of every element, without dicts"""
+        strings, class_ids, resource_ids = self._strings, self._class_ids, self._resource_ids
+        texts, descs = self._texts, self._descs
+        rows = self._rows if self._rows is not None else range(len(texts))
+        for index, row in enumerate(rows):
+            yield index, strings[class_ids[row]], strings[resource_ids[row]], texts[row], descs[row]
+
+    # ========== Views ==========
+
+    def filter(self, interactive_only: bool = False, flags: int = 0) -> "ElementSnapshot":
+        """
+        View of elements that have a class, optionally only interactive ones
+
+        Args:
+            interactive_only: Keep elements that are clickable, focusable or
+                enabled, or carry text/description
+            flags: Keep only elements with all of these flag bits
+
+        Returns:
+            ElementSnapshot sharing this snapshot's columns (the same view on repeated calls)
+        """
+        key = ("filter", interactive_only, flags)
+        view = self._derived.get(key)
+        if view is None:
+            view = self._derived[key] = self._filter(interactive_only, flags)
+        return view
+
+    def spatial_index(self) -> "SpatialIndex":
+        """Grid index over the bounds of this snapshot's elements (built once)"""
+        index = self._derived.get("spatial_index")
+        if index is None:
+            from .spatial_index import SpatialIndex
+            index = self._derived["spatial_index"] = SpatialIndex(self)
+        return index
+
+    def attribute_index(self) -> "AttributeIndex":
+        """Lookup tables for resource id, class, text and description (built once)"""
+        index = self._derived.get("attribute_index")
+        if index is None:
+            from .attribute_index import AttributeIndex
+            index = self._derived["attribute_index"] = AttributeIndex(self)
+        return index
+
+    def _filter(self, interactive_only: bool, flags: int) -> "ElementSnapshot":
+        strings, class_ids, all_flags = self._strings, self._class_ids, self._flags
+        texts, descs = self._texts, self._descs
+        rows = self._rows if self._rows is not None else range(len(texts))
+        interactive_bits = CLICKABLE | FOCUSABLE | ENABLED
+
+        kept = array("I")
+        for row in rows:
+            if not strings[class_ids[row]]:
+                continue
+            row_flags = all_flags[row]
+            if flags and row_flags & flags != flags:
+                continue
+            if interactive_only and not (
+                row_flags & interactive_bits or texts[row].strip() or descs[row].strip()
+            ):
+                continue
+            kept.append(row)
+
+        return ElementSnapshot(self._strings, self._class_ids, self._resource_ids, self._package_ids,
+                               self._texts, self._descs, self._bounds, self._flags, self._depths,
+                               rows=_readonly(kept))
+
+    def _row(self, index: int) -> int:
+        if index < 0:
+            index += len(self)
+        return self._rows[index] if self._rows is not None else index
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns (strings counted once)"""
+        size = sum(view.nbytes for view in (self._class_ids, self._resource_ids, self._package_ids,
+                                            self._bounds, self._flags, self._depths))
+        size += sum(sys.getsizeof(value) for value in self._strings)
+        size += sys.getsizeof(self._texts) + sys.getsizeof(self._descs)
+        size += sum(sys.getsizeof(value) for value in self._texts if value)
+        size += sum(sys.getsizeof(value) for value in self._descs if value)
+        return size
+
+
+class ElementSnapshotBuilder:
+    """Collect elements in document order, then build() an ElementSnapshot"""
+
+    def __init__(self):
+        # Interned string table ("" is always id 0)
+        self._string_ids: Dict[str, int] = {"": 0}
+        self._class_ids = array("I")
+        self._resource_ids = array("I")
+        self._package_ids = array("I")
+        self._texts: List[str] = []
+        self._descs: List[str] = []
+        self._bounds = array("i")
+        self._flags = array("B")
+        self._depths = array("H")
+
+    def add(self, depth: int, class_name: str, resource_id: str, package: str, text: str, content_desc: str,
+            bounds: Optional[Tuple[int, int, int, int]], clickable: bool, enabled: bool, focusable: bool,
+            scrollable: bool = False):
+        """Append one element"""
+        self._class_ids.append(self._intern(class_name))
+        self._resource_ids.append(self._intern(resource_id))
+        self._package_ids.append(self._intern(package))
+        self._texts.append(text)
+        self._descs.append(content_desc)
+        self._depths.append(min(depth, 0xFFFF))
+
+        flags = (CLICKABLE if clickable else 0) | (ENABLED if enabled else 0) | (FOCUSABLE if focusable else 0)
+        if scrollable:
+            flags |= SCROLLABLE
+        if bounds is not None:
+            flags |= HAS_BOUNDS
+            self._bounds.extend(bounds)
+        else:
+            self._bounds.extend((0, 0, 0, 0))
+        self._flags.append(flags)
+
+    def build(self) -> ElementSnapshot:
+        strings = tuple(self._string_ids)
+        return ElementSnapshot(strings, self._class_ids, self._resource_ids, self._package_ids,
+                               tuple(self._texts), tuple(self._descs), self._bounds, self._flags, self._depths)
+
+    def _intern(self, value: str) -> int:
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = self._string_ids[value] = len(self._string_ids)
+        return string_id
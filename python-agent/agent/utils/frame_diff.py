@@ -0,0 +1,114 @@
+"""Screen change detection on downsampled frames"""
+import logging
+from typing import List, Optional, Tuple
+
+from PIL import Image, ImageChops
+
+logger = logging.getLogger(__name__)
+
+Rect = Tuple[int, int, int, int]  # (x, y, width, height)
+
+
+class FrameChange:
+    """Result of comparing a frame with the previous one"""
+
+    def __init__(self, changed: bool, dirty_rects: List[Rect], dirty_ratio: float):
+        """
+        Args:
+            changed: Anything on screen changed
+            dirty_rects: Changed regions in frame pixels (tile aligned, merged)
+            dirty_ratio: Fraction of tiles that changed (1.0 for the first frame)
+        """
+        self.changed = changed
+        self.dirty_rects = dirty_rects
+        self.dirty_ratio = dirty_ratio
+
+
+class FrameChangeDetector:
+    """
+    Detect which parts of the screen changed between consecutive frames
+
+    Frames are box-downsampled to grayscale thumbnails (every pixel still
+    contributes, so small changes like a blinking cursor are caught) and the
+    thumbnails are diffed tile by tile.
+    """
+
+    def __init__(self, sample_factor: int = 8, tile_size: int = 128):
+        """
+        Initialize detector
+
+        Args:
+            sample_factor: Downsampling factor for the comparison thumbnail
+            tile_size: Tile edge in frame pixels (multiple of sample_factor)
+        """
+        self.sample_factor = sample_factor
+        self.tile_size = tile_size
+        self._previous: Optional[Image.Image] = None
+        self._frame_size: Optional[Tuple[int, int]] = None
+
+    def reset(self):
+        """Forget the previous frame (next update reports a full change)"""
+        self._previous = None
+        self._frame_size = None
+
+    def update(self, frame) -> FrameChange:
+        """
+        Compare a frame with the previous one and remember it
+
+        Args:
+            frame: agent.adb.frame.Frame
+
+        Returns:
+            FrameChange
+        """
+        thumbnail = frame.to_image().convert("L").reduce(self.sample_factor)
+        previous, self._previous = self._previous, thumbnail
+        previous_size, self._frame_size = self._frame_size, frame.size
+
+        if previous is None or previous_size != frame.size or previous.size != thumbnail.size:
+            return FrameChange(True, [(0, 0, frame.width, frame.height)], 1.0)
+
+        diff = ImageChops.difference(previous, thumbnail)
+        bbox = diff.getbbox()
+        if bbox is None:
+            return FrameChange(False, [], 0.0)
+
+        # Tile grid in thumbnail pixels
+        step = max(1, self.tile_size // self.sample_factor)
+        cols = (thumbnail.width + step - 1) // step
+        rows = (thumbnail.height + step - 1) // step
+
+        dirty = []
+        for row in range(bbox[1] // step, (bbox[3] - 1) // step + 1):
+            for col in range(bbox[0] // step, (bbox[2] - 1) // step + 1):
+                box = (col * step, row * step, min((col + 1) * step, thumbnail.width), min((row + 1) * step, thumbnail.height))
+                if diff.crop(box).getbbox() is not None:
+                    dirty.append((col, row))
+
+        rects = self._merge_tiles(dirty, frame.width, frame.height)
+        return FrameChange(True, rects, len(dirty) / (cols * rows))
+
+    def _merge_tiles(self, tiles: List[Tuple[int, int]], width: int, height: int) -> List[Rect]:
+        """Merge dirty tiles into rectangles: horizontal runs, then identical runs on consecutive rows"""
+        runs = []  # (row, first_col, last_col)
+        for col, row in sorted(tiles, key=lambda t: (t[1], t[0])):
+            if runs and runs[-1][0] == row and runs[-1][2] == col - 1:
+                runs[-1] = (row, runs[-1][1], col)
+            else:
+                runs.append((row, col, col))
+
+        blocks = []  # [first_row, last_row, first_col, last_col]
+        for row, first_col, last_col in runs:
+            for block in blocks:
+                if block[1] == row - 1 and block[2] == first_col and block[3] == last_col:
+                    block[1] = row
+                    break
+            else:
+                blocks.append([row, row, first_col, last_col])
+
+        tile = self.tile_size
+        rects = []
+        for first_row, last_row, first_col, last_col in blocks:
+            x, y = first_col * tile, first_row * tile
+            rects.append((x, y, min((last_col + 1) * tile, width) - x, min((last_row + 1) * tile, height) - y))
+        return rects
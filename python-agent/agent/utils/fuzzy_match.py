@@ -0,0 +1,217 @@
+"""
+Fuzzy text similarity for element lookups
+
+Scores are in [0, 1]. The distances are computed bit-parallel: the query
+becomes one bit mask per character (a Python int, so any length) and each
+candidate character costs a few integer operations instead of a row of the
+dynamic-programming table.
+
+Scorers:
+    ratio             2 * LCS / (len(a) + len(b)), same scale as difflib's
+                      ratio() and never below it (default)
+    levenshtein       1 - edit distance / max(len(a), len(b))
+    token_set         word-set ratio: word order and extra words on one side
+                      are ignored ("nhap dang" == "dang nhap")
+    sequence_matcher  difflib.SequenceMatcher(None, query, candidate).ratio()
+
+ElementParser scores normalized texts (see attribute_index.normalize_text),
+so even sequence_matcher does not give the scores of the raw-text difflib
+matching used before. ratio ranks candidates differently from difflib on
+some long texts: on feed-like dumps about 2% of queries pick a different
+best element (see benchmarks/fuzzy_match_benchmark.py).
+"""
+import logging
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+SCORERS = ("ratio", "levenshtein", "token_set", "sequence_matcher")
+
+if hasattr(int, "bit_count"):
+    _popcount = int.bit_count
+else:  # Python < 3.10
+    def _popcount(value: int) -> int:
+        return bin(value).count("1")
+
+
+def _char_masks(pattern: str) -> Dict[str, int]:
+    """Bit i of masks[c] is set where pattern[i] == c"""
+    masks: Dict[str, int] = {}
+    bit = 1
+    for char in pattern:
+        masks[char] = masks.get(char, 0) | bit
+        bit <<= 1
+    return masks
+
+
+def _lcs(masks: Dict[str, int], length: int, text: str) -> int:
+    """Length of the longest common subsequence of the masked pattern and a text (Hyyrö)"""
+    full = (1 << length) - 1
+    row = full
+    get = masks.get
+    for char in text:
+        matches = row & get(char, 0)
+        row = ((row + matches) | (row - matches)) & full
+    return length - _popcount(row)
+
+
+def _levenshtein(masks: Dict[str, int], length: int, text: str) -> int:
+    """Edit distance of the masked pattern and a text (Myers / Hyyrö)"""
+    if not length:
+        return len(text)
+    full = (1 << length) - 1
+    last = 1 << (length - 1)
+    vp, vn = full, 0
+    distance = length
+    get = masks.get
+    for char in text:
+        eq = get(char, 0)
+        x = eq | vn
+        d0 = ((((x & vp) + vp) & full) ^ vp) | x
+        hp = (vn | ~(d0 | vp)) & full
+        hn = vp & d0
+        if hp & last:
+            distance += 1
+        elif hn & last:
+            distance -= 1
+        x = ((hp << 1) | 1) & full
+        vn = x & d0
+        vp = ((hn << 1) | ~(d0 | x)) & full
+    return distance
+
+
+def lcs_length(a: str, b: str) -> int:
+    """Length of the longest common subsequence"""
+    return _lcs(_char_masks(a), len(a), b)
+
+
+def levenshtein_distance(a: str, b: str) -> int:
+    """Minimum number of single-character insertions, deletions and substitutions"""
+    return _levenshtein(_char_masks(a), len(a), b)
+
+
+def ratio(a: str, b: str) -> float:
+    """2 * LCS / (len(a) + len(b)), 1.0 for two empty strings"""
+    total = len(a) + len(b)
+    return 2 * lcs_length(a, b) / total if total else 1.0
+
+
+def token_set_ratio(a: str, b: str) -> float:
+    """ratio() of the sorted common words against each side's full word set"""
+    words_a, words_b = set(a.split()), set(b.split())
+    if not words_a or not words_b:
+        return 1.0 if words_a == words_b else 0.0
+
+    common = " ".join(sorted(words_a & words_b))
+    rest_a = " ".join(sorted(words_a - words_b))
+    rest_b = " ".join(sorted(words_b - words_a))
+    if common and (not rest_a or not rest_b):
+        # One side's words are all in the other
+        return 1.0
+
+    combined_a = f"{common} {rest_a}".strip()
+    combined_b = f"{common} {rest_b}".strip()
+    best = ratio(combined_a, combined_b)
+    if common:
+        best = max(best, ratio(common, combined_a), ratio(common, combined_b))
+    return best
+
+
+class FuzzyMatcher:
+    """
+    Scores a query against candidate strings
+
+    score_many() is the batch API used by element lookups: the query's bit
+    masks are built once, repeated candidates are scored once, and
+    candidates whose length alone rules out reaching the cutoff are skipped
+    without scoring.
+    """
+
+    def __init__(self, scorer: str = "ratio"):
+        """
+        Initialize matcher
+
+        Args:
+            scorer: One of SCORERS
+        """
+        if scorer not in SCORERS:
+            raise ValueError(f"Unknown fuzzy scorer '{scorer}', expected one of {', '.join(SCORERS)}")
+        self.scorer = scorer
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict]) -> "FuzzyMatcher":
+        """Create matcher from the `fuzzy_match` config section"""
+        config = config or {}
+        scorer = config.get("scorer") or "ratio"
+        if scorer not in SCORERS:
+            logger.warning(f"Unknown fuzzy scorer '{scorer}', using 'ratio'")
+            scorer = "ratio"
+        return cls(scorer=scorer)
+
+    def configure(self, config: Optional[Dict]):
+        """Apply the `fuzzy_match` config section to this matcher"""
+        self.__dict__.update(FuzzyMatcher.from_config(config).__dict__)
+
+    def score(self, query: str, candidate: str, cutoff: float = 0.0) -> float:
+        """Similarity of one candidate (0.0 if below cutoff)"""
+        return self.score_many(query, (candidate,), cutoff)[0]
+
+    def score_many(self, query: str, candidates: Sequence[str], cutoff: float = 0.0) -> List[float]:
+        """
+        Similarity of every candidate to a query
+
+        Args:
+            query: Query string
+            candidates: Candidate strings
+            cutoff: Scores below this are reported as 0.0 (and may be skipped)
+
+        Returns:
+            One score per candidate, in order
+        """
+        length = len(query)
+        masks = _char_masks(query) if self.scorer in ("ratio", "levenshtein") else None
+        seen: Dict[str, float] = {}
+        scores = []
+        for candidate in candidates:
+            value = seen.get(candidate)
+            if value is None:
+                value = self._score(query, length, masks, candidate, cutoff)
+                if value < cutoff:
+                    value = 0.0
+                seen[candidate] = value
+            scores.append(value)
+        return scores
+
+    def _score(self, query: str, length: int, masks: Optional[Dict[str, int]], candidate: str, cutoff: float) -> float:
+        other = len(candidate)
+        total = length + other
+        if not total:
+            return 1.0
+        scorer = self.scorer
+
+        if scorer == "ratio":
+            # LCS <= shorter length
+            if 2 * min(length, other) < cutoff * total:
+                return 0.0
+            return 2 * _lcs(masks, length, candidate) / total
+
+        if scorer == "levenshtein":
+            longest = max(length, other)
+            # Distance >= length difference
+            if min(length, other) < cutoff * longest:
+                return 0.0
+            return 1.0 - _levenshtein(masks, length, candidate) / longest
+
+        if scorer == "token_set":
+            return token_set_ratio(query, candidate)
+
+        matcher = SequenceMatcher(None, query, candidate)
+        # Cheap upper bounds first (exact: the result is the same as ratio())
+        if matcher.real_quick_ratio() < cutoff or matcher.quick_ratio() < cutoff:
+            return 0.0
+        return matcher.ratio()
+
+
+# Matcher used by ElementParser (configured from config.yaml in main.py)
+fuzzy_matcher = FuzzyMatcher()
@@ -0,0 +1,254 @@
+"""Screenshot preprocessing for LLM observations under a token budget"""
+import math
+import logging
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+from PIL import Image
+
+from .screenshot import encode_image
+
+logger = logging.getLogger(__name__)
+
+# Image token accounting per model family (OpenAI vision pricing).
+# "tile": fit in 2048x2048, shortest side scaled to 768, then
+#         base + per_tile * number of 512px tiles (detail=low costs base only)
+# "patch": number of 32px patches, capped at 1536, times a multiplier
+MODEL_IMAGE_COSTS: Dict[str, Dict] = {
+    "gpt-4o-mini": {"kind": "tile", "base": 2833, "tile": 5667},
+    "gpt-4o": {"kind": "tile", "base": 85, "tile": 170},
+    "gpt-4.1-mini": {"kind": "patch", "multiplier": 1.62},
+    "gpt-4.1-nano": {"kind": "patch", "multiplier": 2.46},
+    "gpt-5-mini": {"kind": "patch", "multiplier": 1.62},
+    "gpt-5-nano": {"kind": "patch", "multiplier": 2.46},
+    "gpt-4.1": {"kind": "tile", "base": 85, "tile": 170},
+    "gpt-4": {"kind": "tile", "base": 85, "tile": 170},
+    "gpt-5": {"kind": "tile", "base": 70, "tile": 140},
+    "o4-mini": {"kind": "patch", "multiplier": 1.72},
+    "o1": {"kind": "tile", "base": 75, "tile": 150},
+    "o3": {"kind": "tile", "base": 75, "tile": 150},
+}
+DEFAULT_IMAGE_COST = MODEL_IMAGE_COSTS["gpt-4o"]
+
+MAX_PATCHES = 1536
+PATCH_SIZE = 32
+TILE_SIZE = 512
+LOW_DETAIL_SIZE = 512
+
+def image_cost(model: Optional[str]) -> Dict:
+    """Token accounting of a model (longest matching name prefix, gpt-4o rules otherwise)"""
+    if model:
+        for name in sorted(MODEL_IMAGE_COSTS, key=len, reverse=True):
+            if model.startswith(name):
+                return MODEL_IMAGE_COSTS[name]
+    return DEFAULT_IMAGE_COST
+
+
+def model_image_size(width: int, height: int, model: Optional[str], detail: str = "high") -> Tuple[int, int]:
+    """
+    Size the model actually looks at for an image of width x height
+
+    Uploading more pixels than this only costs bandwidth - the API
+    downscales to it anyway.
+    """
+    cost = image_cost(model)
+    scale = 1.0
+    if cost["kind"] == "patch":
+        patches = math.ceil(width / PATCH_SIZE) * math.ceil(height / PATCH_SIZE)
+        if patches > MAX_PATCHES:
+            scale = math.sqrt(PATCH_SIZE * PATCH_SIZE * MAX_PATCHES / (width * height))
+    elif detail == "low":
+        scale = min(1.0, LOW_DETAIL_SIZE / max(width, height))
+    else:
+        scale = min(1.0, 2048 / max(width, height))
+        shortest = min(width, height) * scale
+        if shortest > 768:
+            scale *= 768 / shortest
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+def estimate_image_tokens(width: int, height: int, model: Optional[str], detail: str = "high") -> int:
+    """
+    Estimated input tokens for an image
+
+    Args:
+        width: Image width
+        height: Image height
+        model: Model name (e.g. "gpt-4o", "gpt-5-2025-08-07")
+        detail: "low", "high" or "auto" (treated as high)
+
+    Returns:
+        Estimated token count
+    """
+    cost = image_cost(model)
+    width, height = model_image_size(width, height, model, detail)
+    if cost["kind"] == "patch":
+        patches = min(MAX_PATCHES, math.ceil(width / PATCH_SIZE) * math.ceil(height / PATCH_SIZE))
+        return math.ceil(patches * cost["multiplier"])
+    if detail == "low":
+        return cost["base"]
+    tiles = math.ceil(width / TILE_SIZE) * math.ceil(height / TILE_SIZE)
+    return cost["base"] + cost["tile"] * tiles
+
+
+def downscale(img: Image.Image, width: int, height: int) -> Image.Image:
+    """
+    Downscale to width x height: integer reduce() (box filter, fast) to within
+    2x of the target, then one small resample for the remainder
+    """
+    factor = min(img.width // width, img.height // height)
+    if factor >= 2:
+        img = img.reduce(factor)
+    if img.size != (width, height):
+        img = img.resize((width, height), Image.Resampling.LANCZOS)
+    return img
+
+
+class Observation:
+    """Encoded screenshot ready to send to a model"""
+
+    def __init__(self, data: bytes, format: str, width: int, height: int, estimated_tokens: int,
+                 region: Optional[Tuple[int, int, int, int]] = None):
+        """
+        Args:
+            data: Encoded image bytes
+            format: "JPEG", "WEBP" or "PNG"
+            width: Image width
+            height: Image height
+            estimated_tokens: Estimated input tokens for the image
+            region: Cropped region (x1, y1, x2, y2) in device pixels, None for full screen
+        """
+        self.data = data
+        self.format = format
+        self.width = width
+        self.height = height
+        self.estimated_tokens = estimated_tokens
+        self.region = region
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self.data)
+
+    @property
+    def filename(self) -> str:
+        return "screenshot." + ("jpg" if self.format == "JPEG" else self.format.lower())
+
+
+class ObservationPipeline:
+    """
+    Turn a captured frame into the cheapest image that keeps what the model sees
+
+    crop to region -> downscale to the model's effective size (and the pixel
+    budget) -> optional grayscale -> JPEG/WebP/PNG
+    """
+
+    def __init__(
+        self,
+        format: str = "JPEG",
+        quality: int = 80,
+        grayscale: bool = False,
+        detail: str = "auto",
+        max_pixels: Optional[int] = None,
+        model_max_pixels: Optional[Dict[str, int]] = None,
+    ):
+        """
+        Initialize pipeline
+
+        Args:
+            format: Output format ("JPEG", "WEBP" or "PNG")
+            quality: Quality 1-100 for JPEG/WebP
+            grayscale: Convert to grayscale (smaller, loses color cues)
+            detail: Image detail sent with the observation ("low", "high" or "auto")
+            max_pixels: Pixel budget for every model (None = model's effective size only)
+            model_max_pixels: Pixel budget per model name prefix (overrides max_pixels)
+        """
+        self.format = format.upper()
+        self.quality = quality
+        self.grayscale = grayscale
+        self.detail = detail
+        self.max_pixels = max_pixels
+        self.model_max_pixels = model_max_pixels or {}
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict]) -> "ObservationPipeline":
+        """Create pipeline from the `observation` config section (missing keys use defaults)"""
+        config = config or {}
+        keys = ("format", "quality", "grayscale", "detail", "max_pixels", "model_max_pixels")
+        return cls(**{key: config[key] for key in keys if config.get(key) is not None})
+
+    def configure(self, config: Optional[Dict]):
+        """Apply the `observation` config section to this pipeline"""
+        self.__dict__.update(ObservationPipeline.from_config(config).__dict__)
+
+    def variant(self, model: Optional[str], region: Optional[Sequence[int]] = None) -> str:
+        """Key identifying the output settings (for caches of prepared images)"""
+        region = ",".join(str(int(v)) for v in region) if region else ""
+        return f"{self.format}:{self.quality}:{int(self.grayscale)}:{self.detail}:{self.pixel_budget(model)}:{model}:{region}"
+
+    def pixel_budget(self, model: Optional[str]) -> Optional[int]:
+        """Pixel budget for a model"""
+        if model:
+            for name in sorted(self.model_max_pixels, key=len, reverse=True):
+                if model.startswith(name):
+                    return self.model_max_pixels[name]
+        return self.max_pixels
+
+    def prepare(self, frame, model: Optional[str] = None, region: Optional[Sequence[int]] = None,
+                annotate: Optional[Callable] = None) -> Observation:
+        """
+        Prepare a frame for the model (CPU-bound, run in a worker thread)
+
+        Args:
+            frame: agent.adb.frame.Frame
+            model: Model name used for sizing and token estimate
+            region: Optional (x1, y1, x2, y2) in device pixels to crop to
+            annotate: Optional annotate(img, to_image) drawing on the final-size
+                RGB image; to_image maps device (x, y) to image (x, y)
+
+        Returns:
+            Observation
+        """
+        img = frame.to_image()
+
+        crop = None
+        if region:
+            x1, y1, x2, y2 = (int(v) for v in region)
+            crop = (max(0, min(x1, x2)), max(0, min(y1, y2)), min(img.width, max(x1, x2)), min(img.height, max(y1, y2)))
+            if crop[2] > crop[0] and crop[3] > crop[1]:
+                img = img.crop(crop)
+            else:
+                logger.warning(f"Ignoring empty region {region} for {img.width}x{img.height} screen")
+                crop = None
+
+        detail = "low" if self.detail == "low" else "high"
+        width, height = model_image_size(img.width, img.height, model, detail)
+        budget = self.pixel_budget(model)
+        if budget and width * height > budget:
+            scale = math.sqrt(budget / (width * height))
+            width, height = max(1, int(width * scale)), max(1, int(height * scale))
+
+        source_width, source_height = img.size
+        img = downscale(img, width, height)
+        if self.grayscale:
+            img = img.convert("L")
+        if annotate or img.mode not in ("RGB", "L"):
+            # Annotations stay in color on grayscale screenshots
+            img = img.convert("RGB")
+
+        if annotate:
+            offset_x, offset_y = crop[:2] if crop else (0, 0)
+            scale_x, scale_y = img.width / source_width, img.height / source_height
+            annotate(img, lambda x, y: ((x - offset_x) * scale_x, (y - offset_y) * scale_y))
+
+        data = encode_image(img, self.format, self.quality)
+        return Observation(
+            data,
+            self.format,
+            img.width,
+            img.height,
+            estimate_image_tokens(img.width, img.height, model, detail),
+            region=crop,
+        )
+
+
+# Observation settings shared by all agent instances (configured from config.yaml at startup)
+observation_pipeline = ObservationPipeline()
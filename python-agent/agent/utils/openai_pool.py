@@ -0,0 +1,82 @@
+"""Shared AsyncOpenAI clients keyed by API key"""
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Optional
+
+try:
+    from openai import AsyncOpenAI
+except ImportError:
+    raise ImportError("openai package not installed. Run: pip install openai")
+
+logger = logging.getLogger(__name__)
+
+
+class OpenAIClientPool:
+    """
+    Keep one AsyncOpenAI client (and its keep-alive connection pool) per API key
+
+    Tools are created per chat request; taking clients from here instead of
+    constructing them per call means uploads reuse warm TLS connections.
+    Uploads are additionally bounded by a shared semaphore so a burst of
+    screenshots does not open a connection each.
+    """
+
+    def __init__(self, max_clients: int = 8, max_concurrent_uploads: int = 4):
+        """
+        Initialize pool
+
+        Args:
+            max_clients: API keys kept at once (least recently used client is closed)
+            max_concurrent_uploads: Uploads allowed in flight at once
+        """
+        self.max_clients = max_clients
+        self.max_concurrent_uploads = max_concurrent_uploads
+        # sha256(api_key) prefix -> AsyncOpenAI
+        self._clients: "OrderedDict[str, AsyncOpenAI]" = OrderedDict()
+        self._upload_slots: Optional[asyncio.Semaphore] = None
+
+    def get(self, api_key: str) -> AsyncOpenAI:
+        """
+        Get the client for an API key, creating it on first use
+
+        Args:
+            api_key: OpenAI API key
+
+        Returns:
+            AsyncOpenAI client (do not close it, the pool owns it)
+        """
+        key = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+        client = self._clients.get(key)
+        if client is None:
+            # Callers implement their own retry policy with backoff
+            client = AsyncOpenAI(api_key=api_key, max_retries=0)
+            self._clients[key] = client
+            while len(self._clients) > self.max_clients:
+                _, evicted = self._clients.popitem(last=False)
+                asyncio.get_event_loop().create_task(evicted.close())
+        else:
+            self._clients.move_to_end(key)
+        return client
+
+    @property
+    def upload_slots(self) -> asyncio.Semaphore:
+        """Semaphore bounding concurrent uploads (created in the running loop)"""
+        if self._upload_slots is None:
+            self._upload_slots = asyncio.Semaphore(self.max_concurrent_uploads)
+        return self._upload_slots
+
+    async def close(self):
+        """Close all clients"""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            try:
+                await client.close()
+            except Exception as e:
+                logger.debug(f"Error closing OpenAI client: {e}")
+
+
+# Shared by all agent instances
+openai_clients = OpenAIClientPool()
@@ -81,3 +81,93 @@ def resize_image(image_bytes: bytes, max_width: int = 1920, max_height: int = 10
         logger.error(f"Error resizing image: {e}")
         return image_bytes
 
+
+
+def fit_image(img: Image.Image, max_width: Optional[int] = None, max_height: Optional[int] = None) -> Image.Image:
+    """
+    Downscale an image to fit max_width x max_height (aspect ratio kept) and drop alpha
+
+    Args:
+        img: PIL image
+        max_width: Maximum width (None for no limit)
+        max_height: Maximum height (None for no limit)
+
+    Returns:
+        RGB image (the input itself if nothing had to change)
+    """
+    width, height = img.size
+
+    if max_width and max_height and (width > max_width or height > max_height):
+        ratio = min(max_width / width, max_height / height)
+        img = img.resize((int(width * ratio), int(height * ratio)), Image.Resampling.LANCZOS)
+
+    # Screens are opaque - drop alpha (RGBX frames carry padding there)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    return img
+
+
+def encode_image(img: Image.Image, format: str = "PNG", quality: int = 85) -> bytes:
+    """
+    Encode a PIL image
+
+    Args:
+        img: PIL image
+        format: Output format ("PNG", "JPEG" or "WEBP")
+        quality: Quality 1-100 for lossy formats
+
+    Returns:
+        Encoded image bytes
+    """
+    output = BytesIO()
+    if format == "PNG":
+        img.save(output, format="PNG")
+    else:
+        img.save(output, format=format, quality=quality, optimize=True)
+    return output.getvalue()
+
+
+def encode_frame(frame, max_width: Optional[int] = None, max_height: Optional[int] = None,
+                 format: str = "PNG", quality: int = 85) -> bytes:
+    """
+    Encode a raw Frame once, resizing first if it is too large
+
+    Args:
+        frame: agent.adb.frame.Frame
+        max_width: Maximum width (None for no limit)
+        max_height: Maximum height (None for no limit)
+        format: Output format ("PNG", "JPEG" or "WEBP")
+        quality: Quality 1-100 for lossy formats
+
+    Returns:
+        Encoded image bytes
+    """
+    return encode_image(fit_image(frame.to_image(), max_width, max_height), format, quality)
+
+
+def perceptual_hash(img: Image.Image, hash_size: int = 16, ignore_top: float = 0.04) -> int:
+    """
+    Difference hash (dHash) of an image for near-duplicate detection
+
+    The top strip (status bar: clock, battery, notification icons) is left
+    out so those updates alone do not make two screenshots differ.
+
+    Args:
+        img: PIL image
+        hash_size: Hash grid size (hash has hash_size * hash_size bits)
+        ignore_top: Fraction of the height at the top to ignore
+
+    Returns:
+        Hash as an int; compare with hamming distance ((a ^ b).bit_count())
+    """
+    width, height = img.size
+    top = int(height * ignore_top)
+    gray = img.crop((0, top, width, height)).convert("L").resize((hash_size + 1, hash_size), Image.Resampling.BOX)
+    pixels = gray.tobytes()
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
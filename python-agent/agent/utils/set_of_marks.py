@@ -0,0 +1,189 @@
+"""Set-of-marks screenshots: numbered boxes on interactive elements"""
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+logger = logging.getLogger(__name__)
+
+# Box colors cycled by mark id (distinct on light and dark UIs)
+MARK_COLORS = [
+    (230, 25, 75), (60, 180, 75), (0, 130, 200), (245, 130, 48),
+    (145, 30, 180), (240, 50, 230), (0, 128, 128), (170, 110, 40),
+]
+
+MAX_LABEL_LENGTH = 40
+
+
+def select_marks(elements: List[Dict], screen_size: Optional[Tuple[int, int]] = None,
+                 max_marks: int = 80) -> List[Dict]:
+    """
+    Pick the elements worth a mark
+
+    Clickable/focusable elements are marked; text or description elements
+    are marked only when no marked clickable element contains them (their
+    text labels the container instead). Elements without area, off screen,
+    or with the same bounds as an already marked element are skipped.
+
+    Args:
+        elements: Element dicts from UIAutomator.list_all_elements()
+        screen_size: (width, height) to drop off-screen elements
+        max_marks: Maximum number of marks
+
+    Returns:
+        Element dicts (copies) with "mark" id and "label", in reading order
+    """
+    def box(elem):
+        return elem.get("x1"), elem.get("y1"), elem.get("x2"), elem.get("y2")
+
+    def visible(elem):
+        x1, y1, x2, y2 = box(elem)
+        if None in (x1, y1, x2, y2) or x2 <= x1 or y2 <= y1:
+            return False
+        if screen_size and (x2 <= 0 or y2 <= 0 or x1 >= screen_size[0] or y1 >= screen_size[1]):
+            return False
+        return True
+
+    def contains(outer, inner):
+        return outer[0] <= inner[0] and outer[1] <= inner[1] and outer[2] >= inner[2] and outer[3] >= inner[3]
+
+    def text_of(elem):
+        return (elem.get("text") or "").strip() or (elem.get("content_desc") or "").strip()
+
+    actionable = [e for e in elements if visible(e) and (e.get("clickable") or e.get("focusable"))]
+    # Innermost first, so a button is marked rather than the list row around it
+    actionable.sort(key=lambda e: (e["x2"] - e["x1"]) * (e["y2"] - e["y1"]))
+
+    marks = []
+    seen_bounds = set()
+    for elem in actionable:
+        if box(elem) in seen_bounds:
+            continue
+        seen_bounds.add(box(elem))
+        marks.append(dict(elem))
+
+    for elem in elements:
+        text = text_of(elem)
+        if not text or not visible(elem) or box(elem) in seen_bounds:
+            continue
+        container = next((m for m in marks if contains(box(m), box(elem))), None)
+        if container is not None:
+            container.setdefault("_texts", []).append(text)
+            continue
+        seen_bounds.add(box(elem))
+        marks.append(dict(elem))
+
+    marks.sort(key=lambda m: (m["y1"], m["x1"]))
+    if len(marks) > max_marks:
+        logger.debug(f"Limiting marks to {max_marks} of {len(marks)} elements")
+        marks = marks[:max_marks]
+
+    for mark_id, mark in enumerate(marks, start=1):
+        mark["mark"] = mark_id
+        texts = mark.pop("_texts", [])
+        label = text_of(mark) or " ".join(texts)
+        mark["label"] = label[:MAX_LABEL_LENGTH]
+    return marks
+
+
+def draw_marks(img: Image.Image, marks: List[Dict], to_image: Callable[[int, int], Tuple[float, float]]) -> Image.Image:
+    """
+    Draw numbered boxes on an image
+
+    Args:
+        img: RGB image (modified in place)
+        marks: select_marks() output
+        to_image: Maps device (x, y) to image (x, y)
+
+    Returns:
+        The same image
+    """
+    draw = ImageDraw.Draw(img)
+    font_size = max(10, min(img.width, img.height) // 40)
+    font = ImageFont.load_default(size=font_size)
+
+    for mark in marks:
+        color = MARK_COLORS[(mark["mark"] - 1) % len(MARK_COLORS)]
+        x1, y1 = to_image(mark["x1"], mark["y1"])
+        x2, y2 = to_image(mark["x2"], mark["y2"])
+        draw.rectangle((x1, y1, x2, y2), outline=color, width=2)
+
+        label = str(mark["mark"])
+        left, top, right, bottom = draw.textbbox((0, 0), label, font=font)
+        width, height = right - left + 4, bottom - top + 4
+        # Label inside the top-left corner, kept on the image
+        lx = min(max(0, x1), img.width - width)
+        ly = min(max(0, y1), img.height - height)
+        draw.rectangle((lx, ly, lx + width, ly + height), fill=color)
+        draw.text((lx + 2 - left, ly + 2 - top), label, fill=(255, 255, 255), font=font)
+    return img
+
+
+def format_legend(marks: List[Dict]) -> str:
+    """
+    Compact id -> selector legend, one line per mark
+
+    Example: `3: Button "Sign in" id=login_button (540,1210)`
+    """
+    lines = []
+    for mark in marks:
+        parts = [f"{mark['mark']}:", (mark.get("class") or "").rsplit(".", 1)[-1] or "View"]
+        if mark.get("label"):
+            parts.append(f"\"{mark['label']}\"")
+        resource_id = mark.get("resource_id") or ""
+        if resource_id:
+            parts.append("id=" + resource_id.split("/", 1)[-1])
+        if not mark.get("clickable"):
+            parts.append("(not clickable)")
+        parts.append(f"({mark.get('center_x')},{mark.get('center_y')})")
+        lines.append(" ".join(parts))
+    return "\n".join(lines)
+
+
+class ScreenMarks:
+    """
+    Marks of the last annotated screenshot per device, for clicks by mark id
+
+    Marks are tagged with the device's screen generation (bumped by every
+    input action and by screen change events) and expire when it changes:
+    after a swipe or app switch the old coordinates belong to other elements.
+    """
+
+    def __init__(self):
+        # device_id -> (screen generation, {mark id: element dict})
+        self._marks: Dict[str, Tuple[int, Dict[int, Dict]]] = {}
+
+    def set(self, device_id: str, marks: List[Dict], generation: int):
+        """
+        Replace the marks of a device
+
+        Args:
+            device_id: Device ID
+            marks: Marks from select_marks()
+            generation: Screen generation the screenshot and hierarchy were captured at
+        """
+        self._marks[device_id] = (generation, {mark["mark"]: mark for mark in marks})
+
+    def get(self, device_id: str, mark_id: int, generation: int) -> Optional[Dict]:
+        """
+        Element dict of a mark
+
+        Args:
+            device_id: Device ID
+            mark_id: Mark id
+            generation: Current screen generation of the device
+
+        Returns:
+            Element dict, or None if the mark is unknown or the screen changed since
+        """
+        entry = self._marks.get(device_id)
+        if not entry:
+            return None
+        if entry[0] != generation:
+            del self._marks[device_id]
+            return None
+        return entry[1].get(int(mark_id))
+
+
+# Shared by screen tools (create marks) and interaction tools (use them)
+screen_marks = ScreenMarks()
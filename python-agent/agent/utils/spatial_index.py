@@ -0,0 +1,287 @@
+"""Uniform grid index over element bounds for hit-testing and region queries"""
+import heapq
+import logging
+import math
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .element_snapshot import ElementSnapshot, CLICKABLE
+
+logger = logging.getLogger(__name__)
+
+# (x1, y1, x2, y2)
+Rect = Tuple[int, int, int, int]
+
+# Grid cells along the longer screen side (default cell size)
+GRID_CELLS = 16
+MIN_CELL_SIZE = 32
+
+# Points tried by tap_point(), as fractions of the visible box, center first
+_TAP_CANDIDATES = (
+    (0.5, 0.5), (0.5, 0.25), (0.5, 0.75), (0.25, 0.5), (0.75, 0.5),
+    (0.25, 0.25), (0.75, 0.25), (0.25, 0.75), (0.75, 0.75),
+)
+
+
+def contains(outer: Rect, inner: Rect) -> bool:
+    """Whether `inner` lies entirely inside `outer`"""
+    return outer[0] <= inner[0] and outer[1] <= inner[1] and inner[2] <= outer[2] and inner[3] <= outer[3]
+
+
+def intersection(a: Rect, b: Rect) -> Optional[Rect]:
+    """Overlap of two boxes or None"""
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    if x2 <= x1 or y2 <= y1:
+        return None
+    return x1, y1, x2, y2
+
+
+def distance_to(rect: Rect, x: float, y: float) -> float:
+    """Distance from a point to a box (0 inside)"""
+    dx = max(rect[0] - x, 0, x - rect[2])
+    dy = max(rect[1] - y, 0, y - rect[3])
+    return math.hypot(dx, dy)
+
+
+class SpatialIndex:
+    """
+    Grid of square cells over the screen, each listing the elements whose
+    bounds overlap it
+
+    A dump holds a few hundred to a few thousand boxes on one screen, so a
+    uniform grid does better than a tree: it is built in one pass and a point
+    query reads one cell. Element indexes are positions in the snapshot (view)
+    the index was built from. Elements without bounds or with empty bounds
+    (collapsed, scrolled away) are not indexed.
+
+    Use ElementSnapshot.spatial_index() to get the shared index of a snapshot.
+    """
+
+    def __init__(self, snapshot: ElementSnapshot, cell_size: Optional[int] = None):
+        """
+        Build index
+
+        Args:
+            snapshot: Elements to index
+            cell_size: Cell side in pixels, None = fit GRID_CELLS cells along the longer side
+        """
+        self.snapshot = snapshot
+        # element index -> bounds
+        self._boxes: Dict[int, Rect] = {}
+        max_x = max_y = 0
+        for index in range(len(snapshot)):
+            bounds = snapshot.bounds(index)
+            if bounds is None or bounds[2] <= bounds[0] or bounds[3] <= bounds[1]:
+                continue
+            self._boxes[index] = bounds
+            max_x, max_y = max(max_x, bounds[2]), max(max_y, bounds[3])
+
+        self.cell_size = cell_size or max(MIN_CELL_SIZE, -(-max(max_x, max_y) // GRID_CELLS))
+        self.columns = max(1, -(-max_x // self.cell_size))
+        self.rows = max(1, -(-max_y // self.cell_size))
+        self._cells: List[List[int]] = [[] for _ in range(self.columns * self.rows)]
+        for index, (x1, y1, x2, y2) in self._boxes.items():
+            col1, row1 = self._cell_of(x1, y1)
+            col2, row2 = self._cell_of(x2 - 1, y2 - 1)
+            for row in range(row1, row2 + 1):
+                base = row * self.columns
+                for col in range(col1, col2 + 1):
+                    self._cells[base + col].append(index)
+
+    def __len__(self) -> int:
+        return len(self._boxes)
+
+    def bounds(self, index: int) -> Optional[Rect]:
+        """Indexed bounds of an element or None"""
+        return self._boxes.get(index)
+
+    # ========== Queries ==========
+
+    def at(self, x: int, y: int, flags: int = 0) -> List[int]:
+        """
+        Elements containing a point, topmost first
+
+        Args:
+            x, y: Point
+            flags: Keep only elements with all of these flag bits
+
+        Returns:
+            Element indexes, last in document order first (views draw their
+            children after themselves and later siblings over earlier ones)
+        """
+        if not (0 <= x < self.columns * self.cell_size and 0 <= y < self.rows * self.cell_size):
+            return []
+        col, row = self._cell_of(x, y)
+        hits = [index for index in self._cells[row * self.columns + col]
+                if self._matches(index, flags) and self._contains_point(self._boxes[index], x, y)]
+        hits.sort(reverse=True)
+        return hits
+
+    def hit(self, x: int, y: int, flags: int = CLICKABLE) -> Optional[int]:
+        """Topmost element at a point that a tap would reach (clickable by default), or None"""
+        hits = self.at(x, y, flags=flags)
+        return hits[0] if hits else None
+
+    def intersecting(self, rect: Rect, flags: int = 0) -> List[int]:
+        """Elements overlapping a box, in document order"""
+        return [index for index in self._candidates(rect)
+                if self._matches(index, flags) and intersection(self._boxes[index], rect)]
+
+    def within(self, rect: Rect, flags: int = 0) -> List[int]:
+        """Elements lying entirely inside a box, in document order"""
+        return [index for index in self._candidates(rect)
+                if self._matches(index, flags) and contains(rect, self._boxes[index])]
+
+    def nearest(
+        self,
+        x: float,
+        y: float,
+        k: int = 1,
+        flags: int = 0,
+        predicate: Optional[Callable[[int], bool]] = None,
+        max_distance: Optional[float] = None,
+    ) -> List[Tuple[int, float]]:
+        """
+        k elements closest to a point (distance to their bounds, 0 inside)
+
+        Searches rings of cells around the point's cell and stops once no
+        unvisited cell can hold anything closer than the k-th candidate.
+
+        Args:
+            x, y: Point
+            k: Number of elements
+            flags: Keep only elements with all of these flag bits
+            predicate: Keep only elements for which predicate(index) is true
+            max_distance: Ignore elements farther than this
+
+        Returns:
+            [(element index, distance)] sorted by distance
+        """
+        if k <= 0 or not self._boxes:
+            return []
+
+        center_col, center_row = self._cell_of(x, y)
+        seen = set()
+        candidates: List[Tuple[float, int]] = []
+        radius = 0
+        while True:
+            for cell in self._ring(center_col, center_row, radius):
+                for index in cell:
+                    if index in seen:
+                        continue
+                    seen.add(index)
+                    if not self._matches(index, flags) or (predicate and not predicate(index)):
+                        continue
+                    distance = distance_to(self._boxes[index], x, y)
+                    if max_distance is None or distance <= max_distance:
+                        candidates.append((distance, index))
+
+            # Nothing outside the searched block is closer than this
+            bound = self._outside_distance(x, y, center_col, center_row, radius)
+            if bound is None:
+                break
+            if len(candidates) >= k and heapq.nsmallest(k, candidates)[-1][0] <= bound:
+                break
+            if max_distance is not None and bound > max_distance:
+                break
+            radius += 1
+
+        return [(index, distance) for distance, index in heapq.nsmallest(k, candidates)]
+
+    def covered_by(self, x: int, y: int, rect: Rect) -> Optional[int]:
+        """
+        Clickable element on top at a point that does not belong to a box
+
+        Elements inside the box (children) or around it (containers) belong
+        to it; anything else on top (a floating button, a bar, a dialog over
+        a list item) would receive a tap meant for the box.
+
+        Returns:
+            Index of the covering element or None
+        """
+        top = self.hit(x, y)
+        if top is None:
+            return None
+        top_bounds = self._boxes[top]
+        if contains(rect, top_bounds) or contains(top_bounds, rect):
+            return None
+        return top
+
+    def tap_point(self, rect: Rect, clip: Optional[Rect] = None) -> Optional[Tuple[int, int]]:
+        """
+        Point inside a box that a tap reaches, preferring its center
+
+        Args:
+            rect: Element bounds
+            clip: Visible area (screen bounds); parts of the box outside it are not tapped
+
+        Returns:
+            (x, y), the center of the visible part if every candidate point is
+            covered, or None if the box is not visible at all
+        """
+        visible = intersection(rect, clip) if clip else rect
+        if visible is None or visible[2] <= visible[0] or visible[3] <= visible[1]:
+            return None
+        x1, y1, x2, y2 = visible
+        for fx, fy in _TAP_CANDIDATES:
+            x, y = x1 + int((x2 - x1) * fx), y1 + int((y2 - y1) * fy)
+            if self.covered_by(x, y, rect) is None:
+                return x, y
+        logger.debug(f"Every tap point of {rect} is covered by another element")
+        return (x1 + x2) // 2, (y1 + y2) // 2
+
+    # ========== Internals ==========
+
+    def _cell_of(self, x: float, y: float) -> Tuple[int, int]:
+        """Cell of a point, clamped into the grid"""
+        col = min(max(int(x // self.cell_size), 0), self.columns - 1)
+        row = min(max(int(y // self.cell_size), 0), self.rows - 1)
+        return col, row
+
+    def _candidates(self, rect: Rect) -> List[int]:
+        """Indexes in the cells a box overlaps, each once, in document order"""
+        col1, row1 = self._cell_of(rect[0], rect[1])
+        col2, row2 = self._cell_of(rect[2] - 1, rect[3] - 1)
+        found = set()
+        for row in range(row1, row2 + 1):
+            base = row * self.columns
+            for col in range(col1, col2 + 1):
+                found.update(self._cells[base + col])
+        return sorted(found)
+
+    def _ring(self, col: int, row: int, radius: int):
+        """Cells at Chebyshev distance `radius` from a cell, inside the grid"""
+        if radius == 0:
+            yield self._cells[row * self.columns + col]
+            return
+        for r in range(row - radius, row + radius + 1):
+            if not 0 <= r < self.rows:
+                continue
+            if r in (row - radius, row + radius):
+                cols = range(col - radius, col + radius + 1)
+            else:
+                cols = (col - radius, col + radius)
+            for c in cols:
+                if 0 <= c < self.columns:
+                    yield self._cells[r * self.columns + c]
+
+    def _outside_distance(self, x: float, y: float, col: int, row: int, radius: int) -> Optional[float]:
+        """Lower bound of the distance to elements outside the searched block, None if it covers the grid"""
+        size = self.cell_size
+        edges = []
+        if col - radius > 0:
+            edges.append(x - (col - radius) * size)
+        if col + radius < self.columns - 1:
+            edges.append((col + radius + 1) * size - x)
+        if row - radius > 0:
+            edges.append(y - (row - radius) * size)
+        if row + radius < self.rows - 1:
+            edges.append((row + radius + 1) * size - y)
+        return max(min(edges), 0) if edges else None
+
+    def _matches(self, index: int, flags: int) -> bool:
+        return not flags or self.snapshot.flags(index) & flags == flags
+
+    @staticmethod
+    def _contains_point(rect: Rect, x: float, y: float) -> bool:
+        return rect[0] <= x < rect[2] and rect[1] <= y < rect[3]
@@ -0,0 +1,169 @@
+"""Content-addressed cache of uploaded screenshots (image hash -> OpenAI file_id)"""
+import hashlib
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from PIL import Image, ImageChops
+
+from .screenshot import perceptual_hash
+
+logger = logging.getLogger(__name__)
+
+# Status bar (clock, battery, notification icons) share of the screen height
+STATUS_BAR_RATIO = 0.04
+# Downsampling of the thumbnail kept for near-duplicate checks
+THUMBNAIL_FACTOR = 8
+
+
+class ScreenshotFingerprint:
+    """Exact and perceptual identity of a captured screen"""
+
+    def __init__(self, digest: str, phash: int, thumbnail: Image.Image, variant: str = ""):
+        """
+        Args:
+            digest: sha256 hex digest of the frame pixels and variant
+            phash: Perceptual hash of the thumbnail
+            thumbnail: Grayscale, box-downsampled screen without the status bar
+            variant: How the screenshot is prepared for upload (size, format, region)
+        """
+        self.digest = digest
+        self.phash = phash
+        self.thumbnail = thumbnail
+        self.variant = variant
+
+
+def screenshot_fingerprint(frame, variant: str = "") -> ScreenshotFingerprint:
+    """
+    Fingerprint a captured frame for ScreenshotUploadCache
+
+    Args:
+        frame: agent.adb.frame.Frame
+        variant: Upload preparation settings (ObservationPipeline.variant());
+            the same screen prepared differently is a different upload
+
+    Returns:
+        ScreenshotFingerprint
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{variant}|{frame.width}x{frame.height}:{frame.pixel_format}:".encode())
+    digest.update(frame.data)
+
+    img = frame.to_image()
+    top = int(img.height * STATUS_BAR_RATIO)
+    thumbnail = img.crop((0, top, img.width, img.height)).convert("L").reduce(THUMBNAIL_FACTOR)
+    return ScreenshotFingerprint(digest.hexdigest(), perceptual_hash(thumbnail, ignore_top=0), thumbnail, variant)
+
+
+class ScreenshotUploadCache:
+    """
+    Remember which screenshots were already uploaded to the Files API
+
+    Lookups match an identical image (sha256 of the pixels) or, failing that,
+    a near-identical one. Near matches are prefiltered by perceptual hash
+    (within `phash_tolerance` bits) and confirmed on the downsampled
+    thumbnails: no pixel may differ by more than `pixel_tolerance` levels.
+    The hash alone cannot see a typed character; the thumbnail check does,
+    while ignoring status bar updates and faint rendering noise.
+
+    Entries are scoped by API key (file_ids belong to an account), expire
+    after `ttl` seconds and are evicted least recently used beyond
+    `max_entries`.
+    """
+
+    def __init__(self, ttl: float = 1800, max_entries: int = 256,
+                 phash_tolerance: int = 8, pixel_tolerance: int = 6):
+        """
+        Initialize cache
+
+        Args:
+            ttl: Seconds an uploaded file_id is reused
+            max_entries: Maximum cached uploads (all API keys together)
+            phash_tolerance: Maximum differing perceptual hash bits for a near match
+                (out of 256; -1 disables near matching)
+            pixel_tolerance: Maximum thumbnail pixel difference (0-255) for a near match
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.phash_tolerance = phash_tolerance
+        self.pixel_tolerance = pixel_tolerance
+        # (account, digest) -> (file_id, fingerprint, stored_at)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[str, ScreenshotFingerprint, float]]" = OrderedDict()
+
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    def lookup(self, api_key: str, fingerprint: ScreenshotFingerprint) -> Optional[str]:
+        """
+        Find the file_id of an identical or near-identical uploaded screenshot
+
+        Args:
+            api_key: OpenAI API key the upload would use
+            fingerprint: screenshot_fingerprint() of the screenshot
+
+        Returns:
+            file_id or None
+        """
+        account = self._account(api_key)
+        self._expire()
+
+        key = (account, fingerprint.digest)
+        entry = self._entries.get(key)
+        if entry:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+        if self.phash_tolerance >= 0:
+            candidates = []
+            for entry_key, (file_id, entry_fingerprint, stored_at) in self._entries.items():
+                if (
+                    entry_key[0] != account
+                    or entry_fingerprint.variant != fingerprint.variant
+                    or entry_fingerprint.thumbnail.size != fingerprint.thumbnail.size
+                ):
+                    continue
+                distance = (entry_fingerprint.phash ^ fingerprint.phash).bit_count()
+                if distance <= self.phash_tolerance:
+                    candidates.append((distance, entry_key))
+
+            for distance, entry_key in sorted(candidates):
+                file_id, entry_fingerprint, stored_at = self._entries[entry_key]
+                diff = ImageChops.difference(entry_fingerprint.thumbnail, fingerprint.thumbnail)
+                if diff.getextrema()[1] <= self.pixel_tolerance:
+                    self._entries.move_to_end(entry_key)
+                    self.near_hits += 1
+                    logger.debug(f"Near-identical screenshot ({distance} hash bits), reusing upload")
+                    return file_id
+
+        self.misses += 1
+        return None
+
+    def store(self, api_key: str, fingerprint: ScreenshotFingerprint, file_id: str):
+        """Remember an uploaded screenshot"""
+        key = (self._account(api_key), fingerprint.digest)
+        self._entries[key] = (file_id, fingerprint, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Forget all uploads"""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current size"""
+        return {"hits": self.hits, "near_hits": self.near_hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl
+        expired = [key for key, entry in self._entries.items() if entry[2] < cutoff]
+        for key in expired:
+            del self._entries[key]
+
+    @staticmethod
+    def _account(api_key: str) -> str:
+        # Never keep the key itself around
+        return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
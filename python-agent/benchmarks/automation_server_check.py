@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Check the automation server client against a local stand-in server
+
+Starts a server on 127.0.0.1 speaking the protocol of
+agent/adb/automation_server.py (ping, hierarchy, click, pushed events),
+serving the given dumps or generated hierarchies, and checks
+AutomationServerBackend against it without a device:
+
+- hierarchies round-trip unchanged, including ones far above asyncio's
+  default 64 KiB line limit
+- clicks report whether an element matched, and pushed events reach listeners
+- a message longer than STREAM_LIMIT closes the connection cleanly (no
+  exception, dump_hierarchy() returns None) and the device is retried later
+
+Usage:
+    python benchmarks/automation_server_check.py [dump.xml ...] [--rows 5000]
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from xml.sax.saxutils import quoteattr
+
+# Run from anywhere: make the `agent` package importable
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent.adb import automation_server  # noqa: E402
+from agent.adb.automation_server import AutomationServerBackend  # noqa: E402
+
+DEVICE = "stand-in"
+
+
+def make_hierarchy(rows):
+    """Hierarchy of a long list, `rows` clickable rows with a label each"""
+    nodes = []
+    for row in range(rows):
+        top = 200 + row * 120
+        nodes.append(
+            f'<node index="{row}" text="" resource-id="com.example:id/row" class="android.widget.LinearLayout" '
+            f'package="com.example" content-desc="" clickable="true" enabled="true" focusable="true" '
+            f'scrollable="false" bounds="[0,{top}][1080,{top + 120}]">'
+            f'<node index="0" text={quoteattr(f"Item {row}")} resource-id="com.example:id/title" '
+            f'class="android.widget.TextView" package="com.example" content-desc="" clickable="false" '
+            f'enabled="true" focusable="false" scrollable="false" bounds="[40,{top + 20}][1040,{top + 100}]" />'
+            f'</node>'
+        )
+    return ("<?xml version='1.0' encoding='UTF-8' standalone='yes' ?><hierarchy rotation=\"0\">"
+            '<node index="0" text="" resource-id="com.example:id/list" class="android.widget.ListView" '
+            'package="com.example" content-desc="" clickable="false" enabled="true" focusable="true" '
+            f'scrollable="true" bounds="[0,200][1080,2400]">{"".join(nodes)}</node></hierarchy>')
+
+
+class StandInServer:
+    """Local server answering like the on-device automation server"""
+
+    def __init__(self):
+        self.xml = ""
+        # Sent instead of the next hierarchy response (oversized message check)
+        self.raw_response = None
+        self._server = None
+
+    async def start(self) -> int:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                method, params = message.get("method"), message.get("params") or {}
+                response = {"id": message.get("id")}
+                if method == "ping":
+                    response["result"] = {"version": "stand-in"}
+                elif method == "hierarchy" and self.raw_response is not None:
+                    writer.write(self.raw_response)
+                    self.raw_response = None
+                    await writer.drain()
+                    continue
+                elif method == "hierarchy":
+                    response["result"] = {"xml": self.xml}
+                elif method == "click":
+                    clicked = self._click(params)
+                    response["result"] = {"clicked": clicked}
+                    if clicked:
+                        writer.write(json.dumps({"event": "window_changed", "params": {}}).encode("utf-8") + b"\n")
+                else:
+                    response["error"] = f"Unknown method {method}"
+                writer.write(json.dumps(response).encode("utf-8") + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _click(self, params):
+        """Whether an element matches the selector (first match, exact attributes)"""
+        attributes = (("resource_id", "resource-id"), ("text", "text"), ("description", "content-desc"))
+        for node in ET.fromstring(self.xml.encode("utf-8")).iter("node"):
+            if all(node.get(attribute) == params[key] for key, attribute in attributes if key in params):
+                return True
+        return False
+
+
+def check(name, ok, failures):
+    print(f"  {'ok  ' if ok else 'FAIL'} {name}")
+    if not ok:
+        failures.append(name)
+
+
+async def run(hierarchies, repeat):
+    failures = []
+    server = StandInServer()
+    port = await server.start()
+    backend = AutomationServerBackend(None, device_port=port, forward=False, retry_interval=0.2)
+    events = []
+    backend.add_listener(lambda device_id, event, params: events.append((device_id, event)))
+    try:
+        print("hierarchy")
+        for name, xml in hierarchies:
+            server.xml = xml
+            elapsed = float("inf")
+            dumped = None
+            for _ in range(repeat):
+                started = time.perf_counter()
+                dumped = await backend.dump_hierarchy(DEVICE)
+                elapsed = min(elapsed, time.perf_counter() - started)
+            check(f"{name}: {len(xml.encode('utf-8')) // 1024} KiB in {elapsed * 1000:.1f} ms", dumped == xml, failures)
+
+        print("click")
+        server.xml = hierarchies[-1][1]
+        first = next(ET.fromstring(server.xml.encode("utf-8")).iter("node"))
+        check("matching selector clicks",
+              await backend.click(DEVICE, resource_id=first.get("resource-id") or None,
+                                  text=first.get("text") or None, description=first.get("content-desc") or None),
+              failures)
+        check("missing element is not clicked", not await backend.click(DEVICE, text="∅ no such element"), failures)
+        await asyncio.sleep(0.05)
+        check("window_changed event delivered", (DEVICE, "window_changed") in events, failures)
+
+        print("oversized message")
+        server.raw_response = b'{"id": 0, "result": {"xml": "' + b"x" * (automation_server.STREAM_LIMIT + 1) + b'"}}\n'
+        check("dump_hierarchy() returns None", await backend.dump_hierarchy(DEVICE) is None, failures)
+        check("connection dropped", not await backend.available(DEVICE), failures)
+        await asyncio.sleep(backend.retry_interval)
+        check("device reconnects after retry_interval", await backend.available(DEVICE), failures)
+        check("hierarchy served again", await backend.dump_hierarchy(DEVICE) == server.xml, failures)
+    finally:
+        await backend.close()
+        await server.stop()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("dumps", nargs="*", help="UI hierarchy XML files (uiautomator dump) to serve")
+    parser.add_argument("--rows", type=int, default=5000, help="Rows of the generated long-list hierarchy")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing runs per hierarchy (best is reported)")
+    args = parser.parse_args()
+
+    hierarchies = [(path, Path(path).read_text(encoding="utf-8")) for path in args.dumps]
+    hierarchies.append(("generated 10 rows", make_hierarchy(10)))
+    hierarchies.append((f"generated {args.rows} rows", make_hierarchy(args.rows)))
+
+    failures = asyncio.run(run(hierarchies, args.repeat))
+    if failures:
+        print(f"\n{len(failures)} check(s) failed")
+        sys.exit(1)
+    print("\nall checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Compare fuzzy text scorers on real UI hierarchy dumps
+
+Scores queries derived from the dumps' texts (with typos and truncations)
+against every text and content description of each dump, with each scorer
+of agent/utils/fuzzy_match.py, and times ElementParser.find_element with it.
+Agreement is measured against sequence_matcher: difflib on the same
+normalized texts (lowercase, without diacritics), not the raw-text difflib
+matching ElementParser used before normalization.
+
+Get dumps with:
+    adb shell uiautomator dump /sdcard/dump.xml && adb pull /sdcard/dump.xml
+
+Usage:
+    python benchmarks/fuzzy_match_benchmark.py dump.xml [more.xml ...]
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# Run from anywhere: make the `agent` package importable
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent.adb.hierarchy_parser import parse_hierarchy_snapshot  # noqa: E402
+from agent.utils import fuzzy_match  # noqa: E402
+from agent.utils.element_parser import ElementParser  # noqa: E402
+from agent.utils.fuzzy_match import SCORERS, FuzzyMatcher  # noqa: E402
+
+REFERENCE = "sequence_matcher"
+
+
+def make_queries(values, count, rng):
+    """Queries as a user would type them: exact, with a typo, or truncated"""
+    queries = []
+    for _ in range(count):
+        value = rng.choice(values)
+        kind = rng.random()
+        if kind < 0.4 and len(value) > 3:
+            # One typo: drop, replace or swap a character
+            i = rng.randrange(len(value) - 1)
+            edit = rng.choice(("drop", "replace", "swap"))
+            if edit == "drop":
+                value = value[:i] + value[i + 1:]
+            elif edit == "replace":
+                value = value[:i] + rng.choice("abcdefghiklmnopqrstuvxy") + value[i + 1:]
+            else:
+                value = value[:i] + value[i + 1] + value[i] + value[i + 2:]
+        elif kind < 0.6 and len(value) > 8:
+            value = value[:rng.randint(4, len(value) - 1)]
+        queries.append(value)
+    return queries
+
+
+def best_index(scores):
+    best = max(range(len(scores)), key=scores.__getitem__, default=None)
+    return best if best is not None and scores[best] > 0 else None
+
+
+def run(path, scorers, query_count, cutoff, repeat, rng):
+    data = Path(path).read_bytes()
+    snapshot = parse_hierarchy_snapshot(data)
+    if snapshot is None:
+        print(f"{path}: not a valid hierarchy dump, skipped")
+        return
+    index = snapshot.attribute_index()
+    values = [value for value in index.text.values + index.desc.values if value]
+    if not values:
+        print(f"{path}: no texts, skipped")
+        return
+    queries = make_queries(values, query_count, rng)
+    lengths = sorted(len(value) for value in values)
+    print(f"\n{path}: {len(snapshot)} elements, {len(values)} texts "
+          f"(median {lengths[len(lengths) // 2]} chars, max {lengths[-1]}), {len(queries)} queries")
+
+    results = {}
+    for scorer in scorers:
+        matcher = FuzzyMatcher(scorer)
+        elapsed = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            scores = [matcher.score_many(query, values, cutoff=cutoff) for query in queries]
+            elapsed = min(elapsed, time.perf_counter() - started)
+        results[scorer] = (elapsed, scores)
+
+    reference = results.get(REFERENCE)
+    print(f"{'scorer':<18}{'batch ms':>10}{'us/query':>10}{'speedup':>9}{'matches':>9}{'same best':>11}"
+          f"{'find ms':>10}")
+    for scorer in scorers:
+        elapsed, scores = results[scorer]
+        matches = sum(1 for row in scores for score in row if score >= cutoff)
+        speedup = same_best = "-"
+        if reference:
+            speedup = f"{reference[0] / elapsed:.1f}x" if elapsed else "-"
+            agree = sum(1 for mine, theirs in zip(scores, reference[1]) if best_index(mine) == best_index(theirs))
+            same_best = f"{100 * agree / len(queries):.0f}%"
+
+        # End to end: ElementParser with this scorer (attribute index already built)
+        fuzzy_match.fuzzy_matcher.scorer = scorer
+        started = time.perf_counter()
+        for query in queries:
+            ElementParser.find_element(snapshot, text=query, description=query, min_similarity=cutoff)
+        find_ms = (time.perf_counter() - started) * 1000
+
+        print(f"{scorer:<18}{elapsed * 1000:>10.1f}{elapsed * 1e6 / len(queries):>10.0f}{speedup:>9}"
+              f"{matches:>9}{same_best:>11}{find_ms:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("dumps", nargs="+", help="UI hierarchy XML files (uiautomator dump)")
+    parser.add_argument("--scorers", nargs="+", choices=SCORERS, default=list(SCORERS), help="Scorers to compare")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per dump")
+    parser.add_argument("--cutoff", type=float, default=0.6, help="Minimum similarity (ElementParser default 0.6)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing runs per scorer (best is reported)")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for the queries")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    scorers = list(dict.fromkeys(args.scorers))
+    default_scorer = fuzzy_match.fuzzy_matcher.scorer
+    try:
+        for path in args.dumps:
+            run(path, scorers, args.queries, args.cutoff, args.repeat, rng)
+    finally:
+        fuzzy_match.fuzzy_matcher.scorer = default_scorer
+
+
+if __name__ == "__main__":
+    main()
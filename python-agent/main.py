@@ -6,9 +6,14 @@ import yaml
 from pathlib import Path
 
 from agent.adb.adb_client import ADBClient
+from agent.adb.async_adb_client import AsyncADBClient
+from agent.adb.automation_server import AutomationServerBackend
 from agent.adb.uiautomator import UIAutomator
 from agent.server.http_server import HTTPServer
 from agent.server.websocket_server import WebSocketServer
+from agent.utils.openai_pool import openai_clients
+from agent.utils.observation import observation_pipeline
+from agent.utils.fuzzy_match import fuzzy_matcher
 
 
 def setup_logging(config: dict):
@@ -44,6 +49,10 @@ def load_config() -> dict:
                 "auto_install": True,
                 "install_dir": None,
                 "add_to_path": True,
+                "transport": "socket",
+                "server_host": "127.0.0.1",
+                "server_port": 5037,
+                "persistent_shell": True,
             },
             "logging": {
                 "level": "INFO",
@@ -78,14 +87,34 @@ async def main():
             adb_path=adb_path,
             auto_install=auto_install,
             install_dir=install_dir,
+            transport=adb_config.get("transport", "subprocess"),
+            server_host=adb_config.get("server_host", "127.0.0.1"),
+            server_port=adb_config.get("server_port", 5037),
+            persistent_shell=adb_config.get("persistent_shell", True),
         )
+        async_adb_client = AsyncADBClient(adb_client)
         logger.info("ADB client initialized")
     except Exception as e:
         logger.error(f"Failed to initialize ADB client: {e}")
         sys.exit(1)
 
+    # Optional on-device automation server (fast hierarchy dumps and clicks)
+    async_adb_client.set_automation_server(
+        AutomationServerBackend.from_config(async_adb_client, config.get("automation_server"))
+    )
+
+    # Screenshot preprocessing for model observations
+    observation_pipeline.configure(config.get("observation"))
+
+    # Fuzzy text scorer for element lookups
+    fuzzy_matcher.configure(config.get("fuzzy_match"))
+
     # Initialize UI Automator
-    ui_automator = UIAutomator(adb_client)
+    ui_automator = UIAutomator(
+        async_adb_client,
+        cache_ttl=config.get("uiautomator", {}).get("cache_ttl", 2.0),
+        compressed_dump=config.get("uiautomator", {}).get("compressed_dump", False),
+    )
     logger.info("UI Automator initialized")
 
     # Get server config
@@ -96,11 +125,16 @@ async def main():
     ws_port = server_config.get("websocket_port", 3002)
 
     # Initialize WebSocket server with ADB client for screen streaming
-    ws_server = WebSocketServer(host=ws_host, port=ws_port, adb_client=adb_client)
+    ws_server = WebSocketServer(
+        host=ws_host,
+        port=ws_port,
+        adb_client=async_adb_client,
+        stream_config=config.get("stream", {}),
+    )
 
     # Initialize HTTP server
     http_server = HTTPServer(
-        adb_client=adb_client,
+        adb_client=async_adb_client,
         ui_automator=ui_automator,
         ws_server=ws_server,
         host=http_host,
@@ -111,11 +145,18 @@ async def main():
     logger.info(f"HTTP server: http://{http_host}:{http_port}")
     logger.info(f"WebSocket server: ws://{ws_host}:{ws_port}")
 
+    # Track device connect/disconnect events from the adb server
+    async_adb_client.start_device_tracking()
+
     # Start both servers concurrently
-    await asyncio.gather(
-        ws_server.start(),
-        http_server.start(),
-    )
+    try:
+        await asyncio.gather(
+            ws_server.start(),
+            http_server.start(),
+        )
+    finally:
+        await async_adb_client.close()
+        await openai_clients.close()
 
 
 if __name__ == "__main__":